@@ -6,6 +6,11 @@ Anonymous Email Sender - Send emails using SendGrid API
 import sendgrid
 from sendgrid.helpers.mail import Mail
 import getpass
+import os
+
+from mailer import MessageTemplate, read_body
+from outbox import Outbox, describe_counts, run_outbox
+from recipients import RecipientStats, load_recipients, normalize_email
 
 def send_anonymous_email():
     """Send an anonymous email using SendGrid"""
@@ -16,16 +21,11 @@ def send_anonymous_email():
     api_key = getpass.getpass("Enter your SendGrid API Key (hidden): ")
     from_email = input("Enter sender email address: ")
     to_email = input("Enter recipient email address: ")
+    if normalize_email(to_email) is None:
+        print(f"❌ {to_email!r} is not a valid email address.")
+        return
     subject = input("Enter email subject: ")
-    
-    print("Enter email body (press Enter twice to finish):")
-    body_lines = []
-    while True:
-        line = input()
-        if line == "":
-            break
-        body_lines.append(line)
-    body = "\n".join(body_lines)
+    body = read_body()
     
     try:
         sg = sendgrid.SendGridAPIClient(api_key)
@@ -43,5 +43,106 @@ def send_anonymous_email():
     except Exception as e:
         print(f"❌ Error sending email: {e}")
 
+def send_merge_emails():
+    """Bulk mail merge over SendGrid: up to 1000 recipients per API call"""
+    from sendgrid_bulk import SendGridBatchSender
+    
+    print("=== Bulk Mail Merge (SendGrid) ===")
+    print("Use {column} placeholders, e.g. 'Hi {first_name}' with a first_name column in the CSV.")
+    
+    api_key = getpass.getpass("Enter your SendGrid API Key (hidden): ")
+    from_email = input("Enter sender email address: ")
+    recipients_file = input("Recipient file (CSV with an 'email' column, JSONL, or one address per line): ")
+    subject = input("Enter subject template: ")
+    body = read_body()
+    try:
+        parallel = int(input("Parallel requests (default 4): ") or "4")
+    except ValueError:
+        parallel = 4
+        print("Invalid number. Using 4 parallel requests.")
+    
+    def progress(result):
+        print(f"\rSent {result.sent}, failed {result.failed} in {result.requests} request(s)", end="", flush=True)
+    
+    recipients = RecipientStats()
+    try:
+        with SendGridBatchSender(api_key, max_parallel=parallel) as sender:
+            result = sender.send(load_recipients(recipients_file, stats=recipients), from_email, subject, body,
+                                 on_progress=progress)
+        print()
+        print(f"✅ Sent {result.sent} personalized emails in {result.requests} API call(s), "
+              f"{result.elapsed:.1f}s ({result.rate:.0f}/s)")
+        print(f"   Recipients: {recipients.summary()}")
+        for recipients, error in result.errors[:10]:
+            print(f"❌ {recipients}: {error}")
+    except Exception as e:
+        print(f"\n❌ Error sending emails: {e}")
+
+def send_outbox_emails():
+    """Resumable SendGrid campaign: every recipient's state is kept in the outbox database"""
+    print("=== Resumable Campaign (SendGrid) ===")
+    
+    outbox = Outbox()
+    name = input("Campaign name (enter an existing name to resume it): ")
+    campaign = outbox.campaign(name)
+    if campaign is None:
+        recipients_file = input("Recipient CSV (needs an 'email' column): ")
+        meta = {
+            "from_email": input("Enter sender email address: "),
+            "source": os.path.abspath(recipients_file),
+            "subject": input("Enter email subject ({column} placeholders allowed): "),
+            "body": read_body(),
+        }
+        campaign = outbox.create_campaign(name, "sendgrid", meta)
+    elif campaign["channel"] != "sendgrid":
+        print(f"❌ Campaign '{name}' is a {campaign['channel']} campaign.")
+        return
+    else:
+        print(f"Resuming '{name}': {describe_counts(outbox.counts(name))}")
+        unknown = outbox.recover(name)
+        if unknown:
+            print(f"⚠️ {unknown} message(s) were in flight when the last run stopped; "
+                  f"they are marked unknown and will not be re-sent.")
+    meta = campaign["meta"]
+    
+    try:
+        template = MessageTemplate(meta["subject"], meta["body"])
+        recipients = RecipientStats()
+        added = outbox.load(name, load_recipients(meta["source"], stats=recipients))
+        if added:
+            print(f"Queued {added} recipients ({recipients.summary()}).")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error loading recipients: {e}")
+        return
+    
+    sg = sendgrid.SendGridAPIClient(getpass.getpass("Enter your SendGrid API Key (hidden): "))
+    
+    def send(row):
+        subject, body, _ = template.render(row)
+        response = sg.send(Mail(from_email=meta["from_email"], to_emails=row["email"],
+                                subject=subject, plain_text_content=body))
+        return response.headers.get("X-Message-Id", "")
+    
+    try:
+        counts = run_outbox(outbox, name, send)
+        print(f"✅ Campaign '{name}' finished: {describe_counts(counts)}")
+        for key, error in outbox.errors(name):
+            print(f"❌ {key}: {error}")
+    except KeyboardInterrupt:
+        print(f"\nStopped. Run again with the same name to resume: {describe_counts(outbox.counts(name))}")
+    except Exception as e:
+        print(f"❌ Campaign stopped: {e}")
+    finally:
+        outbox.close()
+
 if __name__ == "__main__":
-    send_anonymous_email() 
\ No newline at end of file
+    print("1. Send a single email")
+    print("2. Bulk mail merge (batched, up to 1000 recipients per API call)")
+    print("3. Resumable campaign (survives crashes, retries failures)")
+    choice = input("Choose option (1-3, default 1): ") or "1"
+    if choice == "2":
+        send_merge_emails()
+    elif choice == "3":
+        send_outbox_emails()
+    else:
+        send_anonymous_email() 
\ No newline at end of file
@@ -3,6 +3,13 @@
 RAM Monitor - Check system memory usage
 """
 
+import argparse
+import heapq
+import json
+import re
+import time
+import urllib.request
+
 import psutil
 
 def get_ram_info():
@@ -16,5 +23,300 @@ def get_ram_info():
     print(f"Percentage Used: {mem.percent}%")
     print(f"Free: {mem.free / (1024**3):.2f} GB")
 
+def snapshot_processes(metric="rss"):
+    """Return {(pid, create_time): (name, bytes)} from a single process_iter pass"""
+    # process_iter(attrs) reads each process inside oneshot(), so every process
+    # costs one /proc read per source instead of one syscall per field.
+    # USS needs memory_full_info(), which is much slower, so only ask for it when sorting by it.
+    field = "memory_full_info" if metric == "uss" else "memory_info"
+    processes = {}
+    for proc in psutil.process_iter(["name", "create_time", field]):
+        info = proc.info
+        mem = info.get(field)
+        if mem is None:
+            continue
+        processes[(proc.pid, info["create_time"])] = (info["name"], getattr(mem, metric))
+    return processes
+
+def top_processes(current, previous, n, metric="rss"):
+    """Top-n processes by memory with the change since the previous snapshot"""
+    rows = []
+    for key, (name, value) in heapq.nlargest(n, current.items(), key=lambda item: item[1][1]):
+        before = previous.get(key)
+        rows.append({
+            "pid": key[0],
+            "name": name,
+            metric: value,
+            "delta": value - before[1] if before else None,
+        })
+    return rows
+
+def print_watch_sample(mem, rows, metric):
+    """Print one watch-mode sample as a table"""
+    print(f"\n=== RAM {time.strftime('%H:%M:%S')} === "
+          f"Used {mem.used / (1024**3):.2f} / {mem.total / (1024**3):.2f} GB ({mem.percent}%), "
+          f"Available {mem.available / (1024**3):.2f} GB")
+    print(f"{'PID':>8} {metric.upper() + ' MB':>10} {'Delta MB':>10}  Name")
+    for row in rows:
+        delta = "" if row["delta"] is None else f"{row['delta'] / (1024**2):+.1f}"
+        print(f"{row['pid']:>8} {row[metric] / (1024**2):>10.1f} {delta:>10}  {row['name']}")
+
+def read_memory_metrics(mem=None):
+    """Memory figures that alert rules can refer to by name"""
+    mem = mem or psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    return {
+        "percent": mem.percent,
+        "available_percent": mem.available * 100 / mem.total,
+        "available_mb": mem.available / (1024**2),
+        "used_mb": mem.used / (1024**2),
+        "swap_used_mb": swap.used / (1024**2),
+        "swap_percent": swap.percent,
+    }
+
+# A decimal number; thresholds may be negative (e.g. a falling rate)
+_NUMBER = r"\d+(?:\.\d+)?|\.\d+"
+RULE_PATTERN = re.compile(
+    rf"^\s*(?P<metric>\w+)(?P<rate>\s+rate)?\s*(?P<op><|>)\s*(?P<threshold>[+-]?(?:{_NUMBER}))"
+    rf"(?:\s+for\s+(?P<duration>{_NUMBER})(?P<unit>[sm]?))?"
+    rf"(?:\s+clear\s+(?P<clear>[+-]?(?:{_NUMBER})))?\s*$"
+)
+
+class AlertRule:
+    """One threshold rule with debouncing (`for`) and hysteresis (`clear`)
+
+    Examples: "available_percent < 10 for 30s", "swap_used_mb rate > 100 for 1m clear 20".
+    A `rate` rule compares the per-minute rate of change, smoothed with an EWMA.
+    """
+
+    def __init__(self, text):
+        match = RULE_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"Invalid alert rule: {text!r}")
+        metrics = read_memory_metrics()
+        if match["metric"] not in metrics:
+            raise ValueError(f"Unknown metric {match['metric']!r} in alert rule {text!r}; "
+                             f"use one of: {', '.join(metrics)}")
+        self.text = text.strip()
+        self.metric = match["metric"]
+        self.rate = bool(match["rate"])
+        self.op = match["op"]
+        self.threshold = float(match["threshold"])
+        duration = float(match["duration"] or 0)
+        self.duration = duration * 60 if match["unit"] == "m" else duration
+        # Without an explicit clear level, require a 10% recovery before resolving
+        band = abs(self.threshold) * 0.1
+        default_clear = self.threshold + band if self.op == "<" else self.threshold - band
+        self.clear = float(match["clear"]) if match["clear"] else default_clear
+        self.firing = False
+        self.value = None
+        self._since = None
+        self._last = None
+        self._ewma = None
+
+    def _value(self, now, value):
+        if not self.rate:
+            return value
+        last, self._last = self._last, (now, value)
+        if last is None or now <= last[0]:
+            return None
+        per_minute = (value - last[1]) / (now - last[0]) * 60
+        self._ewma = per_minute if self._ewma is None else 0.3 * per_minute + 0.7 * self._ewma
+        return self._ewma
+
+    def update(self, now, metrics):
+        """Feed one sample; returns "ALERT", "RESOLVED" or None"""
+        value = self._value(now, metrics[self.metric])
+        if value is None:
+            return None
+        self.value = value
+        if self.firing:
+            changing = value >= self.clear if self.op == "<" else value <= self.clear
+        else:
+            changing = value < self.threshold if self.op == "<" else value > self.threshold
+        if not changing:
+            self._since = None
+            return None
+        if self._since is None:
+            self._since = now
+        if now - self._since < self.duration:
+            return None
+        self._since = None
+        self.firing = not self.firing
+        return "ALERT" if self.firing else "RESOLVED"
+
+class AlertEngine:
+    """Evaluate rules incrementally over the sample stream and dispatch events to actions"""
+
+    def __init__(self, rules, actions):
+        self.rules = [rule if isinstance(rule, AlertRule) else AlertRule(rule) for rule in rules]
+        self.actions = list(actions)
+
+    def evaluate(self, metrics, now=None):
+        """Feed one sample to every rule; returns the events it produced"""
+        now = time.time() if now is None else now
+        events = []
+        for rule in self.rules:
+            state = rule.update(now, metrics)
+            if state is None:
+                continue
+            unit = "/min" if rule.rate else ""
+            event = {
+                "timestamp": now,
+                "rule": rule.text,
+                "state": state,
+                "metric": rule.metric,
+                "value": round(rule.value, 2),
+                "message": f"{rule.text} (now {rule.value:.1f}{unit})",
+            }
+            events.append(event)
+            for action in self.actions:
+                try:
+                    action(event)
+                except Exception as e:
+                    print(f"❌ Alert action failed: {e}")
+        return events
+
+def log_alert(event):
+    """Alert action: print to the terminal"""
+    icon = "🚨" if event["state"] == "ALERT" else "✅"
+    print(f"{icon} [{time.strftime('%H:%M:%S', time.localtime(event['timestamp']))}] "
+          f"{event['state']}: {event['message']}", flush=True)
+
+def webhook_alert(url, timeout=2.0):
+    """Alert action factory: POST the event as JSON to a (local) webhook"""
+    def post(event):
+        request = urllib.request.Request(
+            url, data=json.dumps(event).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=timeout):
+            pass
+    return post
+
+def dashboard_alert(event):
+    """Alert action: record the event in the dashboard's execution log"""
+    from execution_log import get_execution_log
+    get_execution_log().append("RAM Monitor", event["state"], event["message"])
+
+def watch_ram(interval=2.0, top=10, metric="rss", as_json=False, count=None,
+              engine=None, ring=None, quiet=False):
+    """Print RAM usage and the top-N processes every interval seconds
+
+    Each sample is also fed to the alert engine and appended to the ring file
+    when those are given; quiet=True skips the printing.
+    """
+    previous = {}
+    samples = 0
+    psutil.cpu_percent(interval=None)
+    try:
+        while count is None or samples < count:
+            mem = psutil.virtual_memory()
+            if engine is not None:
+                engine.evaluate(read_memory_metrics(mem))
+            if ring is not None:
+                ring.append(time.time(), mem.total, mem.used, mem.available,
+                            mem.percent, psutil.cpu_percent(interval=None))
+            if not quiet:
+                current = snapshot_processes(metric) if top else {}
+                rows = top_processes(current, previous, top, metric)
+                if as_json:
+                    print(json.dumps({
+                        "timestamp": time.time(),
+                        "total": mem.total,
+                        "available": mem.available,
+                        "used": mem.used,
+                        "percent": mem.percent,
+                        "top": rows,
+                    }), flush=True)
+                else:
+                    print_watch_sample(mem, rows, metric)
+                previous = current
+            samples += 1
+            if count is None or samples < count:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ring is not None:
+            ring.close()
+
+def serve_metrics(port, interval):
+    """Serve host CPU/RAM as Prometheus metrics until interrupted"""
+    from metrics_exporter import register_host_metrics, start_exporter
+    from system_metrics import get_sampler
+
+    register_host_metrics(get_sampler(interval=interval))
+    start_exporter(port)
+    print(f"✅ Serving metrics on http://0.0.0.0:{port}/metrics (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check system memory usage")
+    parser.add_argument("--interval", type=float, default=2.0,
+                        help="seconds between samples (default 2)")
+    parser.add_argument("--exporter", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on PORT instead of printing once")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep printing samples every --interval seconds")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of processes to show in watch mode (0 to disable)")
+    parser.add_argument("--sort", choices=["rss", "uss"], default="rss",
+                        help="process memory metric; uss is more accurate but slower")
+    parser.add_argument("--json", action="store_true",
+                        help="print one JSON object per sample instead of a table")
+    parser.add_argument("--count", type=int,
+                        help="stop after this many samples in watch mode")
+    parser.add_argument("--alert", action="append", default=[], metavar="RULE",
+                        help='alert rule, e.g. "available_percent < 10 for 30s" or '
+                             '"swap_used_mb rate > 100 for 1m" (repeatable)')
+    parser.add_argument("--alert-webhook", metavar="URL",
+                        help="POST alert events as JSON to this URL")
+    parser.add_argument("--alert-dashboard", action="store_true",
+                        help="record alert events in the dashboard's execution log")
+    parser.add_argument("--history-file", metavar="PATH",
+                        help="also record every sample in a fixed-size binary ring file")
+    parser.add_argument("--history-days", type=float, default=7.0,
+                        help="days of samples a new ring file holds (default 7)")
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error("--interval must be greater than 0")
+    if args.history_days <= 0:
+        parser.error("--history-days must be greater than 0")
+    return args
+
 if __name__ == "__main__":
-    get_ram_info() 
\ No newline at end of file
+    args = parse_args()
+    if args.exporter:
+        serve_metrics(args.exporter, args.interval)
+    else:
+        engine = None
+        if args.alert:
+            actions = [log_alert]
+            if args.alert_webhook:
+                actions.append(webhook_alert(args.alert_webhook))
+            if args.alert_dashboard:
+                actions.append(dashboard_alert)
+            try:
+                engine = AlertEngine(args.alert, actions)
+            except ValueError as e:
+                raise SystemExit(f"❌ {e}")
+        ring = None
+        if args.history_file:
+            from system_metrics import RingFile
+            capacity = max(1, int(args.history_days * 86400 / args.interval))
+            try:
+                ring = RingFile(args.history_file, capacity=capacity, writable=True)
+            except (OSError, ValueError) as e:
+                raise SystemExit(f"❌ Cannot open history file: {e}")
+            print(f"💾 Recording to {args.history_file} "
+                  f"({ring.capacity} samples, {RingFile.size_for(ring.capacity) / (1024**2):.1f} MB)")
+        if args.watch or engine or ring:
+            watch_ram(args.interval, args.top, args.sort, args.json, args.count,
+                      engine=engine, ring=ring, quiet=not args.watch)
+        else:
+            get_ram_info()
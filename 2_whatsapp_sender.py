@@ -3,25 +3,120 @@
 WhatsApp Message Sender - Send scheduled WhatsApp messages
 """
 
-import pywhatkit
+from datetime import datetime
 
-def send_whatsapp_message():
+from message_scheduler import MessageScheduler, parse_send_time, schedule_items
+from recipients import RecipientStats, load_recipients, normalize_phone
+
+
+def print_result(entry, state, error):
+    """Report each message as the scheduler fires it"""
+    if state == "sent":
+        print(f"✅ Sent to {entry['recipient']}")
+    else:
+        print(f"❌ {entry['recipient']}: {state} {error}")
+
+
+def run_scheduler(scheduler):
+    """Fire queued messages at their due times until interrupted"""
+    pending = scheduler.pending()
+    if not pending:
+        print("No messages are scheduled.")
+        return
+    print(f"\n{len(pending)} message(s) queued, next at "
+          f"{datetime.fromtimestamp(pending[0]['due']):%Y-%m-%d %H:%M}.")
+    print("WhatsApp Web will open at each scheduled time. Press Ctrl+C to stop; "
+          "unsent messages stay queued for the next run.")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped with {len(scheduler.pending())} message(s) still queued.")
+
+
+def send_whatsapp_message(scheduler):
     """Send a WhatsApp message at a specific time"""
     print("=== WhatsApp Message Sender ===")
-    
-    number = input("Enter phone number (with country code, e.g., +91xxxxxxxxxx): ")
+
+    number = normalize_phone(input("Enter phone number (with country code, e.g., +91xxxxxxxxxx): "))
+    if number is None:
+        print("❌ Not a valid phone number with country code.")
+        return
     message = input("Enter your message: ")
-    
+
     print("\nEnter the time to send the message:")
     hour = int(input("Hour (24-hour format, 0-23): "))
     minute = int(input("Minute (0-59): "))
-    
+
     try:
-        pywhatkit.sendwhatmsg(number, message, hour, minute)
-        print("✅ Message scheduled successfully!")
-        print("Note: WhatsApp Web will open automatically at the scheduled time.")
+        due = parse_send_time(f"{hour:02d}:{minute:02d}")
+        scheduler.schedule(number, message, due)
+        print(f"✅ Message scheduled for {datetime.fromtimestamp(due):%Y-%m-%d %H:%M}!")
     except Exception as e:
         print(f"❌ Error: {e}")
+        return
+    if (input("Wait here and send it at that time? (Y/n): ") or "y").lower() == "y":
+        run_scheduler(scheduler)
+
+
+def schedule_from_file(scheduler):
+    """Queue many messages from a CSV file"""
+    print("=== Schedule WhatsApp Messages from a File ===")
+
+    recipients_file = input("Recipient file (CSV with 'phone' and optional 'message' and 'send_at' columns): ")
+    message = input("Message for rows without a 'message' column ({column} placeholders allowed, Enter to skip): ")
+    send_at = input("Time for rows without a 'send_at' column (HH:MM or YYYY-MM-DD HH:MM, Enter to skip): ")
+
+    recipients = RecipientStats()
+    try:
+        ids = scheduler.schedule_many(schedule_items(load_recipients(recipients_file, key="phone", stats=recipients),
+                                                     message or None, send_at or None))
+        print(f"✅ Scheduled {len(ids)} message(s) ({recipients.summary()}).")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return
+    if (input("Wait here and send them at their times? (Y/n): ") or "y").lower() == "y":
+        run_scheduler(scheduler)
+
+
+def list_scheduled(scheduler):
+    """Show queued messages and optionally cancel one"""
+    pending = scheduler.pending()
+    if not pending:
+        print("No messages are scheduled.")
+        return
+    for entry in pending[:50]:
+        print(f"#{entry['id']}  {datetime.fromtimestamp(entry['due']):%Y-%m-%d %H:%M}  "
+              f"{entry['recipient']}  {entry['message'][:40]}")
+    if len(pending) > 50:
+        print(f"... and {len(pending) - 50} more")
+    while True:
+        cancel = input("ID to cancel (Enter to keep all): ").strip()
+        if not cancel:
+            return
+        try:
+            message_id = int(cancel.lstrip("#"))
+        except ValueError:
+            print(f"❌ {cancel!r} is not a message ID; enter a number such as {pending[0]['id']}.")
+            continue
+        if scheduler.cancel(message_id):
+            print("✅ Cancelled.")
+        else:
+            print("❌ No pending message with that ID.")
+        return
+
 
 if __name__ == "__main__":
-    send_whatsapp_message() 
\ No newline at end of file
+    scheduler = MessageScheduler(on_result=print_result)
+    print("1. Schedule a message")
+    print("2. Schedule messages from a file")
+    print("3. Send queued messages (run the scheduler)")
+    print("4. List or cancel queued messages")
+    choice = input("Choose option (1-4, default 1): ") or "1"
+    if choice == "2":
+        schedule_from_file(scheduler)
+    elif choice == "3":
+        run_scheduler(scheduler)
+    elif choice == "4":
+        list_scheduled(scheduler)
+    else:
+        send_whatsapp_message(scheduler)
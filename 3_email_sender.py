@@ -3,11 +3,32 @@
 Email Sender - Send emails using SMTP
 """
 
+import itertools
+import os
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import getpass
 
+from mailer import (Attachment, MessageTemplate, SMTPSession, build_message, close_attachments, measure_build,
+                    read_body, send_bulk)
+from recipients import RecipientStats, load_recipients, normalize_email
+
+def read_attachment_paths():
+    """Ask for attachment paths; returns the ones that exist"""
+    answer = input("Attachment paths (comma-separated, Enter for none): ")
+    paths = []
+    for path in (p.strip().strip('"') for p in answer.split(",")):
+        if not path:
+            continue
+        if os.path.isfile(path):
+            paths.append(os.path.abspath(path))
+        else:
+            print(f"❌ Skipping missing file: {path}")
+    return paths
+
+def read_attachments():
+    """Attachments to stream into every message; each is encoded once and shared"""
+    return [Attachment(path) for path in read_attachment_paths()]
+
 def send_email():
     """Send an email using Gmail SMTP"""
     print("=== Email Sender ===")
@@ -15,34 +36,286 @@ def send_email():
     sender_email = input("Enter your email address: ")
     sender_password = getpass.getpass("Enter your app password (hidden): ")
     receiver_email = input("Enter receiver's email address: ")
+    if normalize_email(receiver_email) is None:
+        print(f"❌ {receiver_email!r} is not a valid email address.")
+        return
     subject = input("Enter email subject: ")
-    print("Enter email body (press Enter twice to finish):")
-    
-    body_lines = []
-    while True:
-        line = input()
-        if line == "":
-            break
-        body_lines.append(line)
-    body = "\n".join(body_lines)
-    
-    try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = receiver_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
+    body = read_body()
+    attachments = [Attachment(path, cache=False) for path in read_attachment_paths()]
+    
+    try:
+        # Create message; attachments are streamed while sending
+        msg = build_message(sender_email, receiver_email, subject, body, attachments=attachments)
         
         # Send email
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, receiver_email, msg.as_string())
+        with SMTPSession("smtp.gmail.com", 587, sender_email, sender_password) as session:
+            session.send(msg)
         
         print("✅ Email sent successfully!")
     except Exception as e:
         print(f"❌ Error sending email: {e}")
+    finally:
+        close_attachments(attachments)
+
+def send_bulk_emails():
+    """Send the same email to every recipient in a CSV/JSONL/text file over reused connections"""
+    print("=== Bulk Email Sender ===")
+    
+    sender_email = input("Enter your email address: ")
+    sender_password = getpass.getpass("Enter your app password (hidden): ")
+    recipients_file = input("Recipient file (CSV with an 'email' column, JSONL, or one address per line): ")
+    subject = input("Enter email subject: ")
+    body = read_body()
+    attachments = read_attachments()
+    host = input("SMTP host (default smtp.gmail.com): ") or "smtp.gmail.com"
+    try:
+        port = int(input("SMTP port (default 587): ") or "587")
+        connections = int(input("Parallel connections (default 1): ") or "1")
+        per_session = int(input("Max messages per connection (default 100): ") or "100")
+    except ValueError:
+        port, connections, per_session = 587, 1, 100
+        print("Invalid number. Using port 587, 1 connection, 100 messages per connection.")
+    
+    def make_session():
+        return SMTPSession(host, port, sender_email, sender_password, max_per_session=per_session)
+    
+    def progress(result):
+        print(f"\rSent {result.sent}, failed {result.failed}", end="", flush=True)
+    
+    recipients = RecipientStats()
+    try:
+        result = send_bulk(
+            load_recipients(recipients_file, stats=recipients),
+            lambda row: build_message(sender_email, row["email"], subject, body, attachments=attachments),
+            make_session,
+            connections=connections,
+            on_progress=progress,
+        )
+        print()
+        print(f"✅ Sent {result.sent} emails over {result.connections} connection(s) "
+              f"in {result.elapsed:.1f}s ({result.rate:.1f}/s)")
+        print(f"   Recipients: {recipients.summary()}")
+        for email, error in result.errors[:10]:
+            print(f"❌ {email}: {error}")
+        if result.aborted:
+            print(f"❌ Stopped early: {result.aborted}")
+    except Exception as e:
+        print(f"\n❌ Error sending emails: {e}")
+    finally:
+        close_attachments(attachments)
+
+def send_campaign_emails():
+    """Send a large campaign with asyncio: capped sessions, rate limit, latency report"""
+    from async_mailer import Account, run_campaign
+    
+    print("=== Email Campaign (asyncio) ===")
+    
+    sender_email = input("Enter your email address: ")
+    sender_password = getpass.getpass("Enter your app password (hidden): ")
+    recipients_file = input("Recipient file (CSV with an 'email' column, JSONL, or one address per line): ")
+    subject = input("Enter email subject: ")
+    body = read_body()
+    attachments = read_attachments()
+    host = input("SMTP host (default smtp.gmail.com): ") or "smtp.gmail.com"
+    try:
+        port = int(input("SMTP port (default 587): ") or "587")
+        sessions = int(input("Concurrent sessions (default 4): ") or "4")
+        per_hour = float(input("Max messages per hour for this account (default 0 = unlimited): ") or "0")
+    except ValueError:
+        port, sessions, per_hour = 587, 4, 0
+        print("Invalid number. Using port 587, 4 sessions, no rate limit.")
+    
+    account = Account(
+        sender_email,
+        lambda: SMTPSession(host, port, sender_email, sender_password),
+        rate=per_hour / 3600 if per_hour else None,
+    )
+    
+    def progress(stats):
+        if (stats.sent + stats.failed) % 50 == 0:
+            print(f"\rSent {stats.sent}, failed {stats.failed}", end="", flush=True)
+    
+    recipients = RecipientStats()
+    try:
+        stats = run_campaign(
+            load_recipients(recipients_file, stats=recipients),
+            lambda row: build_message(sender_email, row["email"], subject, body, attachments=attachments),
+            [account],
+            sessions=sessions,
+            on_progress=progress,
+        )
+        print()
+        print(f"✅ {stats.report()}")
+        print(f"   Recipients: {recipients.summary()}")
+        for email, error in stats.errors[:10]:
+            print(f"❌ {email}: {error}")
+        if stats.aborted:
+            print(f"❌ Stopped early: {stats.aborted}")
+    except Exception as e:
+        print(f"\n❌ Error running campaign: {e}")
+    finally:
+        close_attachments(attachments)
+
+def send_merge_emails():
+    """Mail merge: personalize subject and body per recipient from CSV columns"""
+    print("=== Mail Merge ===")
+    print("Use {column} placeholders, e.g. 'Hi {first_name}' with a first_name column in the CSV.")
+    
+    sender_email = input("Enter your email address: ")
+    sender_password = getpass.getpass("Enter your app password (hidden): ")
+    recipients_file = input("Recipient CSV (needs an 'email' column): ")
+    try:
+        template = MessageTemplate(input("Enter subject template: "), read_body(), attachments=read_attachments())
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    try:
+        merge_and_send(template, sender_email, sender_password, recipients_file)
+    finally:
+        close_attachments(template.attachments)
+
+def merge_and_send(template, sender_email, sender_password, recipients_file):
+    """Preview the merge for the first recipient, then send it to all of them"""
+    recipients = RecipientStats()
+    rows = load_recipients(recipients_file, stats=recipients)
+    try:
+        first = next(rows)
+    except StopIteration:
+        print("❌ No recipients found.")
+        return
+    missing = template.missing_fields(first)
+    if missing:
+        print(f"❌ Recipient file has no column for: {', '.join(missing)}")
+        return
+    
+    preview = template.build(sender_email, first)
+    print(f"\n--- Preview for {first['email']} ---")
+    print(f"Subject: {preview['Subject']}")
+    print(template.render(first)[1])
+    cost = measure_build(lambda row: template.build(sender_email, row), [first] * (5 if template.attachments else 50))
+    print(f"--- Building each message takes ~{cost['cpu_us']:.0f} µs CPU, "
+          f"~{cost['alloc_kb']:.1f} KB peak memory ---")
+    if (input("Send to all recipients? (y/N): ") or "n").lower() != "y":
+        print("Cancelled.")
+        return
+    
+    host = input("SMTP host (default smtp.gmail.com): ") or "smtp.gmail.com"
+    try:
+        port = int(input("SMTP port (default 587): ") or "587")
+        connections = int(input("Parallel connections (default 1): ") or "1")
+    except ValueError:
+        port, connections = 587, 1
+        print("Invalid number. Using port 587 and 1 connection.")
+    
+    def progress(result):
+        print(f"\rSent {result.sent}, failed {result.failed}", end="", flush=True)
+    
+    try:
+        result = send_bulk(
+            itertools.chain([first], rows),
+            lambda row: template.build(sender_email, row),
+            lambda: SMTPSession(host, port, sender_email, sender_password),
+            connections=connections,
+            on_progress=progress,
+        )
+        print()
+        print(f"✅ Sent {result.sent} personalized emails in {result.elapsed:.1f}s ({result.rate:.1f}/s)")
+        print(f"   Recipients: {recipients.summary()}")
+        for email, error in result.errors[:10]:
+            print(f"❌ {email}: {error}")
+        if result.aborted:
+            print(f"❌ Stopped early: {result.aborted}")
+    except Exception as e:
+        print(f"\n❌ Error sending emails: {e}")
+
+def send_outbox_emails():
+    """Resumable campaign: every recipient's state is kept in the outbox database"""
+    from outbox import Outbox, describe_counts, is_retryable, run_outbox
+    
+    print("=== Resumable Email Campaign ===")
+    
+    outbox = Outbox()
+    name = input("Campaign name (enter an existing name to resume it): ")
+    campaign = outbox.campaign(name)
+    if campaign is None:
+        recipients_file = input("Recipient file (CSV with an 'email' column, JSONL, or one address per line): ")
+        meta = {
+            "sender": input("Enter your email address: "),
+            "source": os.path.abspath(recipients_file),
+            "subject": input("Enter email subject ({column} placeholders allowed): "),
+            "body": read_body(),
+            "attachments": read_attachment_paths(),
+            "host": input("SMTP host (default smtp.gmail.com): ") or "smtp.gmail.com",
+        }
+        try:
+            meta["port"] = int(input("SMTP port (default 587): ") or "587")
+        except ValueError:
+            meta["port"] = 587
+            print("Invalid port. Using 587.")
+        campaign = outbox.create_campaign(name, "email", meta)
+    elif campaign["channel"] != "email":
+        print(f"❌ Campaign '{name}' is a {campaign['channel']} campaign.")
+        return
+    else:
+        print(f"Resuming '{name}': {describe_counts(outbox.counts(name))}")
+        unknown = outbox.recover(name)
+        if unknown:
+            print(f"⚠️ {unknown} message(s) were in flight when the last run stopped; "
+                  f"they are marked unknown and will not be re-sent.")
+    meta = campaign["meta"]
+    
+    try:
+        attachments = [Attachment(path) for path in meta.get("attachments", [])]
+        template = MessageTemplate(meta["subject"], meta["body"], attachments=attachments)
+        recipients = RecipientStats()
+        added = outbox.load(name, load_recipients(meta["source"], stats=recipients))
+        if added:
+            print(f"Queued {added} recipients ({recipients.summary()}).")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error loading recipients: {e}")
+        return
+    
+    password = getpass.getpass("Enter your app password (hidden): ")
+    session = SMTPSession(meta["host"], meta["port"], meta["sender"], password)
+    
+    def send(row):
+        session.send(template.build(meta["sender"], row))
+    
+    def progress(message):
+        print(f"\rLast: {message['key']:<40}", end="", flush=True)
+    
+    try:
+        counts = run_outbox(
+            outbox, name, send, on_progress=progress,
+            retryable=lambda e: is_retryable(e) and not isinstance(e, smtplib.SMTPRecipientsRefused),
+        )
+        print()
+        print(f"✅ Campaign '{name}' finished: {describe_counts(counts)}")
+        for key, error in outbox.errors(name):
+            print(f"❌ {key}: {error}")
+    except KeyboardInterrupt:
+        print(f"\nStopped. Run again with the same name to resume: {describe_counts(outbox.counts(name))}")
+    except Exception as e:
+        print(f"\n❌ Campaign stopped: {e}")
+    finally:
+        session.close()
+        outbox.close()
+        close_attachments(attachments)
 
 if __name__ == "__main__":
-    send_email() 
\ No newline at end of file
+    print("1. Send a single email")
+    print("2. Bulk send from a recipient file")
+    print("3. Large campaign (asyncio, rate limited)")
+    print("4. Mail merge (personalized from CSV columns)")
+    print("5. Resumable campaign (survives crashes, retries failures)")
+    choice = input("Choose option (1-5, default 1): ") or "1"
+    if choice == "2":
+        send_bulk_emails()
+    elif choice == "3":
+        send_campaign_emails()
+    elif choice == "4":
+        send_merge_emails()
+    elif choice == "5":
+        send_outbox_emails()
+    else:
+        send_email()
@@ -4,24 +4,26 @@ WhatsApp Web Opener - Open WhatsApp Web with pre-filled message
 """
 
 import webbrowser
-import urllib.parse
+
+from mailer import read_recipients
+from recipients import normalize_phone
+from whatsapp_links import chat_link, generate_links
 
 def open_whatsapp_web():
     """Open WhatsApp Web with a pre-filled message"""
     print("=== WhatsApp Web Opener ===")
-    
+
     phone_number = input("Enter phone number (with country code, e.g., +91xxxxxxxxxx): ")
     message = input("Enter your message: ")
-    
-    # Remove + from phone number if present
-    phone_number = phone_number.replace("+", "")
-    
-    # URL encode the message
-    encoded_message = urllib.parse.quote(message)
-    
-    # Create WhatsApp URL
-    url = f"https://wa.me/{phone_number}?text={encoded_message}"
-    
+
+    phone = normalize_phone(phone_number)
+    if phone is None:
+        print(f"❌ {phone_number!r} is not a valid phone number with country code.")
+        return
+
+    # Create WhatsApp URL with the message URL-encoded
+    url = chat_link(phone, message)
+
     try:
         webbrowser.open(url)
         print("✅ WhatsApp Web opened successfully!")
@@ -29,5 +31,41 @@ def open_whatsapp_web():
     except Exception as e:
         print(f"❌ Error opening WhatsApp Web: {e}")
 
+def generate_bulk_links():
+    """Write chat links (and optional QR codes) for a contact file"""
+    print("=== Bulk WhatsApp Links ===")
+
+    contacts_file = input("Contact file (CSV with a 'phone' column, or one number per line): ")
+    message = input("Pre-filled message ({column} placeholders allowed, Enter for none): ")
+    default_country = input("Country code for numbers without one (e.g., 91, Enter to require it): ").strip()
+    qr = (input("Also create QR code images? (y/N): ") or "n").lower() == "y"
+    output = input(f"Output file (default whatsapp_links.{'zip' if qr else 'csv'}): ") or \
+        f"whatsapp_links.{'zip' if qr else 'csv'}"
+
+    def progress(result):
+        print(f"  {result.links} links, {result.invalid} invalid, {result.duplicates} duplicates", end="\r")
+
+    try:
+        result = generate_links(read_recipients(contacts_file, key="phone"), output, message,
+                                default_country=default_country or None, qr=qr, on_progress=progress)
+    except ImportError:
+        print("❌ QR codes need the qrcode package: pip install qrcode")
+        return
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        return
+    print(f"\n✅ Wrote {result.links} links to {output} in {result.elapsed:.1f}s "
+          f"({result.invalid} invalid, {result.duplicates} duplicates skipped)")
+    if result.qr_codes:
+        print(f"   {result.qr_codes} QR codes in the qr/ folder of the archive")
+    if result.invalid_samples:
+        print(f"   Invalid numbers include: {', '.join(result.invalid_samples[:5])}")
+
 if __name__ == "__main__":
-    open_whatsapp_web() 
\ No newline at end of file
+    print("1. Open one chat")
+    print("2. Generate links for a contact file")
+    choice = input("Choose option (1-2, default 1): ") or "1"
+    if choice == "2":
+        generate_bulk_links()
+    else:
+        open_whatsapp_web()
@@ -5,6 +5,28 @@ SMS Sender - Send SMS using Twilio API
 
 from twilio.rest import Client
 import getpass
+import os
+
+from mailer import TextTemplate
+from outbox import Outbox, describe_counts, run_outbox
+from recipients import RecipientStats, load_recipients, normalize_phone
+from sms_segments import analyze, describe, make_gsm_safe, score_campaign
+
+DEFAULT_PRICE = 0.0079  # USD per segment, US long code
+
+def check_segments(text):
+    """Show the encoding and segment count; offer a GSM-7 safe version when it saves segments"""
+    info = analyze(text)
+    print(f"📏 {describe(info, DEFAULT_PRICE)}")
+    if not info.non_gsm:
+        return text
+    safe_text = make_gsm_safe(text)
+    safe = analyze(safe_text)
+    if safe.segments < info.segments or safe.encoding != info.encoding:
+        print(f"💡 Replacing {info.non_gsm!r} gives: {describe(safe, DEFAULT_PRICE)}")
+        if (input("Use the GSM-7 safe version? (Y/n): ") or "y").lower() == "y":
+            return safe_text
+    return text
 
 def send_sms():
     """Send SMS using Twilio"""
@@ -14,8 +36,11 @@ def send_sms():
     account_sid = input("Enter your Twilio Account SID: ")
     auth_token = getpass.getpass("Enter your Twilio Auth Token (hidden): ")
     from_number = input("Enter your Twilio phone number (e.g., +1234567890): ")
-    to_number = input("Enter recipient's phone number (e.g., +1234567890): ")
-    message_body = input("Enter your message: ")
+    to_number = normalize_phone(input("Enter recipient's phone number (e.g., +1234567890): "))
+    if to_number is None:
+        print("❌ Not a valid phone number with country code.")
+        return
+    message_body = check_segments(input("Enter your message: "))
     
     try:
         client = Client(account_sid, auth_token)
@@ -29,5 +54,140 @@ def send_sms():
     except Exception as e:
         print(f"❌ Error sending SMS: {e}")
 
+def send_outbox_sms():
+    """Resumable bulk SMS: every recipient's state is kept in the outbox database"""
+    print("=== Resumable SMS Campaign (Twilio) ===")
+    
+    outbox = Outbox()
+    name = input("Campaign name (enter an existing name to resume it): ")
+    campaign = outbox.campaign(name)
+    if campaign is None:
+        recipients_file = input("Recipient file (CSV with a 'phone' column, or one number per line): ")
+        meta = {
+            "account_sid": input("Enter your Twilio Account SID: "),
+            "from_number": input("Enter your Twilio phone number (e.g., +1234567890): "),
+            "source": os.path.abspath(recipients_file),
+            "body": input("Enter your message ({column} placeholders allowed): "),
+        }
+        campaign = outbox.create_campaign(name, "sms", meta)
+    elif campaign["channel"] != "sms":
+        print(f"❌ Campaign '{name}' is a {campaign['channel']} campaign.")
+        return
+    else:
+        print(f"Resuming '{name}': {describe_counts(outbox.counts(name))}")
+        unknown = outbox.recover(name)
+        if unknown:
+            print(f"⚠️ {unknown} message(s) were in flight when the last run stopped; "
+                  f"they are marked unknown and will not be re-sent.")
+    meta = campaign["meta"]
+    
+    try:
+        template = TextTemplate(meta["body"])
+        recipients = RecipientStats()
+        added = outbox.load(name, load_recipients(meta["source"], key="phone", stats=recipients), key="phone")
+        if added:
+            print(f"Queued {added} recipients ({recipients.summary()}).")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error loading recipients: {e}")
+        return
+    
+    auth_token = getpass.getpass("Enter your Twilio Auth Token (hidden): ")
+    client = Client(meta["account_sid"], auth_token)
+    
+    def send(row):
+        message = client.messages.create(body=template.render(row), from_=meta["from_number"], to=row["phone"])
+        return message.sid
+    
+    try:
+        counts = run_outbox(outbox, name, send)
+        print(f"✅ Campaign '{name}' finished: {describe_counts(counts)}")
+        for key, error in outbox.errors(name):
+            print(f"❌ {key}: {error}")
+    except KeyboardInterrupt:
+        print(f"\nStopped. Run again with the same name to resume: {describe_counts(outbox.counts(name))}")
+    except Exception as e:
+        print(f"❌ Campaign stopped: {e}")
+    finally:
+        outbox.close()
+
+def send_bulk_sms():
+    """Fast bulk SMS: one HTTP session, a worker pool and a rate limit per sender number"""
+    from sms_bulk import TwilioBulkSender
+    
+    print("=== Bulk SMS (Twilio) ===")
+    
+    account_sid = input("Enter your Twilio Account SID: ")
+    auth_token = getpass.getpass("Enter your Twilio Auth Token (hidden): ")
+    from_numbers = input("Your Twilio number(s), comma-separated (e.g., +1234567890,+1987654321): ").split(",")
+    recipients_file = input("Recipient file (CSV with a 'phone' column, or one number per line): ")
+    message_body = input("Enter your message ({column} placeholders allowed): ")
+    recipients = RecipientStats()
+    try:
+        # Streamed: scored here, then read again with the same cleaning when sending
+        score = score_campaign(load_recipients(recipients_file, key="phone", stats=recipients), message_body)
+        print(f"Recipients: {recipients.summary()}")
+        print(score.report(DEFAULT_PRICE))
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading recipients: {e}")
+        return
+    gsm_safe = False
+    if score.safe_segments < score.segments:
+        gsm_safe = (input("Replace characters outside GSM-7 before sending? (Y/n): ") or "y").lower() == "y"
+    try:
+        rate = float(input("Messages per second per number (default 1): ") or "1")
+        workers = int(input("Parallel requests (default 4): ") or "4")
+    except ValueError:
+        rate, workers = 1.0, 4
+        print("Invalid number. Using 1 message/second per number and 4 parallel requests.")
+    
+    def progress(result):
+        print(f"\rSent {result.sent}, failed {result.failed}", end="", flush=True)
+    
+    try:
+        with TwilioBulkSender(account_sid, auth_token, from_numbers, rate=rate, workers=workers) as sender:
+            result = sender.send(load_recipients(recipients_file, key="phone"), message_body,
+                                 gsm_safe=gsm_safe, on_progress=progress)
+        print()
+        print(f"✅ Sent {result.sent} SMS in {result.elapsed:.1f}s ({result.rate:.1f} msg/s, "
+              f"{result.throttled} throttled)")
+        for phone, error in result.errors[:10]:
+            print(f"❌ {phone}: {error}")
+        if result.aborted:
+            print(f"❌ Stopped early: {result.aborted}")
+    except Exception as e:
+        print(f"\n❌ Error sending SMS: {e}")
+
+def score_sms_campaign():
+    """Estimate encoding, segments and cost for every message of a campaign file"""
+    print("=== SMS Campaign Score ===")
+    
+    recipients_file = input("Recipient file (CSV with a 'phone' column, or one number per line): ")
+    message_body = input("Enter your message ({column} placeholders allowed): ")
+    try:
+        price = float(input(f"Price per segment in USD (default {DEFAULT_PRICE}): ") or DEFAULT_PRICE)
+    except ValueError:
+        price = DEFAULT_PRICE
+        print(f"Invalid price. Using {DEFAULT_PRICE}.")
+    
+    recipients = RecipientStats()
+    try:
+        score = score_campaign(load_recipients(recipients_file, key="phone", stats=recipients), message_body)
+        print(f"Recipients: {recipients.summary()}")
+        print(score.report(price))
+    except (OSError, ValueError) as e:
+        print(f"❌ Error scoring campaign: {e}")
+
 if __name__ == "__main__":
-    send_sms() 
\ No newline at end of file
+    print("1. Send a single SMS")
+    print("2. Resumable bulk SMS (survives crashes, retries failures)")
+    print("3. Fast bulk SMS (parallel, rate limited per number)")
+    print("4. Score a campaign file (segments and cost)")
+    choice = input("Choose option (1-4, default 1): ") or "1"
+    if choice == "2":
+        send_outbox_sms()
+    elif choice == "3":
+        send_bulk_sms()
+    elif choice == "4":
+        score_sms_campaign()
+    else:
+        send_sms() 
\ No newline at end of file
@@ -6,6 +6,9 @@ Phone Caller - Make phone calls using Twilio API
 from twilio.rest import Client
 import getpass
 
+from recipients import RecipientStats, load_recipients, normalize_phone
+from voice_campaign import VoiceCampaign, build_twiml
+
 def make_phone_call():
     """Make a phone call using Twilio"""
     print("=== Phone Caller (Twilio) ===")
@@ -14,7 +17,10 @@ def make_phone_call():
     account_sid = input("Enter your Twilio Account SID: ")
     auth_token = getpass.getpass("Enter your Twilio Auth Token (hidden): ")
     from_number = input("Enter your Twilio phone number (e.g., +1234567890): ")
-    to_number = input("Enter recipient's phone number (e.g., +1234567890): ")
+    to_number = normalize_phone(input("Enter recipient's phone number (e.g., +1234567890): "))
+    if to_number is None:
+        print("❌ Not a valid phone number with country code.")
+        return
     
     print("\nChoose message type:")
     print("1. Default message ('Hello from Python!')")
@@ -23,9 +29,9 @@ def make_phone_call():
     
     if choice == "2":
         custom_message = input("Enter your custom message: ")
-        twiml_message = f"<Response><Say>{custom_message}</Say></Response>"
+        twiml_message = build_twiml(custom_message)
     else:
-        twiml_message = "<Response><Say>Hello from Python!</Say></Response>"
+        twiml_message = build_twiml("Hello from Python!")
     
     try:
         client = Client(account_sid, auth_token)
@@ -39,5 +45,47 @@ def make_phone_call():
     except Exception as e:
         print(f"❌ Error making call: {e}")
 
+def run_call_campaign():
+    """Call everyone in a recipient file and report how each call ended"""
+    print("=== Call Campaign (Twilio) ===")
+    
+    account_sid = input("Enter your Twilio Account SID: ")
+    auth_token = getpass.getpass("Enter your Twilio Auth Token (hidden): ")
+    from_number = input("Enter your Twilio phone number (e.g., +1234567890): ")
+    recipients_file = input("Recipient file (CSV with a 'phone' column, or one number per line): ")
+    message = input("Enter the message to speak ({column} placeholders allowed): ")
+    try:
+        cps = float(input("Calls per second (default 1): ") or "1")
+        workers = int(input("Parallel requests (default 4): ") or "4")
+        wait_minutes = float(input("Minutes to wait for call outcomes (default 10, 0 to skip): ") or "10")
+    except ValueError:
+        cps, workers, wait_minutes = 1.0, 4, 10.0
+        print("Invalid number. Using 1 call/second, 4 parallel requests and a 10 minute wait.")
+    
+    def progress(result):
+        print(f"\rPlaced {result.placed}, failed {result.failed}, "
+              f"still running {result.pending()}", end="", flush=True)
+    
+    recipients = RecipientStats()
+    try:
+        with VoiceCampaign(account_sid, auth_token, from_number, cps=cps, workers=workers) as campaign:
+            result = campaign.run(load_recipients(recipients_file, key="phone", stats=recipients), message,
+                                  wait_timeout=wait_minutes * 60, on_progress=progress)
+        print()
+        print(f"✅ Placed {result.placed} calls in {result.dial_elapsed:.1f}s ({result.rate:.2f} calls/s), "
+              f"{result.polls} status request(s)")
+        print(f"   Recipients: {recipients.summary()}")
+        for status, count in sorted(result.outcomes().items()):
+            print(f"   {status}: {count}")
+        for phone, error in result.errors[:10]:
+            print(f"❌ {phone}: {error}")
+    except Exception as e:
+        print(f"\n❌ Error running campaign: {e}")
+
 if __name__ == "__main__":
-    make_phone_call() 
\ No newline at end of file
+    print("1. Make a single call")
+    print("2. Call campaign from a recipient file")
+    if (input("Choose option (1-2, default 1): ") or "1") == "2":
+        run_call_campaign()
+    else:
+        make_phone_call() 
\ No newline at end of file
@@ -3,7 +3,7 @@
 Google Search - Perform Google searches and display results
 """
 
-from googlesearch import search
+from search_cache import SearchCache
 
 def google_search():
     """Perform a Google search and display results"""
@@ -17,11 +17,19 @@ def google_search():
     except ValueError:
         num_results = 5
     
+    refresh = (input("Use cached results when available? (Y/n): ") or "y").lower() != "y"
+    
     print(f"\nSearching for: '{query}'")
     print("=" * 50)
     
     try:
-        results = list(search(query, num_results=num_results))
+        cache = SearchCache()
+        try:
+            results = cache.search(query, num_results, refresh=refresh)
+        finally:
+            cache.close()
+        if results.source != "fetched":
+            print(f"(cached results from {results.age / 60:.0f} min ago)")
         
         if results:
             for i, result in enumerate(results, 1):
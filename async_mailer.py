@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Async Mailer - asyncio campaign engine with bounded sessions, per-account rate limits
+and backpressure from a streaming recipient source
+"""
+
+import asyncio
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from mailer import session_fatal
+from rate_limit import AsyncTokenBucket
+
+
+class Account:
+    """A sender account: how to open its SMTP sessions and how fast it may send"""
+
+    def __init__(self, name, session_factory, rate=None, burst=None):
+        self.name = name
+        self.session_factory = session_factory
+        # rate is messages per second; None means unlimited
+        self.limiter = AsyncTokenBucket(rate, burst) if rate else None
+
+
+class CampaignStats:
+    """Throughput and latency figures for a finished campaign"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.errors = []
+        self.aborted = None
+        self.elapsed = 0.0
+        self.latencies = array("d")
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        """Latency percentile in seconds (nearest rank)"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def report(self):
+        return (f"Sent {self.sent}, failed {self.failed} in {self.elapsed:.1f}s "
+                f"({self.rate:.1f}/s, {self.rate * 3600:.0f}/h). "
+                f"Latency p50 {self.percentile(50) * 1000:.0f} ms, "
+                f"p90 {self.percentile(90) * 1000:.0f} ms, "
+                f"p99 {self.percentile(99) * 1000:.0f} ms")
+
+
+async def send_campaign(rows, make_message, accounts, sessions=4, queue_size=None, on_progress=None):
+    """Send one message per row from `sessions` concurrent workers
+
+    Each worker keeps one SMTP session open per account it sends from.
+
+    Rows are pulled from `rows` only as fast as workers free up queue space,
+    so a large recipient file is never loaded whole. A row's `account` column
+    picks the sender account (the first account by default); each account's
+    token bucket caps its send rate across all sessions. The blocking
+    smtplib calls run on a thread pool sized to the session count, so the
+    event loop only coordinates. A failed login or connection stops the
+    campaign (`stats.aborted` says why) instead of retrying it per row.
+    """
+    accounts = list(accounts)
+    by_name = {account.name: account for account in accounts}
+    stats = CampaignStats()
+    work = asyncio.Queue(maxsize=queue_size or sessions * 4)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="smtp")
+    started = time.perf_counter()
+
+    async def worker():
+        open_sessions = {}
+        try:
+            while True:
+                row = await work.get()
+                if row is None:
+                    break
+                # After an abort the queue is still drained, so the producer never blocks
+                if stats.aborted is not None:
+                    continue
+                account = by_name.get(row.get("account"), accounts[0])
+                session = open_sessions.get(account.name)
+                msg = None
+                try:
+                    msg = make_message(row)
+                    if session is None:
+                        session = open_sessions[account.name] = account.session_factory()
+                    if account.limiter is not None:
+                        await account.limiter.acquire()
+                    sent_at = time.perf_counter()
+                    await loop.run_in_executor(executor, session.send, msg)
+                    stats.latencies.append(time.perf_counter() - sent_at)
+                    stats.sent += 1
+                except Exception as e:
+                    if msg is not None and session_fatal(e, session):
+                        if stats.aborted is None:
+                            stats.aborted = f"{account.name}: {e}"
+                        continue
+                    stats.failed += 1
+                    stats.errors.append((row.get("email"), str(e)))
+                if on_progress is not None:
+                    on_progress(stats)
+        finally:
+            for session in open_sessions.values():
+                await loop.run_in_executor(executor, session.close)
+
+    workers = [asyncio.create_task(worker()) for _ in range(sessions)]
+    try:
+        for row in rows:
+            if stats.aborted is not None:
+                break
+            await work.put(row)
+        for _ in workers:
+            await work.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        executor.shutdown(wait=False)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def run_campaign(rows, make_message, accounts, sessions=4, queue_size=None, on_progress=None):
+    """Synchronous wrapper around send_campaign for scripts and worker threads"""
+    return asyncio.run(send_campaign(rows, make_message, accounts, sessions, queue_size, on_progress))
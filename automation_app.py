@@ -5,13 +5,17 @@ Comprehensive Streamlit dashboard for managing automation programs
 """
 
 import streamlit as st
-import subprocess
-import sys
 import os
-import json
 import time
+import importlib
 from datetime import datetime
-import psutil
+
+from execution_log import get_execution_log
+from file_index import get_file_index
+from job_runner import get_job_runner, get_task_executor
+from metrics_exporter import record_execution, record_send, register_host_metrics, start_exporter
+from rerun_profiler import RerunProfiler
+from system_metrics import RingFile, get_history, get_sampler
 
 # --------------------------------------
 # Page Configuration
@@ -23,6 +27,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --------------------------------------
+# Rerun Instrumentation
+# --------------------------------------
+# TOOLKIT_PROFILE=1 times every section of each rerun; TOOLKIT_PROFILE=cprofile
+# also collects cProfile stats (written to TOOLKIT_PROFILE_DIR when set)
+PROFILE_MODE = os.environ.get("TOOLKIT_PROFILE", "").lower()
+PROFILE_DIR = os.environ.get("TOOLKIT_PROFILE_DIR")
+profiler = RerunProfiler(
+    enabled=PROFILE_MODE not in ("", "0") or st.session_state.get("profile_reruns", False),
+    use_cprofile=PROFILE_MODE == "cprofile" or st.session_state.get("profile_cprofile", False),
+)
+
 # --------------------------------------
 # Custom CSS
 # --------------------------------------
@@ -66,16 +82,33 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
+profiler.mark("CSS injection")
 
 # --------------------------------------
 # Initialize Session State
 # --------------------------------------
-if 'execution_log' not in st.session_state:
-    st.session_state.execution_log = []
+if 'log_cleared_at' not in st.session_state:
+    st.session_state.log_cleared_at = ""
 
 if 'program_status' not in st.session_state:
     st.session_state.program_status = {}
 
+if 'action_tasks' not in st.session_state:
+    st.session_state.action_tasks = {}
+
+# Program scripts live next to this dashboard
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Seconds between background CPU/RAM samples
+SAMPLE_INTERVAL = float(os.environ.get("TOOLKIT_SAMPLE_INTERVAL", "2"))
+# Maximum number of programs running at once as background jobs
+MAX_JOBS = int(os.environ.get("TOOLKIT_MAX_JOBS", "4"))
+# Threads shared by all sessions for inline network actions (send, fetch, post)
+MAX_ACTIONS = int(os.environ.get("TOOLKIT_MAX_ACTIONS", "8"))
+# Ring file recorded by `1_ram_monitor.py --history-file` (charted when set)
+HISTORY_FILE = os.environ.get("TOOLKIT_HISTORY_FILE")
+# Port for the optional Prometheus /metrics endpoint (disabled when unset)
+METRICS_PORT = os.environ.get("TOOLKIT_METRICS_PORT")
+
 # --------------------------------------
 # Program Configuration
 # --------------------------------------
@@ -88,7 +121,9 @@ PROGRAM_CONFIG = {
                 "description": "Monitor system memory usage",
                 "category": "System",
                 "dependencies": ["psutil"],
-                "requires_input": False
+                "requires_input": False,
+                "renderer": "render_read_ram",
+                "imports": []
             }
         }
     },
@@ -100,42 +135,54 @@ PROGRAM_CONFIG = {
                 "description": "Send scheduled WhatsApp messages",
                 "category": "Communication",
                 "dependencies": ["pywhatkit"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_whatsapp_sender",
+                "imports": ["pywhatkit"]
             },
             "Send Email": {
                 "file": "3_email_sender.py",
                 "description": "Send emails via Gmail SMTP",
                 "category": "Communication", 
                 "dependencies": ["smtplib"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_email_sender",
+                "imports": ["mailer"]
             },
             "Send WhatsApp Without Saving Contact": {
                 "file": "4_whatsapp_web_opener.py",
                 "description": "Open WhatsApp Web with pre-filled message",
                 "category": "Communication",
                 "dependencies": ["webbrowser"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_whatsapp_web_opener",
+                "imports": ["whatsapp_links"]
             },
             "Send SMS": {
                 "file": "5_sms_sender.py",
                 "description": "Send SMS using Twilio API",
                 "category": "Communication",
                 "dependencies": ["twilio"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_sms_sender",
+                "imports": ["twilio.rest"]
             },
             "Make a Phone Call": {
                 "file": "6_phone_caller.py",
                 "description": "Make automated phone calls",
                 "category": "Communication",
                 "dependencies": ["twilio"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_phone_caller",
+                "imports": ["twilio.rest"]
             },
             "Send Anonymous Email": {
                 "file": "10_anonymous_email.py",
                 "description": "Send emails using SendGrid API",
                 "category": "Communication",
                 "dependencies": ["sendgrid"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_anonymous_email",
+                "imports": ["sendgrid"]
             }
         }
     },
@@ -147,21 +194,27 @@ PROGRAM_CONFIG = {
                 "description": "Perform Google searches",
                 "category": "Web",
                 "dependencies": ["googlesearch-python"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_google_search",
+                "imports": ["googlesearch"]
             },
             "Post on Twitter (X)": {
                 "file": "8_twitter_poster.py",
                 "description": "Post tweets to Twitter/X",
                 "category": "Social",
                 "dependencies": ["tweepy"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_twitter_poster",
+                "imports": ["tweepy"]
             },
             "Download Website Data": {
                 "file": "9_website_downloader.py",
                 "description": "Download and parse website content",
                 "category": "Web",
                 "dependencies": ["requests", "beautifulsoup4"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_website_downloader",
+                "imports": ["requests", "bs4"]
             }
         }
     },
@@ -173,14 +226,18 @@ PROGRAM_CONFIG = {
                 "description": "Educational comparison of tuples vs lists",
                 "category": "Educational",
                 "dependencies": [],
-                "requires_input": False
+                "requires_input": False,
+                "renderer": "render_tuple_vs_list",
+                "imports": []
             },
             "Create Digital Image": {
                 "file": "12_image_creator.py",
                 "description": "Create custom digital images",
                 "category": "Creative",
                 "dependencies": ["Pillow"],
-                "requires_input": True
+                "requires_input": True,
+                "renderer": "render_image_creator",
+                "imports": ["PIL.Image"]
             }
         }
     }
@@ -191,64 +248,183 @@ PROGRAM_CONFIG = {
 # --------------------------------------
 
 def log_execution(program_name, status, message=""):
-    """Log program execution"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = {
-        "timestamp": timestamp,
-        "program": program_name,
-        "status": status,
-        "message": message
-    }
-    st.session_state.execution_log.insert(0, log_entry)
-    # Keep only last 50 entries
-    st.session_state.execution_log = st.session_state.execution_log[:50]
+    """Log program execution to the persistent execution log"""
+    record_execution(program_name, status)
+    return get_execution_log().append(program_name, status, message)
 
 def get_system_info():
-    """Get system information"""
+    """Get the latest system sample from the background sampler (never blocks)"""
     try:
-        mem = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=1)
-        return {
-            "ram_total": mem.total / (1024**3),
-            "ram_used": mem.used / (1024**3),
-            "ram_percent": mem.percent,
-            "cpu_percent": cpu_percent
-        }
+        return get_sampler(interval=SAMPLE_INTERVAL).latest()
     except Exception:
         return None
 
+@st.cache_resource(show_spinner=False)
+def load_program_imports(modules):
+    """Import a program's heavy dependencies on first use and keep them for the process"""
+    return {name: importlib.import_module(name) for name in modules}
+
+def render_program(program_name, config):
+    """Load the program's dependencies, then dispatch to its registered renderer"""
+    try:
+        with profiler.section(f"↳ imports for {program_name}"):
+            load_program_imports(tuple(config.get("imports", [])))
+    except ImportError as e:
+        st.error(f"Missing dependency: {e}. Install with: pip install {' '.join(config['dependencies'])}")
+        log_execution(program_name, "ERROR", str(e))
+        return
+    globals()[config["renderer"]]()
+
+def get_program_files():
+    """Get the cached status index of all program scripts"""
+    files = [config["file"] for category in PROGRAM_CONFIG.values()
+             for config in category["programs"].values()]
+    return get_file_index(APP_DIR, files)
+
+@st.cache_resource(show_spinner=False)
+def open_history_file(path):
+    """Map the RAM monitor's ring file read-only, once per process"""
+    return RingFile(path)
+
 def check_file_exists(filename):
     """Check if program file exists"""
-    return os.path.exists(filename)
+    return get_program_files().exists(filename)
 
-def run_program(program_file, program_name):
-    """Run a program and handle the execution"""
-    if not check_file_exists(program_file):
+def record_job_result(job):
+    """Log the outcome of a finished background job"""
+    if job.error:
+        detail = job.error
+    else:
+        detail = f"exit {job.returncode}, wall {job.wall_time:.2f}s"
+        if job.cpu_time is not None:
+            detail += f", cpu {job.cpu_time:.2f}s"
+    if job.metadata.get("sha256"):
+        detail += f", sha256 {job.metadata['sha256'][:12]}"
+    log_execution(job.name, job.status, detail)
+
+def get_runner():
+    """Get the process-wide job runner"""
+    return get_job_runner(max_workers=MAX_JOBS, on_finish=record_job_result)
+
+def run_program(program_file, program_name, stdin_text=None):
+    """Start a program as a headless background job and return its handle"""
+    status = get_program_files().refresh_file(program_file)
+    if not status["exists"]:
         log_execution(program_name, "ERROR", f"File {program_file} not found")
-        return False
+        return None
     
     try:
-        # Run the program in a new terminal/command prompt
-        if sys.platform.startswith('win'):
-            # Windows
-            subprocess.Popen(['cmd', '/c', 'start', 'cmd', '/k', f'python {program_file}'])
-        elif sys.platform.startswith('darwin'):
-            # macOS
-            subprocess.Popen(['osascript', '-e', f'tell app "Terminal" to do script "python {program_file}"'])
-        else:
-            # Linux
-            subprocess.Popen(['gnome-terminal', '--', 'python3', program_file])
-        
-        log_execution(program_name, "LAUNCHED", f"Program launched in new terminal")
-        return True
+        job = get_runner().submit_script(program_name, os.path.join(APP_DIR, program_file),
+                                         stdin_text=stdin_text, cwd=APP_DIR,
+                                         metadata={"sha256": status["sha256"]})
+        st.session_state.program_status[program_name] = job.id
+        log_execution(program_name, "LAUNCHED", f"Job #{job.id} queued")
+        return job
         
     except Exception as e:
         log_execution(program_name, "ERROR", str(e))
-        return False
+        return None
+
+def record_action_result(task):
+    """Log the outcome of a finished inline action"""
+    record_send(task.name, task.wall_time)
+    if task.error:
+        log_execution(task.name, "ERROR", task.error)
+    else:
+        log_execution(task.name, "LAUNCHED", task.log_message)
+
+def get_executor():
+    """Get the process-wide executor for inline actions"""
+    return get_task_executor(max_workers=MAX_ACTIONS, on_finish=record_action_result)
+
+def record_scheduled_result(entry, state, error):
+    """Log each scheduled WhatsApp message as it fires"""
+    if "elapsed" in entry:
+        record_send("Send WhatsApp Message", entry["elapsed"])
+    log_execution("Send WhatsApp Message", "FINISHED" if state == "sent" else "FAILED",
+                  f"#{entry['id']} to {entry['recipient']}: {state} {error}".strip())
+
+def get_whatsapp_scheduler():
+    """Get the process-wide WhatsApp scheduler; one worker thread fires every queued message"""
+    from message_scheduler import get_scheduler
+    return get_scheduler(on_result=record_scheduled_result)
+
+def submit_action(name, fn, log_message=""):
+    """Run fn(task) in the background and remember the handle for this session"""
+    task = get_executor().submit(name, fn, log_message=log_message)
+    st.session_state.action_tasks[name] = task.id
+    return task
+
+def uploaded_recipients(task, data, fmt, key="email"):
+    """Validated, deduplicated, unsuppressed rows of an uploaded recipient file
+
+    The kept/dropped counts are added to the action's log entry once the
+    rows have been consumed.
+    """
+    from recipients import RecipientStats, load_recipients
+    stats = RecipientStats()
+    log_message = task.log_message
+    yield from load_recipients(data, fmt, key, stats=stats)
+    task.log_message = f"{log_message} ({stats.summary()})"
+
+def current_action(name):
+    """Latest action submitted by this session under `name`, if still known"""
+    task_id = st.session_state.action_tasks.get(name)
+    return get_executor().get(task_id) if task_id else None
+
+def render_live(render_fn, is_active, *args):
+    """Render a panel, re-running only that panel every second while work is in flight"""
+    if not hasattr(st, "fragment") or not is_active():
+        render_fn(*args)
+        return
+
+    @st.fragment(run_every=1)
+    def _live():
+        render_fn(*args)
+        if not is_active():
+            st.rerun()
+
+    _live()
+
+def render_action_status(name, show_result):
+    """Show progress of the latest action, then its result or error"""
+    def _render():
+        task = current_action(name)
+        if task is None:
+            return
+        if not task.done:
+            st.info(f"⏳ {task.progress or 'Working'}… ({task.wall_time:.1f}s)")
+        elif task.error:
+            st.error(f"Error: {task.error}")
+        else:
+            show_result(task.result)
+
+    render_live(_render, lambda: (current_action(name) is not None
+                                  and not current_action(name).done))
+
+def render_jobs(program_name):
+    """Show this program's background jobs with their captured output"""
+    jobs = get_runner().jobs(program_name)
+    if not jobs:
+        st.caption("No jobs yet.")
+        return
+    st.dataframe([job.summary() for job in jobs], use_container_width=True, hide_index=True)
+    latest = jobs[0]
+    if not latest.done and st.button(f"⏹️ Stop job #{latest.id}"):
+        get_runner().cancel(latest.id)
+    st.code(latest.output_text(last=200) or "(no output yet)", language="text")
 
 # --------------------------------------
 # Main Dashboard
 # --------------------------------------
+profiler.mark("Setup and PROGRAM_CONFIG")
+
+if METRICS_PORT:
+    try:
+        register_host_metrics(get_sampler(interval=SAMPLE_INTERVAL))
+        start_exporter(int(METRICS_PORT))
+    except (OSError, ValueError) as e:
+        st.sidebar.warning(f"Metrics exporter not started: {e}")
 
 # Header
 st.markdown("""
@@ -273,31 +449,62 @@ with st.sidebar:
         with col2:
             st.metric("CPU Usage", f"{sys_info['cpu_percent']:.1f}%")
     
+    # Metrics history (raw for the last hour, min/avg/max rollups beyond that)
+    history_windows = {"1h": 3600, "24h": 86400, "7d": 604800}
+    if HISTORY_FILE and os.path.exists(HISTORY_FILE):
+        history_windows["File 7d"] = None
+    history_window = st.radio("History", list(history_windows), horizontal=True, key="history_window")
+    if history_windows[history_window] is None:
+        try:
+            recorded = open_history_file(HISTORY_FILE).read(since=time.time() - 604800, max_points=500)
+            points = {"time": recorded["timestamp"], "ram_percent": recorded["percent"],
+                      "cpu_percent": recorded["cpu"]}
+        except (OSError, ValueError) as e:
+            st.caption(f"Cannot read {HISTORY_FILE}: {e}")
+            points = {"time": []}
+    else:
+        points = get_history(interval=SAMPLE_INTERVAL).series(history_windows[history_window])
+    if len(points["time"]) > 1:
+        times = [datetime.fromtimestamp(t) for t in points["time"]]
+        if "ram_percent" in points:
+            st.line_chart({"time": times, "RAM %": points["ram_percent"],
+                           "CPU %": points["cpu_percent"]}, x="time", height=180)
+        else:
+            st.line_chart({"time": times, "RAM min": points["ram_percent_min"],
+                           "RAM avg": points["ram_percent_avg"], "RAM max": points["ram_percent_max"]},
+                          x="time", height=160)
+            st.line_chart({"time": times, "CPU avg": points["cpu_percent_avg"],
+                           "CPU max": points["cpu_percent_max"]}, x="time", height=160)
+    else:
+        st.caption("Collecting samples…")
+    
     # Quick Actions
     st.subheader("⚡ Quick Actions")
     if st.button("🔄 Refresh Dashboard", use_container_width=True):
         st.rerun()
     
+    st.checkbox("⏱️ Profile reruns", key="profile_reruns")
+    if st.session_state.get("profile_reruns"):
+        st.checkbox("Collect cProfile stats", key="profile_cprofile")
+    
     if st.button("🧹 Clear Logs", use_container_width=True):
-        st.session_state.execution_log = []
+        # History stays on disk; only this session's compact view is cleared
+        st.session_state.log_cleared_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         st.success("Logs cleared!")
     
     # File Status
     st.subheader("📁 File Status")
-    total_files = 0
-    missing_files = 0
-    
-    for category in PROGRAM_CONFIG.values():
-        for program_name, config in category["programs"].items():
-            total_files += 1
-            if not check_file_exists(config["file"]):
-                missing_files += 1
+    program_files = get_program_files()
+    total_files = len(program_files.filenames)
+    missing_files = len(program_files.missing())
     
     if missing_files == 0:
         st.success(f"✅ All {total_files} programs found")
     else:
         st.error(f"❌ {missing_files} of {total_files} programs missing")
 
+profiler.mark("Sidebar")
+
 # Main Content Area
 """
 Inline Program Runner UI with top navigation and inline inputs/outputs
@@ -324,17 +531,21 @@ with nav_col3:
 
 # Usage details
 cfg = PROGRAM_CONFIG[category_key]["programs"][selected_program]
+script_sha = get_program_files().script_hash(cfg["file"])
 st.markdown(
     f"""
 <div class=\"program-card\">
   <h3>📘 Usage: {selected_program}</h3>
   <p>{cfg['description']}</p>
   <p class=\"tiny\"><strong>Dependencies:</strong> {', '.join(cfg['dependencies']) if cfg['dependencies'] else 'None'}</p>
+  <p class=\"tiny\"><strong>Script:</strong> {cfg['file']} · sha256 {(script_sha or 'missing')[:12]}</p>
 </div>
 """,
     unsafe_allow_html=True,
 )
 
+profiler.mark("Navigation and usage card")
+
 # Inline implementations for each program
 def render_read_ram():
     import psutil as _ps
@@ -348,130 +559,341 @@ def render_read_ram():
 
 
 def render_whatsapp_sender():
-    st.info("Requires WhatsApp Web.")
-    mode = st.radio("Mode", ["Send instantly", "Schedule"], horizontal=True)
-    phone = st.text_input("Phone number (with country code)", placeholder="+91xxxxxxxxxx")
-    message = st.text_area("Message")
+    st.info("Requires WhatsApp Web. Messages are queued and sent in the background at their times.")
+    mode = st.radio("Mode", ["Send instantly", "Schedule", "Schedule from file"], horizontal=True,
+                    key="whatsapp_mode")
+    if mode == "Schedule from file":
+        recipients_file = st.file_uploader(
+            "Recipients (CSV with 'phone' and optional 'message' and 'send_at' columns)",
+            type=["csv", "jsonl", "txt"], key="whatsapp_recipients",
+        )
+        message = st.text_area("Message for rows without a 'message' column ({column} placeholders allowed)")
+        send_at = st.text_input("Time for rows without a 'send_at' column (HH:MM or YYYY-MM-DD HH:MM)")
+    else:
+        phone = st.text_input("Phone number (with country code)", placeholder="+91xxxxxxxxxx")
+        message = st.text_area("Message")
     if mode == "Schedule":
         a, b = st.columns(2)
         with a:
             hour = st.number_input("Hour (24h)", 0, 23, 12)
         with b:
             minute = st.number_input("Minute", 0, 59, 0)
-    else:
-        hour = minute = None
+    scheduler = get_whatsapp_scheduler()
     if st.button("Send via WhatsApp"):
+        from message_scheduler import parse_send_time, schedule_items
         try:
-            import pywhatkit as pwk
-            if mode == "Send instantly":
-                pwk.sendwhatmsg_instantly(phone, message, wait_time=15, tab_close=True)
+            if mode == "Schedule from file":
+                if recipients_file is None:
+                    raise ValueError("Upload a recipient file first.")
+                from recipients import RecipientStats, load_recipients
+                stats = RecipientStats()
+                rows = load_recipients(recipients_file.getvalue(), recipients_file.name.rsplit(".", 1)[-1].lower(),
+                                       key="phone", stats=stats)
+                ids = scheduler.schedule_many(schedule_items(rows, message or None, send_at or None))
+                detail = f"Scheduled {len(ids)} from {recipients_file.name} ({stats.summary()})"
             else:
-                pwk.sendwhatmsg(phone, message, int(hour), int(minute))
-            st.success("Triggered in WhatsApp Web.")
-            log_execution("Send WhatsApp Message", "LAUNCHED", mode)
+                from recipients import normalize_phone
+                if normalize_phone(phone) is None:
+                    raise ValueError(f"{phone!r} is not a valid phone number with country code.")
+                due = time.time() if mode == "Send instantly" else parse_send_time(f"{hour:02d}:{minute:02d}")
+                scheduler.schedule(normalize_phone(phone), message, due)
+                detail = f"{mode}: {phone} at {datetime.fromtimestamp(due):%Y-%m-%d %H:%M}"
+            st.success(detail)
+            log_execution("Send WhatsApp Message", "LAUNCHED", detail)
         except Exception as e:
             st.error(f"Error: {e}")
             log_execution("Send WhatsApp Message", "ERROR", str(e))
 
+    pending = scheduler.pending()
+    st.caption(f"{len(pending)} message(s) queued")
+    if pending:
+        st.dataframe([{"id": entry["id"], "due": f"{datetime.fromtimestamp(entry['due']):%Y-%m-%d %H:%M}",
+                       "phone": entry["recipient"], "message": entry["message"][:60]}
+                      for entry in pending[:200]], use_container_width=True, hide_index=True)
+        c1, c2 = st.columns([3, 1])
+        cancel_id = c1.number_input("Message ID", min_value=1, step=1, key="whatsapp_cancel_id")
+        if c2.button("Cancel message") and not scheduler.cancel(int(cancel_id)):
+            st.warning(f"No queued message #{int(cancel_id)}.")
+    history = scheduler.history(20)
+    if history:
+        with st.expander("Recently fired"):
+            st.dataframe([{"id": entry["id"], "phone": entry["recipient"], "state": entry["state"],
+                           "error": entry["error"]} for entry in history],
+                         use_container_width=True, hide_index=True)
+
 
 def render_email_sender():
     st.warning("Use Gmail App Password (2FA).")
+    mode = st.radio("Mode", ["Single email", "Bulk from file"], horizontal=True, key="email_mode")
     sender = st.text_input("Sender email")
     app_password = st.text_input("App password", type="password")
-    receiver = st.text_input("Receiver email")
+    if mode == "Single email":
+        receiver = st.text_input("Receiver email")
+    else:
+        recipients_file = st.file_uploader(
+            "Recipients (CSV with an 'email' column, JSONL, or one address per line)",
+            type=["csv", "jsonl", "txt"],
+        )
+        c1, c2 = st.columns(2)
+        connections = c1.number_input("Parallel connections", 1, 10, 1)
+        per_session = c2.number_input("Messages per connection", 1, 1000, 100)
     subject = st.text_input("Subject")
     body = st.text_area("Body")
+    uploads = st.file_uploader("Attachments", accept_multiple_files=True, key="email_attachments")
     if st.button("Send Email"):
-        try:
-            import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-            msg = MIMEMultipart()
-            msg["From"] = sender
-            msg["To"] = receiver
-            msg["Subject"] = subject
-            msg.attach(MIMEText(body, "plain"))
-            with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                server.starttls()
-                server.login(sender, app_password)
-                server.sendmail(sender, receiver, msg.as_string())
+        from mailer import Attachment, SMTPSession, build_message, close_attachments, send_bulk
+        # Attachments are base64-encoded while streaming; bulk sends encode each one once
+        attachments = [
+            Attachment(upload, filename=upload.name, content_type=upload.type or None,
+                       cache=mode != "Single email")
+            for upload in uploads or []
+        ]
+        if mode == "Single email":
+            def send(task):
+                msg = build_message(sender, receiver, subject, body, attachments=attachments)
+                task.set_progress("Connecting to smtp.gmail.com")
+                try:
+                    with SMTPSession(username=sender, password=app_password) as session:
+                        session.connect()
+                        task.set_progress("Sending")
+                        session.send(msg)
+                finally:
+                    close_attachments(attachments)
+            submit_action("Send Email", send, f"To: {receiver}")
+        elif recipients_file is None:
+            st.error("Upload a recipient file first.")
+        else:
+            data = recipients_file.getvalue()
+            fmt = recipients_file.name.rsplit(".", 1)[-1].lower()
+
+            def send(task):
+                try:
+                    return send_bulk(
+                        uploaded_recipients(task, data, fmt),
+                        lambda row: build_message(sender, row["email"], subject, body, attachments=attachments),
+                        lambda: SMTPSession(username=sender, password=app_password,
+                                            max_per_session=int(per_session)),
+                        connections=int(connections),
+                        on_progress=lambda r: task.set_progress(f"Sent {r.sent}, failed {r.failed}"),
+                    )
+                finally:
+                    close_attachments(attachments)
+            submit_action("Send Email", send, f"Bulk: {recipients_file.name}")
+
+    def show_result(result):
+        if result is None:
             st.success("Email sent.")
-            log_execution("Send Email", "LAUNCHED", f"To: {receiver}")
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Send Email", "ERROR", str(e))
+            return
+        st.success(f"Sent {result.sent} emails over {result.connections} connection(s) "
+                   f"in {result.elapsed:.1f}s ({result.rate:.1f}/s).")
+        if result.aborted:
+            st.error(f"Stopped early: {result.aborted}")
+        if result.failed:
+            st.warning(f"{result.failed} failed.")
+            st.dataframe([{"email": e, "error": err} for e, err in result.errors[:100]],
+                         use_container_width=True, hide_index=True)
+    render_action_status("Send Email", show_result)
 
 
 def render_whatsapp_web_opener():
-    phone = st.text_input("Phone number (with country code)")
-    message = st.text_input("Prefilled message")
-    if st.button("Generate Chat Link"):
-        try:
-            import urllib.parse
-            url = f"https://wa.me/{phone.replace('+','')}?text={urllib.parse.quote(message)}"
-            st.link_button("Open chat", url)
-            log_execution("WhatsApp Web Opener", "LAUNCHED", url)
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("WhatsApp Web Opener", "ERROR", str(e))
+    mode = st.radio("Mode", ["Single link", "Bulk from file"], horizontal=True, key="wa_link_mode")
+    if mode == "Single link":
+        phone = st.text_input("Phone number (with country code)")
+    else:
+        contacts_file = st.file_uploader(
+            "Contacts (CSV with a 'phone' column, or one number per line)",
+            type=["csv", "jsonl", "txt"], key="wa_link_contacts",
+        )
+        c1, c2 = st.columns(2)
+        default_country = c1.text_input("Country code for numbers without one", placeholder="91")
+        qr = c2.checkbox("Include QR codes (ZIP)", key="wa_link_qr")
+    message = st.text_input("Prefilled message" + (" ({column} placeholders allowed)" if mode != "Single link" else ""))
+    if st.button("Generate Chat Link" if mode == "Single link" else "Generate Links"):
+        from recipients import normalize_phone
+        from whatsapp_links import chat_link, generate_links
+        if mode == "Single link":
+            normalized = normalize_phone(phone)
+            if normalized is None:
+                st.error(f"{phone!r} is not a valid phone number with country code.")
+                log_execution("WhatsApp Web Opener", "ERROR", f"Invalid number {phone!r}")
+            else:
+                url = chat_link(normalized, message)
+                st.link_button("Open chat", url)
+                log_execution("WhatsApp Web Opener", "LAUNCHED", url)
+        elif contacts_file is None:
+            st.error("Upload a contact file first.")
+        else:
+            data = contacts_file.getvalue()
+            fmt = contacts_file.name.rsplit(".", 1)[-1].lower()
+
+            def generate(task):
+                import io
+                from mailer import read_recipients
+                output = io.BytesIO()
+                result = generate_links(
+                    read_recipients(data, fmt, key="phone"), output, message, fmt="zip" if qr else "csv",
+                    default_country=default_country or None, qr=qr,
+                    on_progress=lambda r: task.set_progress(f"{r.links} links, {r.invalid} invalid"),
+                )
+                return result, output.getvalue()
+            submit_action("WhatsApp Web Opener", generate, f"Bulk links: {contacts_file.name}")
+
+    def show_result(outcome):
+        result, data = outcome
+        st.success(f"{result.links} links in {result.elapsed:.1f}s "
+                   f"({result.invalid} invalid, {result.duplicates} duplicates skipped).")
+        if result.invalid_samples:
+            st.caption("Invalid numbers include: " + ", ".join(result.invalid_samples[:5]))
+        zipped = data[:2] == b"PK"
+        st.download_button("Download links", data=data,
+                           file_name="whatsapp_links.zip" if zipped else "whatsapp_links.csv",
+                           mime="application/zip" if zipped else "text/csv")
+    render_action_status("WhatsApp Web Opener", show_result)
 
 
 def render_sms_sender():
     st.info("Twilio credentials required.")
+    mode = st.radio("Mode", ["Single SMS", "Bulk from file"], horizontal=True, key="sms_mode")
     sid = st.text_input("Twilio Account SID")
     token = st.text_input("Twilio Auth Token", type="password")
-    from_num = st.text_input("From (Twilio number)", "+1234567890")
-    to_num = st.text_input("To (recipient)", "+1234567890")
+    if mode == "Single SMS":
+        from_num = st.text_input("From (Twilio number)", "+1234567890")
+        to_num = st.text_input("To (recipient)", "+1234567890")
+    else:
+        from_nums = st.text_input("From (Twilio numbers, comma-separated)", "+1234567890")
+        recipients_file = st.file_uploader(
+            "Recipients (CSV with a 'phone' column, or one number per line)",
+            type=["csv", "jsonl", "txt"], key="sms_recipients",
+        )
+        c1, c2 = st.columns(2)
+        rate = c1.number_input("Messages/second per number", 0.1, 100.0, 1.0)
+        workers = c2.number_input("Parallel requests", 1, 32, 4)
     text = st.text_area("Message")
+    from sms_segments import analyze, describe, make_gsm_safe
+    info = analyze(text)
+    st.caption(describe(info))
+    gsm_safe = False
+    if info.non_gsm:
+        safe = analyze(make_gsm_safe(text))
+        gsm_safe = st.checkbox(f"Replace characters outside GSM-7 ({describe(safe)})",
+                               value=safe.segments < info.segments, key="sms_gsm_safe")
     if st.button("Send SMS"):
-        try:
-            from twilio.rest import Client
-            client = Client(sid, token)
-            msg = client.messages.create(body=text, from_=from_num, to=to_num)
-            st.success(f"Sent SID: {msg.sid}")
-            log_execution("Send SMS", "LAUNCHED", f"To: {to_num}")
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Send SMS", "ERROR", str(e))
+        if mode == "Single SMS":
+            body = make_gsm_safe(text) if gsm_safe else text
+
+            def send(task):
+                from twilio.rest import Client
+                client = Client(sid, token)
+                return client.messages.create(body=body, from_=from_num, to=to_num).sid
+            submit_action("Send SMS", send, f"To: {to_num}")
+        elif recipients_file is None:
+            st.error("Upload a recipient file first.")
+        else:
+            data = recipients_file.getvalue()
+            fmt = recipients_file.name.rsplit(".", 1)[-1].lower()
+
+            def send(task):
+                from sms_bulk import TwilioBulkSender
+                with TwilioBulkSender(sid, token, from_nums.split(","), rate=rate,
+                                      workers=int(workers)) as sender:
+                    return sender.send(
+                        uploaded_recipients(task, data, fmt, key="phone"), text, gsm_safe=gsm_safe,
+                        on_progress=lambda r: task.set_progress(f"Sent {r.sent}, failed {r.failed}"),
+                    )
+            submit_action("Send SMS", send, f"Bulk: {recipients_file.name}")
+
+    def show_result(result):
+        if isinstance(result, str):
+            st.success(f"Sent SID: {result}")
+            return
+        st.success(f"Sent {result.sent} SMS in {result.elapsed:.1f}s "
+                   f"({result.rate:.1f} msg/s, {result.throttled} throttled).")
+        if result.aborted:
+            st.error(f"Stopped early: {result.aborted}")
+        if result.failed:
+            st.warning(f"{result.failed} failed.")
+            st.dataframe([{"phone": p, "error": err} for p, err in result.errors[:100]],
+                         use_container_width=True, hide_index=True)
+    render_action_status("Send SMS", show_result)
 
 
 def render_phone_caller():
     st.info("Twilio credentials required.")
+    call_mode = st.radio("Mode", ["Single call", "Campaign from file"], horizontal=True, key="call_mode")
     sid = st.text_input("Twilio Account SID")
     token = st.text_input("Twilio Auth Token", type="password")
     from_num = st.text_input("From (Twilio number)", "+1234567890")
-    to_num = st.text_input("To (recipient)", "+1234567890")
+    if call_mode == "Single call":
+        to_num = st.text_input("To (recipient)", "+1234567890")
+    else:
+        recipients_file = st.file_uploader(
+            "Recipients (CSV with a 'phone' column, or one number per line)",
+            type=["csv", "jsonl", "txt"], key="call_recipients",
+        )
+        c1, c2, c3 = st.columns(3)
+        cps = c1.number_input("Calls/second", 0.1, 50.0, 1.0)
+        workers = c2.number_input("Parallel requests", 1, 32, 4)
+        wait_minutes = c3.number_input("Wait for outcomes (min)", 0, 60, 10)
     mode = st.radio("Message", ["Default: 'Hello from Python!'", "Custom"], horizontal=True)
-    custom = st.text_input("Custom text") if mode == "Custom" else ""
+    custom = st.text_input("Custom text ({column} placeholders allowed in campaigns)") if mode == "Custom" else ""
+    message = custom or "Hello from Python!"
     if st.button("Make Call"):
-        try:
-            from twilio.rest import Client
-            twiml = f"<Response><Say>{custom or 'Hello from Python!'}</Say></Response>"
-            client = Client(sid, token)
-            call = client.calls.create(twiml=twiml, from_=from_num, to=to_num)
-            st.success(f"Call SID: {call.sid}")
-            log_execution("Phone Call", "LAUNCHED", f"To: {to_num}")
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Phone Call", "ERROR", str(e))
+        from voice_campaign import VoiceCampaign, build_twiml
+        if call_mode == "Single call":
+            def call(task):
+                from twilio.rest import Client
+                client = Client(sid, token)
+                return client.calls.create(twiml=build_twiml(message), from_=from_num, to=to_num).sid
+            submit_action("Phone Call", call, f"To: {to_num}")
+        elif recipients_file is None:
+            st.error("Upload a recipient file first.")
+        else:
+            data = recipients_file.getvalue()
+            fmt = recipients_file.name.rsplit(".", 1)[-1].lower()
+
+            def call(task):
+                with VoiceCampaign(sid, token, from_num, cps=cps, workers=int(workers)) as campaign:
+                    return campaign.run(
+                        uploaded_recipients(task, data, fmt, key="phone"), message, wait_timeout=wait_minutes * 60,
+                        on_progress=lambda r: task.set_progress(
+                            f"Placed {r.placed}, failed {r.failed}, still running {r.pending()}"),
+                    )
+            submit_action("Phone Call", call, f"Campaign: {recipients_file.name}")
+
+    def show_result(result):
+        if isinstance(result, str):
+            st.success(f"Call SID: {result}")
+            return
+        st.success(f"Placed {result.placed} calls in {result.dial_elapsed:.1f}s "
+                   f"({result.rate:.2f} calls/s), {result.polls} status request(s).")
+        st.dataframe([{"status": s, "calls": n} for s, n in sorted(result.outcomes().items())],
+                     use_container_width=True, hide_index=True)
+        if result.errors:
+            st.warning(f"{len(result.errors)} error(s).")
+            st.dataframe([{"phone": p, "error": err} for p, err in result.errors[:100]],
+                         use_container_width=True, hide_index=True)
+    render_action_status("Phone Call", show_result)
 
 
 def render_google_search():
     query = st.text_input("Search query")
     num = st.number_input("Number of results", 1, 20, 5)
+    refresh = st.checkbox("Bypass cache", key="search_refresh")
     if st.button("Search"):
-        try:
-            from googlesearch import search
-            results = list(search(query, num_results=int(num)))
-            if results:
-                for i, url in enumerate(results, 1):
-                    st.write(f"{i}. ", url)
-            else:
-                st.info("No results found.")
-            log_execution("Google Search", "LAUNCHED", query)
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Google Search", "ERROR", str(e))
+        def run_search(task):
+            from search_cache import get_search_cache
+            return get_search_cache().search(query, int(num), refresh=refresh)
+        submit_action("Google Search", run_search, query)
+
+    def show_results(results):
+        if getattr(results, "source", "fetched") != "fetched":
+            st.caption(f"Cached results from {results.age / 60:.0f} min ago.")
+        if results:
+            for i, url in enumerate(results, 1):
+                st.write(f"{i}. ", url)
+        else:
+            st.info("No results found.")
+    render_action_status("Google Search", show_results)
 
 
 def render_twitter_poster():
@@ -482,61 +904,96 @@ def render_twitter_poster():
     access_secret = st.text_input("Access Token Secret", type="password")
     tweet = st.text_area("Tweet (max 280 chars)")
     if st.button("Post Tweet"):
-        try:
+        text = tweet[:280]
+
+        def post(task):
             import tweepy
             auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_secret)
             api = tweepy.API(auth)
+            task.set_progress("Verifying credentials")
             api.verify_credentials()
-            if len(tweet) > 280:
-                tweet = tweet[:280]
-            api.update_status(tweet)
-            st.success("Tweet posted.")
-            log_execution("Twitter Post", "LAUNCHED", tweet[:50])
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Twitter Post", "ERROR", str(e))
+            task.set_progress("Posting")
+            api.update_status(text)
+        submit_action("Twitter Post", post, text[:50])
+    render_action_status("Twitter Post", lambda _: st.success("Tweet posted."))
 
 
 def render_website_downloader():
     url = st.text_input("URL", "https://example.com")
+    _url = url if url.startswith(("http://", "https://")) else "https://" + url
     if st.button("Fetch"):
-        try:
+        def fetch(task):
             import requests
             from bs4 import BeautifulSoup
-            _url = url if url.startswith(("http://", "https://")) else "https://" + url
+            task.set_progress(f"Downloading {_url}")
             resp = requests.get(_url, timeout=15)
             resp.raise_for_status()
+            task.set_progress("Parsing HTML")
             soup = BeautifulSoup(resp.text, "html.parser")
             title = soup.title.string if soup.title else "(no title)"
-            st.success(f"Fetched. Status {resp.status_code}. Title: {title}")
-            html = soup.prettify()
-            st.text_area("HTML (first 3000 chars)", html[:3000], height=300)
-            st.download_button("Download HTML", data=html, file_name="website_data.html")
-            log_execution("Website Downloader", "LAUNCHED", _url)
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Website Downloader", "ERROR", str(e))
+            return {"status": resp.status_code, "title": title, "html": soup.prettify()}
+        submit_action("Website Downloader", fetch, _url)
+
+    def show_page(page):
+        st.success(f"Fetched. Status {page['status']}. Title: {page['title']}")
+        st.text_area("HTML (first 3000 chars)", page["html"][:3000], height=300)
+        st.download_button("Download HTML", data=page["html"], file_name="website_data.html")
+    render_action_status("Website Downloader", show_page)
 
 
 def render_anonymous_email():
     st.info("SendGrid API key required.")
+    mode = st.radio("Mode", ["Single email", "Bulk from file"], horizontal=True, key="sendgrid_mode")
     api_key = st.text_input("SendGrid API Key", type="password")
     from_email = st.text_input("From email")
-    to_email = st.text_input("To email")
+    if mode == "Single email":
+        to_email = st.text_input("To email")
+    else:
+        recipients_file = st.file_uploader(
+            "Recipients (CSV with an 'email' column, JSONL, or one address per line)",
+            type=["csv", "jsonl", "txt"], key="sendgrid_recipients",
+        )
+        parallel = st.number_input("Parallel requests", 1, 16, 4)
+        st.caption("Use {column} placeholders in the subject and body; "
+                   "up to 1000 recipients go in each API call.")
     subject = st.text_input("Subject")
     body = st.text_area("Body")
     if st.button("Send via SendGrid"):
-        try:
-            import sendgrid
-            from sendgrid.helpers.mail import Mail
-            sg = sendgrid.SendGridAPIClient(api_key)
-            email = Mail(from_email=from_email, to_emails=to_email, subject=subject, plain_text_content=body)
-            resp = sg.send(email)
-            st.success(f"Sent. Status: {resp.status_code}")
-            log_execution("Anonymous Email", "LAUNCHED", f"To: {to_email}")
-        except Exception as e:
-            st.error(f"Error: {e}")
-            log_execution("Anonymous Email", "ERROR", str(e))
+        if mode == "Single email":
+            def send(task):
+                import sendgrid
+                from sendgrid.helpers.mail import Mail
+                sg = sendgrid.SendGridAPIClient(api_key)
+                email = Mail(from_email=from_email, to_emails=to_email, subject=subject, plain_text_content=body)
+                return sg.send(email).status_code
+            submit_action("Anonymous Email", send, f"To: {to_email}")
+        elif recipients_file is None:
+            st.error("Upload a recipient file first.")
+        else:
+            data = recipients_file.getvalue()
+            fmt = recipients_file.name.rsplit(".", 1)[-1].lower()
+
+            def send(task):
+                from sendgrid_bulk import SendGridBatchSender
+                with SendGridBatchSender(api_key, max_parallel=int(parallel)) as sender:
+                    return sender.send(
+                        uploaded_recipients(task, data, fmt), from_email, subject, body,
+                        on_progress=lambda r: task.set_progress(
+                            f"Sent {r.sent}, failed {r.failed} in {r.requests} request(s)"),
+                    )
+            submit_action("Anonymous Email", send, f"Bulk: {recipients_file.name}")
+
+    def show_result(result):
+        if not hasattr(result, "requests"):
+            st.success(f"Sent. Status: {result}")
+            return
+        st.success(f"Sent {result.sent} emails in {result.requests} API call(s), "
+                   f"{result.elapsed:.1f}s ({result.rate:.0f}/s).")
+        if result.failed:
+            st.warning(f"{result.failed} failed.")
+            st.dataframe([{"recipients": r, "error": err} for r, err in result.errors[:100]],
+                         use_container_width=True, hide_index=True)
+    render_action_status("Anonymous Email", show_result)
 
 
 def render_tuple_vs_list():
@@ -600,40 +1057,66 @@ def render_image_creator():
             log_execution("Image Creator", "ERROR", str(e))
 
 # Router
-if selected_program == "Read RAM":
-    render_read_ram()
-elif selected_program == "Send WhatsApp Message":
-    render_whatsapp_sender()
-elif selected_program == "Send Email":
-    render_email_sender()
-elif selected_program == "Send WhatsApp Without Saving Contact":
-    render_whatsapp_web_opener()
-elif selected_program == "Send SMS":
-    render_sms_sender()
-elif selected_program == "Make a Phone Call":
-    render_phone_caller()
-elif selected_program == "Google Search":
-    render_google_search()
-elif selected_program == "Post on Twitter (X)":
-    render_twitter_poster()
-elif selected_program == "Download Website Data":
-    render_website_downloader()
-elif selected_program == "Send Anonymous Email":
-    render_anonymous_email()
-elif selected_program == "Tuple vs List Difference":
-    render_tuple_vs_list()
-elif selected_program == "Create Digital Image":
-    render_image_creator()
+profiler.mark("Renderer definitions")
+render_program(selected_program, cfg)
+profiler.mark(f"Renderer: {selected_program}")
+
+# Headless script runs with captured output
+with st.expander(f"🖥️ Run {cfg['file']} as a background job"):
+    stdin_text = st.text_area(
+        "Input lines (sent to the script's prompts, one per line)",
+        key=f"stdin_{cfg['file']}",
+        disabled=not cfg["requires_input"],
+    )
+    if st.button("▶️ Launch job", key=f"launch_{cfg['file']}"):
+        job = run_program(cfg["file"], selected_program, stdin_text + "\n" if stdin_text else "")
+        if job:
+            st.success(f"Job #{job.id} started ({get_runner().active_count()} running, limit {MAX_JOBS}).")
+        else:
+            st.error("Could not start job; see the execution log.")
+    # Stream output while a job is running by re-rendering only this panel
+    render_live(render_jobs, lambda: any(not job.done for job in get_runner().jobs(selected_program)),
+                selected_program)
+
+profiler.mark("Background jobs panel")
 
 # Logs (compact)
 st.markdown("---")
 st.subheader("📝 Execution Log")
-if st.session_state.execution_log:
-    for log in st.session_state.execution_log[:25]:
+recent_logs = [log for log in get_execution_log().tail(25)
+               if log["timestamp"] >= st.session_state.log_cleared_at]
+if recent_logs:
+    for log in recent_logs:
         st.write(f"[{log['timestamp']}] {log['program']} — {log['status']} — {log['message']}")
 else:
     st.info("No actions yet.")
 
+with st.expander("🔎 Search run history"):
+    history = get_execution_log()
+    f1, f2, f3, f4 = st.columns([1.6, 1, 1, 0.8])
+    with f1:
+        program_filter = st.selectbox("Program", ["All"] + history.distinct("program"), key="log_program")
+    with f2:
+        status_filter = st.selectbox("Status", ["All"] + history.distinct("status"), key="log_status")
+    with f3:
+        since_date = st.date_input("Since", value=None, key="log_since")
+    filters = {
+        "program": None if program_filter == "All" else program_filter,
+        "status": None if status_filter == "All" else status_filter,
+        "since": since_date.strftime("%Y-%m-%d") if since_date else None,
+    }
+    page_size = 50
+    total = history.count(**filters)
+    pages = max(1, (total + page_size - 1) // page_size)
+    with f4:
+        page = st.number_input("Page", 1, pages, 1, key="log_page")
+    rows = history.query(limit=page_size, offset=(int(page) - 1) * page_size, **filters)
+    st.caption(f"{total} matching runs · page {int(page)} of {pages}")
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+profiler.mark("Execution log")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -642,3 +1125,21 @@ st.markdown("""
     <p>For detailed documentation, check <code>PROGRAMS_README.md</code></p>
 </div>
 """, unsafe_allow_html=True)
+
+# Rerun timings
+if profiler.enabled:
+    profiler.mark("Footer")
+    total_ms = profiler.finish()
+    rerun_history = st.session_state.setdefault("rerun_history", [])
+    rerun_history.append(round(total_ms, 1))
+    del rerun_history[:-50]
+    with st.expander(f"⏱️ Rerun timings — {total_ms:.0f} ms"):
+        st.dataframe([{"section": name, "ms": round(ms, 1)} for name, ms in profiler.timings],
+                     use_container_width=True, hide_index=True)
+        if len(rerun_history) > 1:
+            st.line_chart({"rerun ms": rerun_history}, height=120)
+        stats = profiler.stats_text()
+        if stats:
+            if PROFILE_DIR:
+                st.caption(f"cProfile stats saved to {profiler.dump(PROFILE_DIR)}")
+            st.code(stats, language="text")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Execution Log - Persistent, indexed run history for the toolkit (SQLite)
+"""
+
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+DEFAULT_PATH = os.environ.get(
+    "TOOLKIT_LOG_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "execution_log.db"),
+)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    program TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_executions_timestamp ON executions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_executions_program ON executions (program, timestamp);
+CREATE INDEX IF NOT EXISTS idx_executions_status ON executions (status, timestamp);
+"""
+
+
+class ExecutionLog:
+    """Append-only execution history with a bounded in-memory tail for the UI"""
+
+    def __init__(self, path=DEFAULT_PATH, tail_size=50):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._tail = deque(maxlen=tail_size)
+        rows = self._conn.execute(
+            "SELECT * FROM executions ORDER BY id DESC LIMIT ?", (tail_size,)
+        ).fetchall()
+        for row in reversed(rows):
+            self._tail.append(dict(row))
+
+    def append(self, program, status, message="", timestamp=None):
+        """Record one execution and return the stored entry"""
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO executions (timestamp, program, status, message) VALUES (?, ?, ?, ?)",
+                (timestamp, program, status, message or ""),
+            )
+            entry = {
+                "id": cur.lastrowid,
+                "timestamp": timestamp,
+                "program": program,
+                "status": status,
+                "message": message or "",
+            }
+            self._tail.append(entry)
+        return entry
+
+    def tail(self, limit=None):
+        """Return the most recent entries from memory, newest first"""
+        entries = list(self._tail)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def _where(self, program=None, status=None, since=None, until=None):
+        clauses, params = [], []
+        if program:
+            clauses.append("program = ?")
+            params.append(program)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, program=None, status=None, since=None, until=None, limit=25, offset=0):
+        """Return matching entries, newest first, one page at a time"""
+        where, params = self._where(program, status, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM executions{where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, program=None, status=None, since=None, until=None):
+        """Return the number of matching entries"""
+        where, params = self._where(program, status, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM executions{where}", params).fetchone()[0]
+
+    def distinct(self, column):
+        """Return the distinct values of an indexed column (program or status)"""
+        if column not in ("program", "status"):
+            raise ValueError(f"Unsupported column: {column}")
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {column} FROM executions ORDER BY {column}").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_execution_log(path=DEFAULT_PATH):
+    """Return the process-wide execution log, opening it on first use"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ExecutionLog(path)
+    return _log
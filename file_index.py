@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+File Index - Cached existence, size, mtime and content hash of program scripts
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+DEFAULT_MIN_INTERVAL = 2.0
+
+
+def hash_file(path, chunk_size=65536):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileStatusIndex:
+    """Track a fixed set of files in one directory, re-hashing only files that changed"""
+
+    def __init__(self, root, filenames, min_interval=DEFAULT_MIN_INTERVAL):
+        self.root = root
+        self.filenames = list(dict.fromkeys(filenames))
+        self.min_interval = min_interval
+        self._status = {}
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Re-stat tracked files (at most once per min_interval); returns changed names"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_scan < self.min_interval:
+                return []
+            self._last_scan = now
+            try:
+                entries = {entry.name: entry for entry in os.scandir(self.root)}
+            except OSError:
+                entries = {}
+            changed = []
+            for name in self.filenames:
+                entry = entries.get(name)
+                try:
+                    stat = entry.stat() if entry is not None else None
+                except OSError:
+                    stat = None
+                if self._update(name, stat):
+                    changed.append(name)
+            return changed
+
+    def refresh_file(self, filename):
+        """Re-stat one file immediately, e.g. right before running it"""
+        try:
+            stat = os.stat(os.path.join(self.root, filename))
+        except OSError:
+            stat = None
+        with self._lock:
+            self._update(filename, stat)
+            return self._public(self._status[filename])
+
+    @staticmethod
+    def _public(status):
+        return {k: v for k, v in status.items() if not k.startswith("_")}
+
+    def _update(self, name, stat):
+        old = self._status.get(name)
+        if stat is None:
+            self._status[name] = {"exists": False, "size": None, "mtime": None, "sha256": None}
+            return old is None or old["exists"]
+        key = (stat.st_mtime_ns, stat.st_size)
+        if old and old["exists"] and old["_key"] == key:
+            return False
+        try:
+            digest = hash_file(os.path.join(self.root, name))
+        except OSError:
+            digest = None
+        self._status[name] = {
+            "exists": True,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": digest,
+            "_key": key,
+        }
+        return True
+
+    def status(self, filename):
+        """Return {exists, size, mtime, sha256} for a tracked file"""
+        self.refresh()
+        with self._lock:
+            status = self._status.get(filename)
+        if status is None:
+            return self.refresh_file(filename)
+        return self._public(status)
+
+    def exists(self, filename):
+        return self.status(filename)["exists"]
+
+    def script_hash(self, filename):
+        """Content hash of a script, to tie a run to the exact code version"""
+        return self.status(filename)["sha256"]
+
+    def hashes(self):
+        self.refresh()
+        with self._lock:
+            return {name: status["sha256"] for name, status in self._status.items()}
+
+    def missing(self):
+        self.refresh()
+        with self._lock:
+            return [name for name in self.filenames if not self._status[name]["exists"]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_file_index(root, filenames, min_interval=DEFAULT_MIN_INTERVAL):
+    """Return the process-wide index for the toolkit's program scripts"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FileStatusIndex(root, filenames, min_interval=min_interval)
+    return _index
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Job Runner - Run toolkit programs as headless child processes with captured output,
+and inline dashboard actions on a shared background thread pool
+"""
+
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_ACTIONS = 8
+MAX_OUTPUT_LINES = 2000
+MAX_FINISHED_JOBS = 100
+
+
+class Job:
+    """State of one program run: status, captured output and resource usage"""
+
+    def __init__(self, job_id, name, args, stdin_text=None):
+        self.id = job_id
+        self.name = name
+        self.args = list(args)
+        self.stdin_text = stdin_text
+        self.status = "QUEUED"
+        self.pid = None
+        self.returncode = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cpu_time = None
+        self.metadata = {}
+        self._output = deque(maxlen=MAX_OUTPUT_LINES)
+        self._output_lock = threading.Lock()
+        self._process = None
+        self._future = None
+        self._reaped = False
+        self._cancelled = False
+        # Guards _process/_reaped, so cancel() never signals a child that was already reaped
+        self._process_lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def wall_time(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns True if it did"""
+        return self._done.wait(timeout)
+
+    def add_output(self, stream, line):
+        with self._output_lock:
+            self._output.append((stream, line))
+
+    def output(self, since=0):
+        """Return captured (stream, line) pairs starting at index `since`"""
+        with self._output_lock:
+            return list(itertools.islice(self._output, since, None))
+
+    def output_text(self, last=None):
+        lines = [line for _, line in self.output()]
+        if last:
+            lines = lines[-last:]
+        return "".join(lines)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "program": self.name,
+            "status": self.status,
+            "exit_code": self.returncode,
+            "wall_s": round(self.wall_time, 2) if self.wall_time is not None else None,
+            "cpu_s": round(self.cpu_time, 2) if self.cpu_time is not None else None,
+            "sha256": (self.metadata.get("sha256") or "")[:12],
+        }
+
+
+class JobRunner:
+    """Run commands as child processes on a bounded worker pool"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, on_finish=None):
+        self.max_workers = max_workers
+        self.on_finish = on_finish
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, name, args, stdin_text=None, cwd=None, env=None, metadata=None):
+        """Queue a command and return its Job handle immediately"""
+        with self._lock:
+            job = Job(next(self._ids), name, args, stdin_text)
+            job.metadata.update(metadata or {})
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self._pool.submit(self._run, job, cwd, env)
+        return job
+
+    def submit_script(self, name, script, stdin_text=None, cwd=None, metadata=None):
+        """Queue a Python script with unbuffered, UTF-8 output"""
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        return self.submit(name, [sys.executable, "-u", script], stdin_text,
+                           cwd=cwd, env=env, metadata=metadata)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, name=None):
+        """Return known jobs, newest first, optionally for one program"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs.reverse()
+        return [job for job in jobs if name is None or job.name == name]
+
+    def active_count(self):
+        return sum(1 for job in self.jobs() if not job.done)
+
+    def cancel(self, job_id):
+        """Drop a queued job or terminate a running one; returns False if it already finished"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        if job._future is not None and job._future.cancel():
+            job.status = "CANCELLED"
+            job.error = "Cancelled before it started"
+            job.finished_at = time.time()
+            job._done.set()
+            self._notify(job)
+            return True
+        with job._process_lock:
+            # A job between starting and Popen() is terminated by _run once its process exists
+            job._cancelled = True
+            if job._process is not None and not job._reaped:
+                self._terminate(job)
+        return True
+
+    def shutdown(self, wait=False):
+        for job in self.jobs():
+            self.cancel(job.id)
+        self._pool.shutdown(wait=wait)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _pump(self, job, pipe, stream):
+        try:
+            for line in iter(pipe.readline, ""):
+                job.add_output(stream, line)
+        finally:
+            pipe.close()
+
+    def _terminate(self, job):
+        """Signal the child; called with _process_lock held and the child not reaped yet"""
+        if not (hasattr(os, "waitid") and hasattr(os, "wait4")):
+            job._process.terminate()
+            return
+        # Not Popen.terminate(): its poll() may reap a child that _wait() has seen
+        # exit, and wait4() would then fail. An unreaped PID is never reused.
+        os.kill(job.pid, signal.SIGTERM)
+
+    def _wait(self, job, process):
+        """Reap the child and return (returncode, cpu_seconds)"""
+        if not (hasattr(os, "waitid") and hasattr(os, "wait4")):
+            return process.wait(), None
+        # Wait for the exit without reaping: until wait4() below the PID stays a
+        # zombie, so it cannot be reused by another process that cancel() might signal
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        with job._process_lock:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            job._reaped = True
+        return process.returncode, usage.ru_utime + usage.ru_stime
+
+    def _run(self, job, cwd, env):
+        job.status = "RUNNING"
+        job.started_at = time.time()
+        try:
+            process = subprocess.Popen(
+                job.args,
+                stdin=subprocess.PIPE if job.stdin_text is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                cwd=cwd,
+                env=env,
+            )
+            with job._process_lock:
+                job._process = process
+                job.pid = process.pid
+                if job._cancelled:
+                    self._terminate(job)
+            readers = [
+                threading.Thread(target=self._pump, args=(job, process.stdout, "stdout"), daemon=True),
+                threading.Thread(target=self._pump, args=(job, process.stderr, "stderr"), daemon=True),
+            ]
+            for reader in readers:
+                reader.start()
+            if job.stdin_text is not None:
+                try:
+                    process.stdin.write(job.stdin_text)
+                    process.stdin.close()
+                except (BrokenPipeError, OSError):
+                    pass
+            job.returncode, job.cpu_time = self._wait(job, process)
+            for reader in readers:
+                reader.join()
+            job.status = "FINISHED" if job.returncode == 0 else "FAILED"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "FAILED"
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+        self._notify(job)
+
+    def _notify(self, job):
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception:
+                pass
+
+
+class Task:
+    """Handle for an inline action running on the shared thread pool"""
+
+    def __init__(self, task_id, name, log_message=""):
+        self.id = task_id
+        self.name = name
+        self.log_message = log_message
+        self.status = "QUEUED"
+        self.progress = ""
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def wall_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def set_progress(self, message):
+        """Called from the action to report what it is doing"""
+        self.progress = message
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class TaskExecutor:
+    """Run callables off the UI thread; each receives its Task so it can report progress"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_ACTIONS, on_finish=None):
+        self.on_finish = on_finish
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="action")
+        self._tasks = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, name, fn, log_message=""):
+        """Queue fn(task) and return the Task handle immediately"""
+        with self._lock:
+            task = Task(next(self._ids), name, log_message)
+            self._tasks[task.id] = task
+            finished = [task_id for task_id, t in self._tasks.items() if t.done]
+            for task_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._tasks[task_id]
+        self._pool.submit(self._run, task, fn)
+        return task
+
+    def get(self, task_id):
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def _run(self, task, fn):
+        task.status = "RUNNING"
+        task.started_at = time.time()
+        try:
+            task.result = fn(task)
+            task.status = "FINISHED"
+        except Exception as e:
+            task.error = str(e)
+            task.status = "FAILED"
+        finally:
+            task.finished_at = time.time()
+            task._done.set()
+        if self.on_finish is not None:
+            try:
+                self.on_finish(task)
+            except Exception:
+                pass
+
+
+_runner = None
+_executor = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner(max_workers=DEFAULT_MAX_WORKERS, on_finish=None):
+    """Return the process-wide job runner, creating it on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(max_workers=max_workers, on_finish=on_finish)
+    return _runner
+
+
+def get_task_executor(max_workers=DEFAULT_MAX_ACTIONS, on_finish=None):
+    """Return the process-wide action executor, creating it on first use"""
+    global _executor
+    with _runner_lock:
+        if _executor is None:
+            _executor = TaskExecutor(max_workers=max_workers, on_finish=on_finish)
+    return _executor
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Mailer - Shared SMTP helpers for the email tools: connection reuse and bulk sending
+"""
+
+import base64
+import csv
+import io
+import json
+import mimetypes
+import os
+import re
+import smtplib
+import string
+import tempfile
+import threading
+import time
+import tracemalloc
+from email import policy
+from email.message import Message
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr, getaddresses, make_msgid
+
+from worker_pool import run_workers
+
+DEFAULT_HOST = "smtp.gmail.com"
+DEFAULT_PORT = 587
+DEFAULT_MAX_PER_SESSION = 100
+
+# Wire format for streamed messages: compat32 header encoding with CRLF line ends
+_SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+# Raw bytes read per attachment chunk; a multiple of 57 so base64 lines stay 76 chars
+_CHUNK_SIZE = 57 * 1024
+# Encoded attachments up to this size are cached in memory, larger ones in a temp file
+_MEMORY_CACHE_LIMIT = 1024 * 1024
+
+
+def _text_part(text, subtype):
+    # Plain ASCII goes out as 7bit; only non-ASCII text pays for base64 encoding
+    return MIMEText(text, subtype, "us-ascii" if text.isascii() else "utf-8")
+
+
+def _address_header(value):
+    """Address header value with only display names RFC 2047-encoded
+
+    Left to compat32, "José <jose@example.com>" would become one encoded
+    word and the address would be unreadable to mail servers.
+    """
+    return ", ".join(formataddr(pair, "utf-8") for pair in getaddresses([value]))
+
+
+def build_message(sender, recipient, subject, body, html=None, attachments=None):
+    """Build the simplest email the content needs
+
+    A plain-text body is a single text/plain part; multipart/alternative is
+    only used when an HTML version is given as well. With attachments the
+    result is a StreamingMessage, sent without loading the files in memory.
+    """
+    if attachments:
+        return StreamingMessage(sender, recipient, subject, body, attachments, html)
+    if html is None:
+        msg = _text_part(body, "plain")
+    else:
+        msg = MIMEMultipart("alternative")
+        msg.attach(_text_part(body, "plain"))
+        msg.attach(_text_part(html, "html"))
+    msg["From"] = _address_header(sender)
+    msg["To"] = _address_header(recipient)
+    msg["Subject"] = subject
+    return msg
+
+
+class Attachment:
+    """A file attached by streaming: read and base64-encoded one chunk at a time
+
+    `source` is a path or a binary file object. With cache=True (for files
+    shared by many recipients) the encoded form is written once, to memory
+    or a temp file, and every later message replays it instead of encoding
+    again. Without it each message re-reads and re-encodes the source.
+    """
+
+    def __init__(self, source, filename=None, content_type=None, cache=True):
+        self.source = source
+        self.filename = filename or os.path.basename(str(getattr(source, "name", source)))
+        self.content_type = (content_type or mimetypes.guess_type(self.filename)[0]
+                             or "application/octet-stream")
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self._encoded = None
+        self._encoded_size = 0
+        maintype, subtype = self.content_type.split("/", 1)
+        part = MIMEBase(maintype, subtype)
+        part.add_header("Content-Disposition", "attachment", filename=self.filename)
+        part["Content-Transfer-Encoding"] = "base64"
+        self.headers = part.as_bytes(policy=_SMTP_POLICY)
+
+    def _raw_chunks(self):
+        if isinstance(self.source, (str, os.PathLike)):
+            with open(self.source, "rb") as f:
+                while True:
+                    chunk = f.read(_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        else:
+            position = 0
+            while True:
+                # File objects may be shared by several sending threads
+                with self._lock:
+                    self.source.seek(position)
+                    chunk = self.source.read(_CHUNK_SIZE)
+                if not chunk:
+                    return
+                position += len(chunk)
+                yield chunk
+
+    def _encode(self):
+        for chunk in self._raw_chunks():
+            yield base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+    def _fill_cache(self):
+        # The first message to need the attachment encodes it; the others wait for it
+        with self._fill_lock:
+            if self._encoded is not None:
+                return
+            target = io.BytesIO()
+            for encoded in self._encode():
+                target.write(encoded)
+                if isinstance(target, io.BytesIO) and target.tell() > _MEMORY_CACHE_LIMIT:
+                    spill = tempfile.TemporaryFile()
+                    spill.write(target.getvalue())
+                    target = spill
+            self._encoded_size = target.tell()
+            self._encoded = target.getvalue() if isinstance(target, io.BytesIO) else target
+
+    def encoded_chunks(self):
+        """Yield the base64 body in CRLF-terminated 76-character lines"""
+        if not self.cache:
+            yield from self._encode()
+            return
+        self._fill_cache()
+        if isinstance(self._encoded, bytes):
+            yield self._encoded
+            return
+        for position in range(0, self._encoded_size, _CHUNK_SIZE):
+            with self._lock:
+                self._encoded.seek(position)
+                chunk = self._encoded.read(_CHUNK_SIZE)
+            yield chunk
+
+    def close(self):
+        """Release the cached encoding, including its temp file; safe to call again"""
+        if self._encoded is not None and not isinstance(self._encoded, bytes):
+            self._encoded.close()
+        self._encoded = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def close_attachments(attachments):
+    """Close every attachment once the messages that use them are sent"""
+    for attachment in attachments or ():
+        attachment.close()
+
+
+class StreamingMessage:
+    """A multipart/mixed email whose attachments are streamed into SMTP DATA
+
+    smtp_chunks() yields the message already in wire format (CRLF line ends,
+    leading dots doubled), so memory use per message is one chunk rather
+    than the whole encoded message.
+    """
+
+    def __init__(self, sender, recipient, subject, body, attachments, html=None):
+        self.sender = sender
+        self.recipient = recipient
+        self.subject = subject
+        self.attachments = list(attachments)
+        headers = Message()
+        headers["From"] = _address_header(sender)
+        headers["To"] = _address_header(recipient)
+        headers["Subject"] = subject
+        headers["MIME-Version"] = "1.0"
+        headers["Message-ID"] = make_msgid()
+        headers["Content-Type"] = "multipart/mixed"
+        self.boundary = f"=={make_msgid()[1:-1].replace('@', '.')}=="
+        headers.set_boundary(self.boundary)
+        head = headers.as_bytes(policy=_SMTP_POLICY).split(b"\r\n\r\n", 1)[0]
+        body_part = build_message(sender, recipient, subject, body, html)
+        for name in ("From", "To", "Subject"):
+            del body_part[name]
+        self._head = _quote_periods(head + b"\r\n\r\n--" + self.boundary.encode() + b"\r\n"
+                                    + body_part.as_bytes(policy=_SMTP_POLICY))
+
+    def __getitem__(self, name):
+        return {"From": self.sender, "To": self.recipient, "Subject": self.subject}.get(name)
+
+    def smtp_chunks(self):
+        yield self._head
+        delimiter = b"\r\n--" + self.boundary.encode()
+        for attachment in self.attachments:
+            yield delimiter + b"\r\n" + attachment.headers
+            # Base64 lines never start with a dot, so they need no quoting
+            yield from attachment.encoded_chunks()
+        yield delimiter + b"--\r\n"
+
+    def as_bytes(self):
+        """The whole message as sent on the wire (loads every attachment in memory)"""
+        return b"".join(self.smtp_chunks())
+
+
+def _quote_periods(data):
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+class TextTemplate:
+    """A text with {column} placeholders, compiled once
+
+    Placeholders use column names from the recipient file, e.g.
+    "Hi {first_name}". The text is parsed once into a %-format string, so
+    rendering a recipient is a single C-level substitution.
+    """
+
+    def __init__(self, text):
+        self.fields = set()
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            parts.append(literal.replace("%", "%%"))
+            if field is None:
+                continue
+            name = field.strip().lower()
+            if not name.isidentifier() or spec or conversion:
+                raise ValueError(f"Unsupported placeholder {{{field}}}: use plain column names")
+            self.fields.add(name)
+            parts.append(f"%({name})s")
+        self._format = "".join(parts)
+
+    def missing_fields(self, columns):
+        """Placeholders that a file with these columns cannot fill"""
+        return sorted(self.fields - {c.lower() for c in columns})
+
+    def render(self, row):
+        try:
+            return self._format % row
+        except KeyError as e:
+            raise ValueError(f"Recipient has no value for {{{e.args[0]}}}") from None
+
+
+class MessageTemplate:
+    """Mail-merge template for subject, body and optional HTML"""
+
+    def __init__(self, subject, body, html=None, attachments=None):
+        self.attachments = attachments
+        self._subject = TextTemplate(subject)
+        self._body = TextTemplate(body)
+        self._html = TextTemplate(html) if html is not None else None
+        self.fields = self._subject.fields | self._body.fields | (self._html.fields if self._html else set())
+
+    def missing_fields(self, columns):
+        """Placeholders that a file with these columns cannot fill"""
+        return sorted(self.fields - {c.lower() for c in columns})
+
+    def render(self, row):
+        """Return (subject, body, html) for one recipient row"""
+        # Header values must stay on one line whatever the data contains
+        subject = " ".join(self._subject.render(row).splitlines())
+        html = self._html.render(row) if self._html is not None else None
+        return subject, self._body.render(row), html
+
+    def build(self, sender, row):
+        """Render the template for `row` and build its message"""
+        subject, body, html = self.render(row)
+        return build_message(sender, row["email"], subject, body, html, self.attachments)
+
+
+def measure_build(make_message, rows, limit=200):
+    """Average CPU time and peak allocation to build and serialize one message
+
+    Runs `make_message` over up to `limit` rows; returns a dict with
+    cpu_us and alloc_kb per message, for sizing large merges.
+    """
+    rows = [row for row, _ in zip(rows, range(limit))]
+    if not rows:
+        return {"messages": 0, "cpu_us": 0.0, "alloc_kb": 0.0}
+    def serialize(msg):
+        if isinstance(msg, StreamingMessage):
+            for _ in msg.smtp_chunks():
+                pass
+        else:
+            msg.as_bytes()
+
+    started = time.process_time()
+    for row in rows:
+        serialize(make_message(row))
+    cpu = (time.process_time() - started) / len(rows)
+    peaks = 0
+    tracemalloc.start()
+    try:
+        for row in rows:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            serialize(make_message(row))
+            peaks += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return {"messages": len(rows), "cpu_us": cpu * 1e6, "alloc_kb": peaks / len(rows) / 1024}
+
+
+def read_body():
+    """Read a multi-line email body from the terminal until an empty line"""
+    print("Enter email body (press Enter twice to finish):")
+    body_lines = []
+    while True:
+        line = input()
+        if line == "":
+            break
+        body_lines.append(line)
+    return "\n".join(body_lines)
+
+
+def read_recipients(source, fmt=None, key="email"):
+    """Stream recipient rows ({"email": ..., other columns}) from CSV, JSONL or plain text
+
+    `source` is a path or a text file object; the format comes from the file
+    extension unless given. CSV needs an `email` column; JSONL needs an
+    `email` key; plain text is one address per line. Other channels pass
+    their own `key` (e.g. "phone").
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = fmt or os.path.splitext(str(source))[1].lstrip(".").lower()
+        with open(source, newline="", encoding="utf-8") as f:
+            yield from read_recipients(f, fmt, key)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        source = io.StringIO(source.decode("utf-8"))
+    if fmt == "csv":
+        for row in csv.DictReader(source):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            if row.get(key):
+                yield row
+    elif fmt in ("jsonl", "ndjson", "json"):
+        for line in source:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                if row.get(key):
+                    yield row
+    else:
+        for line in source:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield {key: line}
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, reused across messages
+
+    Reconnects after `max_per_session` messages (many providers cap messages
+    per connection) and once more when the server drops the session or
+    answers 421 (service closing / too many messages).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, username=None, password=None,
+                 use_tls=True, max_per_session=DEFAULT_MAX_PER_SESSION, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_per_session = max_per_session
+        self.timeout = timeout
+        self.connections = 0
+        self._server = None
+        self._sent_in_session = 0
+
+    def connect(self):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._server = server
+        self._sent_in_session = 0
+        self.connections += 1
+        return server
+
+    @property
+    def connected(self):
+        return self._server is not None
+
+    def send(self, msg, sender=None, recipients=None):
+        """Send one message, opening or recycling the connection as needed"""
+        if self._server is None or (self.max_per_session and self._sent_in_session >= self.max_per_session):
+            self.connect()
+        deliver = self._stream if isinstance(msg, StreamingMessage) else self._server.send_message
+        try:
+            deliver(msg, from_addr=sender, to_addrs=recipients)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+            if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code != 421:
+                raise
+            self.connect()
+            deliver = self._stream if isinstance(msg, StreamingMessage) else self._server.send_message
+            deliver(msg, from_addr=sender, to_addrs=recipients)
+        self._sent_in_session += 1
+
+    def _stream(self, msg, from_addr=None, to_addrs=None):
+        """MAIL/RCPT/DATA like smtplib.sendmail, writing the body chunk by chunk"""
+        server = self._server
+        from_addr = from_addr or msg.sender
+        to_addrs = [to_addrs] if isinstance(to_addrs, str) else (to_addrs or [msg.recipient])
+        server.ehlo_or_helo_if_needed()
+        code, resp = server.mail(from_addr)
+        if code != 250:
+            if code == 421:
+                server.close()
+            else:
+                server.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        refused = {}
+        for addr in to_addrs:
+            code, resp = server.rcpt(addr)
+            if code not in (250, 251):
+                refused[addr] = (code, resp)
+            if code == 421:
+                server.close()
+                raise smtplib.SMTPRecipientsRefused(refused)
+        if len(refused) == len(to_addrs):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        code, resp = server.docmd("data")
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        for chunk in msg.smtp_chunks():
+            server.send(chunk)
+        server.send(b".\r\n")
+        code, resp = server.getreply()
+        if code != 250:
+            if code == 421:
+                server.close()
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                self._server.close()
+            except OSError:
+                pass
+            self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BulkResult:
+    """Counts and errors from a bulk send"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.errors = []
+        self.connections = 0
+        self.aborted = None
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"BulkResult(sent={self.sent}, failed={self.failed}, aborted={self.aborted!r}, "
+                f"connections={self.connections}, elapsed={self.elapsed:.2f}s)")
+
+
+def session_fatal(error, session):
+    """Errors that every later message would hit too: login refused or no connection at all"""
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError)):
+        return True
+    # send() reconnects first, so a failure that leaves no connection came from connect()
+    return session is None or not session.connected
+
+
+def send_bulk(rows, make_message, session_factory, connections=1, on_progress=None):
+    """Send one message per recipient row over a small pool of reused SMTP sessions
+
+    `make_message(row)` returns the message for a row; `session_factory()`
+    returns a new SMTPSession. Rows are streamed through a bounded queue, so
+    the recipient list is never held in memory. A failed login or
+    connection stops the whole run (`result.aborted` says why) instead of
+    retrying it once per recipient.
+    """
+    result = BulkResult()
+    lock = threading.Lock()
+    sessions = []
+    started = time.perf_counter()
+
+    def open_session():
+        session = session_factory()
+        with lock:
+            sessions.append(session)
+        return session
+
+    def send(session, row):
+        msg = None
+        try:
+            msg = make_message(row)
+            session.send(msg)
+            with lock:
+                result.sent += 1
+        except Exception as e:
+            # A row whose message cannot be built says nothing about the session
+            if msg is not None and session_fatal(e, session):
+                raise
+            with lock:
+                result.failed += 1
+                result.errors.append((row.get("email"), str(e)))
+        if on_progress is not None:
+            try:
+                on_progress(result)
+            except Exception:
+                pass
+
+    error = run_workers(rows, send, connections, open_session)
+    if error is not None:
+        result.aborted = str(error)
+    result.connections = sum(session.connections for session in sessions)
+    result.elapsed = time.perf_counter() - started
+    return result
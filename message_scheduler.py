@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Message Scheduler - Persistent heap-based scheduler that fires messages from one worker thread
+"""
+
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from mailer import TextTemplate
+
+DEFAULT_PATH = os.environ.get(
+    "TOOLKIT_SCHEDULE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheduled_messages.db"),
+)
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    due REAL NOT NULL,
+    channel TEXT NOT NULL DEFAULT 'whatsapp',
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT NOT NULL DEFAULT '',
+    fired_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_state ON scheduled (state, due);
+"""
+
+
+def parse_send_time(text, now=None):
+    """Epoch seconds for "HH:MM" (next occurrence) or a full "YYYY-MM-DD HH:MM[:SS]" time"""
+    text = text.strip()
+    now = now or datetime.now()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    try:
+        clock = datetime.strptime(text, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Invalid send time {text!r}: use HH:MM or YYYY-MM-DD HH:MM") from None
+    when = datetime.combine(now.date(), clock)
+    if when <= now:
+        when += timedelta(days=1)
+    return when.timestamp()
+
+
+def schedule_items(rows, message=None, send_at=None):
+    """(phone, text, due) items from recipient rows
+
+    Each row needs a `phone`; the text is the row's `message` column or the
+    `message` template ({column} placeholders allowed), and the time is the
+    row's `send_at` column or the `send_at` default (see parse_send_time).
+    """
+    template = TextTemplate(message) if message else None
+    default_due = parse_send_time(send_at) if send_at else None
+    for row in rows:
+        text = template.render(row) if template else row.get("message", "")
+        if not text:
+            raise ValueError(f"No message for {row['phone']}")
+        due = parse_send_time(row["send_at"]) if row.get("send_at") else default_due
+        if due is None:
+            raise ValueError(f"No send_at time for {row['phone']}")
+        yield row["phone"], text, due
+
+
+def whatsapp_web_delivery(recipient, message):
+    """Default delivery: send through WhatsApp Web with pywhatkit"""
+    import pywhatkit
+    pywhatkit.sendwhatmsg_instantly(recipient, message, wait_time=15, tab_close=True)
+
+
+class StubDelivery:
+    """Delivery for tests and dry runs: records (fired_at, recipient, message)"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def __call__(self, recipient, message):
+        with self._lock:
+            self.sent.append((time.time(), recipient, message))
+
+
+class MessageScheduler:
+    """Scheduled messages kept in SQLite and fired in due order by a single worker
+
+    Pending messages live in a heap of (due, id), so the worker sleeps until
+    the earliest one instead of each message holding its own timer or
+    process. Pending messages are reloaded on start; ones more than
+    `max_late` seconds overdue are marked missed instead of being sent.
+    `deliver(recipient, message)` does the sending and is pluggable;
+    `on_result(entry, state, error)` is told the outcome, with the delivery
+    time in entry["elapsed"] for sent and failed messages.
+
+    Several processes (the dashboard and the CLI) may load the same
+    queue, so each message is claimed in the database ('pending' ->
+    'sending') before it is delivered and skipped if another process got
+    there first. A message still 'sending' `stale_after` seconds after it
+    was claimed belonged to a process that died mid-delivery; it is marked
+    unknown on start rather than risk sending it twice.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, deliver=whatsapp_web_delivery, on_result=None,
+                 max_late=3600, clock=time.time, stale_after=600):
+        self.path = path
+        self.deliver = deliver
+        self.on_result = on_result
+        self.max_late = max_late
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap = []
+        self._pending = {}
+        self._thread = None
+        self._stopping = False
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # fired_at holds the claim time while a message is 'sending'
+        self._conn.execute(
+            "UPDATE scheduled SET state = 'unknown', error = 'Interrupted during delivery; not re-sent' "
+            "WHERE state = 'sending' AND fired_at < ?",
+            (clock() - stale_after,),
+        )
+        for row in self._conn.execute("SELECT id, due, recipient, message FROM scheduled WHERE state = 'pending'"):
+            self._pending[row["id"]] = dict(row)
+            self._heap.append((row["due"], row["id"]))
+        heapq.heapify(self._heap)
+
+    def schedule(self, recipient, message, due, channel="whatsapp"):
+        """Queue one message for `due` (epoch seconds or datetime); returns its id"""
+        return self.schedule_many([(recipient, message, due)], channel)[0]
+
+    def schedule_many(self, items, channel="whatsapp"):
+        """Queue many (recipient, message, due) items in one transaction; returns their ids"""
+        rows = [(r, m, d.timestamp() if isinstance(d, datetime) else float(d)) for r, m, d in items]
+        ids = []
+        with self._cond:
+            self._conn.execute("BEGIN")
+            for recipient, message, due in rows:
+                cur = self._conn.execute(
+                    "INSERT INTO scheduled (due, channel, recipient, message) VALUES (?, ?, ?, ?)",
+                    (due, channel, recipient, message),
+                )
+                ids.append(cur.lastrowid)
+            self._conn.execute("COMMIT")
+            for message_id, (recipient, message, due) in zip(ids, rows):
+                self._pending[message_id] = {"id": message_id, "due": due, "recipient": recipient,
+                                             "message": message}
+                heapq.heappush(self._heap, (due, message_id))
+            self._cond.notify()
+        return ids
+
+    def cancel(self, message_id):
+        """Cancel a pending message; returns False if it already fired or does not exist"""
+        with self._cond:
+            # The heap entry is skipped when it comes up
+            self._pending.pop(message_id, None)
+            cur = self._conn.execute("UPDATE scheduled SET state = 'cancelled' WHERE id = ? AND state = 'pending'",
+                                     (message_id,))
+            self._cond.notify()
+        return cur.rowcount == 1
+
+    def pending(self, limit=None):
+        """Pending messages in due order"""
+        with self._cond:
+            entries = sorted(self._pending.values(), key=lambda entry: entry["due"])
+        return entries[:limit] if limit else entries
+
+    def history(self, limit=50):
+        """Most recently fired, failed, missed or cancelled messages"""
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT * FROM scheduled WHERE state != 'pending' ORDER BY COALESCE(fired_at, due) DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _next_due(self):
+        """Wait for and pop the next due message; None when stopping"""
+        with self._cond:
+            while not self._stopping:
+                while self._heap and self._heap[0][1] not in self._pending:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, message_id = self._heap[0]
+                delay = due - self._clock()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return self._pending.pop(message_id)
+        return None
+
+    def _claim(self, entry):
+        """Mark a due message as being sent; False if another process claimed or cancelled it"""
+        with self._cond:
+            cur = self._conn.execute(
+                "UPDATE scheduled SET state = 'sending', fired_at = ? WHERE id = ? AND state = 'pending'",
+                (self._clock(), entry["id"]),
+            )
+        return cur.rowcount == 1
+
+    def _finish(self, entry, state, error=""):
+        with self._cond:
+            self._conn.execute(
+                "UPDATE scheduled SET state = ?, error = ?, fired_at = ? WHERE id = ?",
+                (state, error, self._clock(), entry["id"]),
+            )
+        if self.on_result is not None:
+            try:
+                self.on_result(entry, state, error)
+            except Exception:
+                pass
+
+    def _run(self):
+        while True:
+            entry = self._next_due()
+            if entry is None:
+                return
+            if not self._claim(entry):
+                continue
+            if self.max_late is not None and self._clock() - entry["due"] > self.max_late:
+                self._finish(entry, "missed", "More than max_late seconds overdue")
+                continue
+            started = time.perf_counter()
+            try:
+                self.deliver(entry["recipient"], entry["message"])
+                entry["elapsed"] = time.perf_counter() - started
+                self._finish(entry, "sent")
+            except Exception as e:
+                entry["elapsed"] = time.perf_counter() - started
+                self._finish(entry, "failed", str(e))
+
+    def start(self):
+        """Start the worker thread (idempotent)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="message-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop after the message being delivered, if any; pending ones stay queued"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """Start the worker and block until interrupted"""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(0.5)
+        finally:
+            self.stop()
+
+    def close(self):
+        self.stop()
+        with self._cond:
+            self._conn.close()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(path=DEFAULT_PATH, deliver=whatsapp_web_delivery, on_result=None):
+    """Return the process-wide scheduler, creating and starting it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MessageScheduler(path, deliver, on_result).start()
+    return _scheduler
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Metrics Exporter - Prometheus text-format endpoint for host and toolkit metrics
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def collect(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [] if value is None else [f"{self.name} {_number(value)}"]
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._register(Gauge(name, help_text, read))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+RUNS = REGISTRY.counter("toolkit_runs_total", "Program executions by status", ("program", "status"))
+ERRORS = REGISTRY.counter("toolkit_errors_total", "Failed program executions", ("program",))
+SEND_LATENCY = REGISTRY.histogram(
+    "toolkit_send_latency_seconds", "Latency of inline send actions by channel", ("channel",)
+)
+# Dashboard actions that deliver a message, by channel; other actions (search,
+# downloads, wa.me link generation) send nothing and are not timed
+ACTION_CHANNELS = {
+    "Send Email": "email",
+    "Anonymous Email": "email",
+    "Send SMS": "sms",
+    "Phone Call": "call",
+    "Send WhatsApp Message": "whatsapp",
+    "Twitter Post": "twitter",
+}
+
+
+def record_execution(program, status):
+    """Count one log_execution entry (called on the logging path, O(1))"""
+    RUNS.inc(program=program, status=status)
+    if status in ("ERROR", "FAILED"):
+        ERRORS.inc(program=program)
+
+
+def record_send(action, seconds):
+    """Time one finished dashboard action under its channel; returns False if it sends nothing"""
+    channel = ACTION_CHANNELS.get(action)
+    if channel is None:
+        return False
+    SEND_LATENCY.observe(seconds, channel=channel)
+    return True
+
+
+def register_host_metrics(sampler, registry=REGISTRY):
+    """Expose the sampler's latest CPU/RAM reading as gauges, read only when scraped"""
+    def reader(key, scale=1.0):
+        def read():
+            sample = sampler.latest()
+            return None if sample is None else sample[key] * scale
+        return read
+
+    gib = 1024**3
+    registry.gauge("toolkit_host_cpu_percent", "Host CPU utilisation", reader("cpu_percent"))
+    registry.gauge("toolkit_host_memory_percent", "Host RAM utilisation", reader("ram_percent"))
+    registry.gauge("toolkit_host_memory_total_bytes", "Host RAM total", reader("ram_total", gib))
+    registry.gauge("toolkit_host_memory_used_bytes", "Host RAM used", reader("ram_used", gib))
+    registry.gauge("toolkit_host_memory_available_bytes", "Host RAM available", reader("ram_available", gib))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def start_exporter(port, host="0.0.0.0", registry=REGISTRY):
+    """Serve /metrics on a daemon thread; calling again for the same port is a no-op"""
+    with _servers_lock:
+        server = _servers.get(port)
+        if server is None:
+            handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+            server = ThreadingHTTPServer((host, port), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+            _servers[port] = server
+    return server
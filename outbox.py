@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Outbox - Durable, resumable send queue for the email, SMS and SendGrid tools (SQLite)
+"""
+
+import itertools
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+
+from rate_limit import backoff_delay
+
+DEFAULT_PATH = os.environ.get(
+    "TOOLKIT_OUTBOX_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.db"),
+)
+
+# Message states. A message is "sending" between being claimed and its result
+# being committed; after a crash those are "unknown", because the provider
+# may or may not have accepted them.
+PENDING, SENDING, SENT, FAILED, UNKNOWN = "pending", "sending", "sent", "failed", "unknown"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    name TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    meta TEXT NOT NULL DEFAULT '{}',
+    created REAL NOT NULL,
+    loaded_rows INTEGER NOT NULL DEFAULT 0,
+    loaded INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    provider_id TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL DEFAULT 0,
+    UNIQUE (campaign, key)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_due ON messages (campaign, state, next_attempt);
+"""
+
+
+class PermanentError(Exception):
+    """Raised by a send function for failures that retrying cannot fix"""
+
+
+def is_retryable(error):
+    """Default retry policy: bad data, permanent errors and 4xx API replies are not retried
+
+    HTTP 408 and 429 are the exceptions: they are worth another try later.
+    """
+    if isinstance(error, (PermanentError, ValueError, KeyError)):
+        return False
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status not in (408, 429))
+
+
+def is_fatal(error):
+    """Default stop policy: authentication failures would fail every message alike"""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status in (401, 403) or isinstance(
+        error, (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError))
+
+
+def describe_counts(counts):
+    """One-line summary of state counts, e.g. sent 120, pending 30"""
+    order = (SENT, PENDING, SENDING, FAILED, UNKNOWN)
+    return ", ".join(f"{state} {counts[state]}" for state in order if counts.get(state)) or "empty"
+
+
+class Outbox:
+    """Campaign messages with an idempotency key and a state each
+
+    Messages are loaded once from the recipient stream (one row per unique
+    key), claimed in small batches and their results written back in one
+    transaction per batch. The database runs in WAL mode with
+    synchronous=NORMAL, so there is no fsync per message.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, commit_every=50, commit_interval=1.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending_updates = []
+        self._last_commit = time.monotonic()
+
+    def campaign(self, name):
+        """Return the campaign row as a dict (meta decoded), or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM campaigns WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        campaign = dict(row)
+        campaign["meta"] = json.loads(campaign["meta"])
+        return campaign
+
+    def create_campaign(self, name, channel, meta=None):
+        """Create a campaign; an existing campaign with this name is kept as is"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO campaigns (name, channel, meta, created) VALUES (?, ?, ?, ?)",
+                (name, channel, json.dumps(meta or {}), time.time()),
+            )
+        return self.campaign(name)
+
+    def load(self, name, rows, key="email", batch_size=500):
+        """Queue one message per row, skipping rows loaded by an earlier, interrupted load
+
+        `key` is the column used as the idempotency key (normalized to
+        lowercase); a row's own `idempotency_key` column takes precedence.
+        Rows with a key already in the campaign are ignored. Returns the
+        number of new messages.
+        """
+        campaign = self.campaign(name)
+        if campaign is None:
+            raise ValueError(f"Unknown campaign: {name}")
+        if campaign["loaded"]:
+            return 0
+        position = campaign["loaded_rows"]
+        rows = itertools.islice(rows, position, None)
+        added = 0
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            records = []
+            for row in batch:
+                value = row.get("idempotency_key") or row.get(key) or ""
+                if value:
+                    records.append((name, str(value).strip().lower(), json.dumps(row)))
+            position += len(batch)
+            with self._lock:
+                self._conn.execute("BEGIN")
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages (campaign, key, payload) VALUES (?, ?, ?)", records
+                )
+                added += self._conn.total_changes - before
+                self._conn.execute(
+                    "UPDATE campaigns SET loaded_rows = ?, loaded = ? WHERE name = ?",
+                    (position, int(len(batch) < batch_size), name),
+                )
+                self._conn.execute("COMMIT")
+            if len(batch) < batch_size:
+                return added
+
+    def recover(self, name, resend=False):
+        """Deal with messages left "sending" by a crash; returns how many were changed
+
+        By default they become "unknown" and are not sent again. With
+        resend=True they, and earlier unknown messages, go back to "pending".
+        """
+        with self._lock:
+            if resend:
+                cur = self._conn.execute(
+                    "UPDATE messages SET state = ?, updated = ? WHERE campaign = ? AND state IN (?, ?)",
+                    (PENDING, time.time(), name, SENDING, UNKNOWN),
+                )
+            else:
+                cur = self._conn.execute(
+                    "UPDATE messages SET state = ?, updated = ? WHERE campaign = ? AND state = ?",
+                    (UNKNOWN, time.time(), name, SENDING),
+                )
+            return cur.rowcount
+
+    def claim(self, name, limit=None, now=None):
+        """Mark up to `limit` due messages as sending and return them"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, key, payload, attempts FROM messages "
+                "WHERE campaign = ? AND state = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (name, PENDING, now, limit or self.commit_every),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE messages SET state = ?, updated = ? WHERE id = ?",
+                [(SENDING, now, row["id"]) for row in rows],
+            )
+            self._conn.execute("COMMIT")
+        return [
+            {"id": row["id"], "key": row["key"], "attempts": row["attempts"],
+             "payload": json.loads(row["payload"])}
+            for row in rows
+        ]
+
+    def release(self, message_ids):
+        """Return claimed messages that were never attempted to pending"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE messages SET state = ? WHERE id = ? AND state = ?",
+                [(PENDING, message_id, SENDING) for message_id in message_ids],
+            )
+
+    def next_due(self, name):
+        """Earliest next_attempt among pending messages, or None when none are left"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt) FROM messages WHERE campaign = ? AND state = ?",
+                (name, PENDING),
+            ).fetchone()
+        return row[0]
+
+    def mark_sent(self, message_id, provider_id=""):
+        self._record((SENT, 0, "", provider_id or "", message_id))
+
+    def mark_failed(self, message_id, error, retry_at=None):
+        """Record a failed attempt; with retry_at the message goes back to pending"""
+        state = PENDING if retry_at is not None else FAILED
+        self._record((state, retry_at or 0, str(error)[:500], "", message_id))
+
+    def _record(self, update):
+        with self._lock:
+            self._pending_updates.append(update)
+            due = (len(self._pending_updates) >= self.commit_every
+                   or time.monotonic() - self._last_commit >= self.commit_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commit buffered results in one transaction"""
+        with self._lock:
+            updates, self._pending_updates = self._pending_updates, []
+            self._last_commit = time.monotonic()
+            if not updates:
+                return
+            now = time.time()
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE messages SET state = ?, next_attempt = ?, error = ?, provider_id = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(state, next_attempt, error, provider_id, now, message_id)
+                 for state, next_attempt, error, provider_id, message_id in updates],
+            )
+            self._conn.execute("COMMIT")
+
+    def counts(self, name):
+        """Number of messages per state"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM messages WHERE campaign = ? GROUP BY state", (name,)
+            ).fetchall()
+        return {state: count for state, count in rows}
+
+    def errors(self, name, limit=10):
+        """Recent (key, error) pairs for failed messages"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, error FROM messages WHERE campaign = ? AND state = ? "
+                "ORDER BY updated DESC LIMIT ?", (name, FAILED, limit),
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def run_outbox(outbox, name, send, max_attempts=5, retryable=is_retryable, fatal=is_fatal,
+               on_progress=None, base_delay=2.0, max_delay=300.0):
+    """Send a campaign's due messages until none are left pending
+
+    `send(payload)` delivers one message and may return a provider id.
+    Failures are retried with exponential backoff up to `max_attempts`
+    times; `retryable(error)` decides which failures are worth retrying and
+    `fatal(error)` which ones stop the run (the message stays pending).
+    Results are committed once per batch. If the run is interrupted, claimed
+    messages that were not attempted yet go back to pending; only a hard
+    crash can leave up to one batch in the "sending" state (see recover()).
+    Returns the final state counts.
+    """
+    unattempted = []
+    try:
+        while True:
+            batch = outbox.claim(name)
+            unattempted = [message["id"] for message in batch]
+            if not batch:
+                outbox.flush()
+                due = outbox.next_due(name)
+                if due is None:
+                    break
+                time.sleep(min(max(0.0, due - time.time()), 1.0))
+                continue
+            for message in batch:
+                unattempted.remove(message["id"])
+                try:
+                    outbox.mark_sent(message["id"], send(message["payload"]))
+                except Exception as e:
+                    if fatal(e):
+                        unattempted.append(message["id"])
+                        raise
+                    attempts = message["attempts"] + 1
+                    retry_at = None
+                    if attempts < max_attempts and retryable(e):
+                        retry_at = time.time() + backoff_delay(attempts - 1, base_delay, max_delay)
+                    outbox.mark_failed(message["id"], e, retry_at)
+                if on_progress is not None:
+                    on_progress(message)
+    finally:
+        outbox.flush()
+        outbox.release(unattempted)
+    return outbox.counts(name)
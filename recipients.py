@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Recipients - Streaming normalization, validation, dedup and suppression for every channel
+"""
+
+import csv
+import hashlib
+import io
+import math
+import os
+import re
+from email.utils import parseaddr
+from functools import lru_cache
+
+from mailer import read_recipients
+
+# Optional defaults: a suppression list (unsubscribes, bounces, do-not-call numbers)
+# applied to every bulk send, and the calling code for numbers written without one
+SUPPRESSION_FILE = os.environ.get("TOOLKIT_SUPPRESSION_FILE")
+DEFAULT_COUNTRY = os.environ.get("TOOLKIT_DEFAULT_COUNTRY") or None
+
+# Formatting people put in phone numbers: spaces, dashes, dots, slashes, brackets
+_PHONE_FORMATTING = re.compile(r"[\s\-./()\[\]]")
+# E.164 allows at most 15 digits; the shortest numbers in use have 7
+E164_MIN_DIGITS, E164_MAX_DIGITS = 7, 15
+
+_EMAIL_LOCAL = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*")
+_EMAIL_DOMAIN = re.compile(r"([A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z0-9-]{2,63}")
+_SUPPRESSION_COLUMNS = ("email", "phone", "address", "number")
+
+
+@lru_cache(maxsize=65536)
+def normalize_phone(raw, default_country=None):
+    """E.164 form ("+919876543210") of a phone number, or None if it is not valid
+
+    "+" and international "00" prefixes are understood. Other numbers are
+    national numbers of `default_country` (a calling code such as "91",
+    leading trunk zeros dropped; TOOLKIT_DEFAULT_COUNTRY when not given),
+    and are rejected when there is none: "9876543210" could be any
+    country's. Cached, because contact lists repeat the same numbers in
+    the same spellings.
+    """
+    text = _PHONE_FORMATTING.sub("", raw)
+    if text[:4].lower() == "tel:":
+        text = text[4:]
+    if text.startswith("+"):
+        digits = text[1:]
+    elif text.startswith("00"):
+        digits = text[2:]
+    elif default_country or DEFAULT_COUNTRY:
+        digits = (default_country or DEFAULT_COUNTRY).lstrip("+") + text.lstrip("0")
+    else:
+        return None
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS or digits[0] == "0":
+        return None
+    return "+" + digits
+
+
+@lru_cache(maxsize=65536)
+def normalize_email(raw):
+    """Bare address with a lower-case (IDNA) domain, or None if it is not valid
+
+    Accepts "Name <user@example.com>" and "mailto:" forms. The local part
+    keeps its case; dedup compares whole addresses case-insensitively.
+    """
+    address = raw.strip()
+    if "<" in address or '"' in address or " " in address:
+        address = parseaddr(address)[1]
+    if address[:7].lower() == "mailto:":
+        address = address[7:]
+    local, at, domain = address.rpartition("@")
+    if not at or len(address) > 254 or len(local) > 64 or not _EMAIL_LOCAL.fullmatch(local):
+        return None
+    domain = domain.lower()
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if not _EMAIL_DOMAIN.fullmatch(domain):
+        return None
+    return f"{local}@{domain}"
+
+
+def recipient_key(value, default_country=None):
+    """Normalized dedup/suppression key of an email address or phone number, or None"""
+    if "@" in value:
+        address = normalize_email(value)
+        return address.lower() if address else None
+    return normalize_phone(value, default_country)
+
+
+class BloomFilter:
+    """Fixed-size set membership with a bounded false-positive rate
+
+    Sized for `capacity` items at `error_rate`: about 1.8 MB per million
+    items at 0.1%. A false positive drops a recipient as a duplicate, never
+    the other way round.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = min(16, max(1, round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # One 32-bit slice of a single keyed hash per probe
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=4 * self.hashes).digest()
+        return [value % self.size for value in memoryview(digest).cast("I")]
+
+    def add(self, item):
+        """Add an item; returns True if it was (probably) already present"""
+        bits = self.bits
+        positions = self._positions(item)
+        if all(bits[p >> 3] >> (p & 7) & 1 for p in positions):
+            return True
+        for p in positions:
+            bits[p >> 3] |= 1 << (p & 7)
+        return False
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+def read_suppression(source, fmt=None, default_country=None):
+    """Set of recipient keys from a suppression list
+
+    CSV files use their email/phone/address/number columns; other files
+    are one address or number per line. Entries that do not normalize are
+    ignored.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = fmt or os.path.splitext(str(source))[1].lstrip(".").lower()
+        with open(source, newline="", encoding="utf-8") as f:
+            return read_suppression(f, fmt, default_country)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.StringIO(source.decode("utf-8"))
+    values = []
+    if fmt == "csv":
+        for row in csv.DictReader(source):
+            values.extend(v for k, v in row.items() if k and k.strip().lower() in _SUPPRESSION_COLUMNS and v)
+    else:
+        values = (line.strip() for line in source if line.strip() and not line.startswith("#"))
+    keys = set()
+    for value in values:
+        key = recipient_key(value, default_country)
+        if key:
+            keys.add(key)
+    return keys
+
+
+@lru_cache(maxsize=4)
+def _default_suppression(path, mtime, default_country):
+    return frozenset(read_suppression(path, default_country=default_country))
+
+
+def default_suppression(default_country=None):
+    """Keys from TOOLKIT_SUPPRESSION_FILE (re-read when the file changes), or an empty set"""
+    if not SUPPRESSION_FILE or not os.path.exists(SUPPRESSION_FILE):
+        return frozenset()
+    return _default_suppression(SUPPRESSION_FILE, os.path.getmtime(SUPPRESSION_FILE), default_country)
+
+
+class RecipientStats:
+    """What the pipeline kept and dropped"""
+
+    def __init__(self):
+        self.read = 0
+        self.kept = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.suppressed = 0
+        self.invalid_samples = []
+
+    def summary(self):
+        return (f"{self.read} read: {self.kept} kept, {self.invalid} invalid, "
+                f"{self.duplicates} duplicates, {self.suppressed} suppressed")
+
+    def __repr__(self):
+        return f"RecipientStats({self.summary()})"
+
+
+def clean_recipients(rows, key="email", default_country=None, suppress=None, dedup="set",
+                     expected=1_000_000, error_rate=0.001, stats=None):
+    """Yield rows whose `key` is a valid, first-seen, unsuppressed recipient
+
+    Single pass over a stream of rows: the `key` value is normalized
+    (E.164 for phones, cleaned address for emails, both cached), invalid
+    values, repeats and keys in `suppress` are dropped and counted in
+    `stats`, and kept rows carry the normalized value. dedup="set" keeps
+    every key seen; dedup="bloom" uses a BloomFilter sized for `expected`
+    recipients so memory stays fixed for very large lists; None disables
+    dedup. `suppress` defaults to TOOLKIT_SUPPRESSION_FILE.
+    """
+    normalize = normalize_email if key == "email" else lambda value: normalize_phone(value, default_country)
+    if suppress is None:
+        suppress = default_suppression(default_country)
+    if dedup == "bloom":
+        seen = BloomFilter(expected, error_rate)
+        first_seen = lambda item: not seen.add(item)  # noqa: E731
+    elif dedup == "set":
+        seen = set()
+
+        def first_seen(item):
+            if item in seen:
+                return False
+            seen.add(item)
+            return True
+    elif dedup is None:
+        first_seen = lambda item: True  # noqa: E731
+    else:
+        raise ValueError(f"Unknown dedup mode {dedup!r}: use 'set', 'bloom' or None")
+    stats = stats if stats is not None else RecipientStats()
+    for row in rows:
+        stats.read += 1
+        raw = row.get(key) or ""
+        value = normalize(raw)
+        if value is None:
+            stats.invalid += 1
+            if len(stats.invalid_samples) < 20:
+                stats.invalid_samples.append(raw)
+            continue
+        item = value.lower() if key == "email" else value
+        if item in suppress:
+            stats.suppressed += 1
+            continue
+        if not first_seen(item):
+            stats.duplicates += 1
+            continue
+        stats.kept += 1
+        yield row if raw == value else {**row, key: value}
+
+
+def load_recipients(source, fmt=None, key="email", default_country=None, suppress=None,
+                    dedup="set", stats=None):
+    """read_recipients() followed by clean_recipients(): the input for every bulk sender"""
+    return clean_recipients(read_recipients(source, fmt, key), key, default_country, suppress,
+                            dedup, stats=stats)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Rerun Profiler - Time dashboard sections per Streamlit rerun, optionally with cProfile
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# The cProfile.Profile left running by the last rerun, if it never reached finish()
+_active = None
+_active_lock = threading.Lock()
+
+
+class RerunProfiler:
+    """Collect wall-clock timings for one script run; a disabled profiler does no work"""
+
+    def __init__(self, enabled=False, use_cprofile=False):
+        self.enabled = enabled
+        self.timings = []
+        self._profile = cProfile.Profile() if enabled and use_cprofile else None
+        self._start = self._lap = time.perf_counter()
+        self._total = None
+        if self._profile is not None:
+            # A rerun cut short by st.rerun(), st.stop() or an exception never
+            # reaches finish(), so its profiler is switched off here instead
+            stop_leftover()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one profiler at a time (e.g. a debugger's); keep timings only
+                self._profile = None
+            else:
+                _set_active(self._profile)
+
+    def mark(self, name):
+        """Record the time since the previous mark under `name`"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.timings.append((name, (now - self._lap) * 1000))
+        self._lap = now
+
+    @contextmanager
+    def section(self, name):
+        """Time a nested block (e.g. one renderer) without moving the lap marker"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((name, (time.perf_counter() - start) * 1000))
+
+    def finish(self):
+        """Stop profiling and return the total rerun time in milliseconds; safe to call again"""
+        if self._total is None:
+            if self._profile is not None:
+                self._profile.disable()
+                _set_active(None, self._profile)
+            self._total = (time.perf_counter() - self._start) * 1000
+        return self._total
+
+    def stats_text(self, limit=25, sort="cumulative"):
+        """Top functions from cProfile as text, or '' when cProfile is off"""
+        if self._profile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, directory):
+        """Write cProfile stats to a timestamped .prof file and return its path"""
+        if self._profile is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+        self._profile.dump_stats(path)
+        return path
+
+
+def _set_active(profile, expected=None):
+    global _active
+    with _active_lock:
+        if expected is None or _active is expected:
+            _active = profile
+
+
+def stop_leftover():
+    """Disable the profiler of an earlier rerun that ended before finish(); True if one was running"""
+    global _active
+    with _active_lock:
+        profile, _active = _active, None
+    if profile is None:
+        return False
+    profile.disable()
+    return True
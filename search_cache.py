@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Search Cache - TTL/LRU cache of search results in SQLite with an in-memory front layer
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.environ.get(
+    "TOOLKIT_SEARCH_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.db"),
+)
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    num INTEGER NOT NULL,
+    results TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed);
+"""
+
+
+def normalize_query(query):
+    """Cache form of a query: Unicode-normalized, case-folded, single-spaced"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def google_backend(query, num):
+    """Default backend: live Google results through googlesearch-python"""
+    from googlesearch import search
+    return list(search(query, num_results=num))
+
+
+class SearchResults(list):
+    """Result URLs plus where they came from: "memory", "disk", "fetched" or "shared\""""
+
+    def __init__(self, urls, source, fetched):
+        super().__init__(urls)
+        self.source = source
+        self.fetched = fetched
+
+    @property
+    def age(self):
+        return time.time() - self.fetched
+
+
+class _Fetch:
+    """One in-flight backend call that identical concurrent lookups wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.urls = None
+        self.fetched = None
+        self.error = None
+
+
+class SearchCache:
+    """Search results cached on disk for `ttl` seconds, at most `max_entries` of them
+
+    Lookups check a small in-memory LRU first, then SQLite; a miss calls
+    `backend(query, num)` and stores the result. Identical lookups that
+    arrive while a fetch is running wait for it instead of fetching again.
+    When the table grows past `max_entries` the least recently used
+    entries are deleted. `backend` is pluggable so tests run offline.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, backend=google_backend, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, memory_entries=128, clock=time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._touched = {}
+        self._inflight = {}
+        self.counts = {"memory": 0, "disk": 0, "fetched": 0, "shared": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _remember(self, key, urls, fetched):
+        self._memory[key] = (urls, fetched)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _cached(self, key, now):
+        """Fresh (urls, source, fetched) for key, or None; called with the lock held"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                # Disk recency is written with the next store instead of on every hit
+                self._touched[key] = now
+                return entry[0], "memory", entry[1]
+            del self._memory[key]
+        row = self._conn.execute("SELECT results, fetched FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] >= self.ttl:
+            return None
+        urls = json.loads(row[0])
+        self._touched[key] = now
+        self._remember(key, urls, row[1])
+        return urls, "disk", row[1]
+
+    def _store(self, key, query, num, urls, fetched):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                size = self._size + self._conn.execute(
+                    "SELECT COUNT(*) = 0 FROM results WHERE key = ?", (key,)).fetchone()[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, query, num, results, fetched, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, query, num, json.dumps(urls), fetched, fetched),
+                )
+                self._conn.executemany("UPDATE results SET accessed = ? WHERE key = ?",
+                                       [(when, k) for k, when in self._touched.items()])
+                if size > self.max_entries:
+                    # Expired entries go first, then the least recently used
+                    self._conn.execute("DELETE FROM results WHERE fetched <= ?", (self._clock() - self.ttl,))
+                    self._conn.execute(
+                        "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT "
+                        "max(0, (SELECT COUNT(*) FROM results) - ?))",
+                        (self.max_entries,),
+                    )
+                    size = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # e.g. "database is locked": leave no open transaction behind for later searches
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._size = size
+            self._touched.clear()
+            self._remember(key, urls, fetched)
+
+    def search(self, query, num=5, refresh=False):
+        """Results for a query, from cache when fresh; refresh=True always fetches"""
+        normalized = normalize_query(query)
+        key = f"{num}:{normalized}"
+        with self._lock:
+            cached = None if refresh else self._cached(key, self._clock())
+            if cached is not None:
+                self.counts[cached[1]] += 1
+                return SearchResults(*cached)
+            fetch = self._inflight.get(key)
+            leader = fetch is None
+            if leader:
+                fetch = self._inflight[key] = _Fetch()
+        if not leader:
+            fetch.done.wait()
+            if fetch.error is not None:
+                raise fetch.error
+            with self._lock:
+                self.counts["shared"] += 1
+            return SearchResults(fetch.urls, "shared", fetch.fetched)
+        try:
+            fetch.urls = list(self.backend(query, num))
+            fetch.fetched = self._clock()
+            try:
+                self._store(key, normalized, num, fetch.urls, fetch.fetched)
+            except Exception:
+                # e.g. a locked or full database: the results are still good, so
+                # keep them in memory and return them rather than fail the search
+                logger.warning("Could not write search results for %r to the cache", normalized, exc_info=True)
+                with self._lock:
+                    self._remember(key, fetch.urls, fetch.fetched)
+            with self._lock:
+                self.counts["fetched"] += 1
+            return SearchResults(fetch.urls, "fetched", fetch.fetched)
+        except Exception as e:
+            fetch.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            fetch.done.set()
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._memory.clear()
+            self._touched.clear()
+            self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        with self._lock:
+            self._conn.executemany("UPDATE results SET accessed = ? WHERE key = ?",
+                                   [(when, k) for k, when in self._touched.items()])
+            self._touched.clear()
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache(path=DEFAULT_PATH, backend=google_backend):
+    """Return the process-wide search cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache(path, backend)
+    return _cache
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+SendGrid Bulk - Batched SendGrid sends: up to 1000 personalizations per API call
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parseaddr
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mailer import TextTemplate
+from rate_limit import backoff_delay, retry_after_seconds
+
+DEFAULT_BASE_URL = os.environ.get("SENDGRID_API_URL", "https://api.sendgrid.com")
+MAX_PERSONALIZATIONS = 1000
+
+
+class SendGridResult:
+    """Counts and errors from a batched send"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+        self.errors = []
+        self.message_ids = []
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"SendGridResult(sent={self.sent}, failed={self.failed}, "
+                f"requests={self.requests}, elapsed={self.elapsed:.2f}s)")
+
+
+class SendGridBatchSender:
+    """One keep-alive HTTP session to the v3 mail/send endpoint, shared by all batches
+
+    Recipients are grouped into requests of up to `batch_size`
+    personalizations, and at most `max_parallel` requests are in flight.
+    {column} placeholders in the body become SendGrid substitution tags
+    filled per personalization, so each request carries the content once.
+    `base_url` points at a local mock server in tests.
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, batch_size=MAX_PERSONALIZATIONS,
+                 max_parallel=4, timeout=30, max_retries=3):
+        self.url = base_url.rstrip("/") + "/v3/mail/send"
+        self.batch_size = max(1, min(batch_size, MAX_PERSONALIZATIONS))
+        self.max_parallel = max(1, max_parallel)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_parallel)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def build_payload(self, from_email, subject, body, rows, html=None):
+        """The mail/send JSON for one batch of recipient rows
+
+        `subject`, `body` and `html` are TextTemplates; the subject is
+        rendered per recipient, the body is sent once with substitution tags.
+        """
+        name, address = parseaddr(from_email)
+        sender = {"email": address or from_email}
+        if name:
+            sender["name"] = name
+        fields = body.fields | (html.fields if html else set())
+        personalizations = []
+        for row in rows:
+            personalization = {"to": [{"email": row["email"]}], "subject": subject.render(row)}
+            if fields:
+                try:
+                    personalization["substitutions"] = {f"-{field}-": str(row[field]) for field in fields}
+                except KeyError as e:
+                    raise ValueError(f"Recipient {row['email']} has no value for {{{e.args[0]}}}") from None
+            personalizations.append(personalization)
+        tags = {field: f"-{field}-" for field in fields}
+        content = [{"type": "text/plain", "value": body.render(tags)}]
+        if html is not None:
+            content.append({"type": "text/html", "value": html.render(tags)})
+        return {"personalizations": personalizations, "from": sender, "content": content}
+
+    def post(self, payload):
+        """POST one batch, retrying 429 and 5xx replies; returns the response"""
+        for attempt in range(self.max_retries + 1):
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            if attempt == self.max_retries:
+                break
+            wait_for = retry_after_seconds(response.headers.get("Retry-After"))
+            time.sleep(wait_for if wait_for is not None else backoff_delay(attempt))
+        return response
+
+    def send(self, rows, from_email, subject, body, html=None, on_progress=None):
+        """Send one personalized email per row; returns a SendGridResult
+
+        Rows missing a placeholder's column are counted as failed on their
+        own instead of failing the batch they would have joined.
+        """
+        subject, body = TextTemplate(subject), TextTemplate(body)
+        html = TextTemplate(html) if html is not None else None
+        fields = subject.fields | body.fields | (html.fields if html else set())
+        result = SendGridResult()
+        started = time.perf_counter()
+
+        def complete(rows):
+            for row in rows:
+                missing = next((field for field in fields if field not in row), None)
+                if missing is None:
+                    yield row
+                else:
+                    result.failed += 1
+                    result.errors.append((row.get("email"), f"No value for {{{missing}}}"))
+
+        rows = complete(rows)
+
+        def send_batch(batch):
+            return batch, self.post(self.build_payload(from_email, subject, body, batch, html))
+
+        def collect(done):
+            for future in done:
+                result.requests += 1
+                try:
+                    batch, response = future.result()
+                except Exception as e:
+                    batch, response = future.batch, None
+                    error = str(e)
+                if response is not None and response.status_code < 300:
+                    result.sent += len(batch)
+                    result.message_ids.append(response.headers.get("X-Message-Id", ""))
+                else:
+                    if response is not None:
+                        error = f"HTTP {response.status_code}: {response.text[:200]}"
+                    result.failed += len(batch)
+                    result.errors.append((f"{batch[0]['email']} (+{len(batch) - 1} more)", error))
+            if on_progress is not None:
+                on_progress(result)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="sendgrid") as pool:
+            in_flight = set()
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if batch:
+                    future = pool.submit(send_batch, batch)
+                    future.batch = batch
+                    in_flight.add(future)
+                # Only read more recipients once a request slot frees up
+                if in_flight and (len(in_flight) >= self.max_parallel or not batch):
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                if not batch and not in_flight:
+                    break
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
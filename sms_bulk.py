@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SMS Bulk - Bulk Twilio SMS over one HTTP session with per-number rate limits
+"""
+
+import itertools
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mailer import TextTemplate
+from rate_limit import TokenBucket, backoff_delay, retry_after_seconds
+from sms_segments import make_gsm_safe
+from worker_pool import run_workers
+
+DEFAULT_BASE_URL = os.environ.get("TWILIO_API_URL", "https://api.twilio.com")
+# Twilio queues long-code traffic at one message per second per number
+DEFAULT_RATE = 1.0
+
+
+class TwilioError(Exception):
+    """A request the API rejected; `status` is the HTTP status code"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def is_fatal(error):
+    """Replies that every later request would get too: bad credentials or a suspended account"""
+    return isinstance(error, TwilioError) and error.status in (401, 403)
+
+
+def twilio_session(account_sid, auth_token, pool_size=4):
+    """A keep-alive requests.Session authenticated for the Twilio REST API"""
+    session = requests.Session()
+    session.auth = (account_sid, auth_token)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def post_form(session, url, data, bucket, timeout=15, max_retries=3, on_throttle=None):
+    """POST a Twilio form request under a token bucket and return the JSON reply
+
+    A 429 pauses the bucket for Retry-After (or a backoff delay) and
+    retries; 5xx replies are retried with backoff. Other failures raise
+    TwilioError.
+    """
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        response = session.post(url, data=data, timeout=timeout)
+        if response.status_code in (200, 201):
+            return response.json()
+        if attempt == max_retries or (response.status_code != 429 and response.status_code < 500):
+            break
+        if response.status_code == 429:
+            if on_throttle is not None:
+                on_throttle()
+            wait_for = retry_after_seconds(response.headers.get("Retry-After"))
+            bucket.pause(wait_for if wait_for is not None else backoff_delay(attempt, 1.0))
+        else:
+            time.sleep(backoff_delay(attempt))
+    try:
+        message = response.json().get("message", response.text)
+    except ValueError:
+        message = response.text
+    raise TwilioError(response.status_code, str(message)[:200])
+
+
+class SMSResult:
+    """Counts and errors from a bulk SMS send"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+        self.errors = []
+        self.aborted = None
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"SMSResult(sent={self.sent}, failed={self.failed}, aborted={self.aborted!r}, "
+                f"throttled={self.throttled}, elapsed={self.elapsed:.2f}s)")
+
+
+class TwilioBulkSender:
+    """Send many SMS through the Messages endpoint with one keep-alive session
+
+    Each sender number has its own token bucket (`rate` messages per second)
+    shared by all worker threads. A 429 reply pauses that number's bucket
+    for the Retry-After time (or a backoff delay) and the message is
+    retried; 5xx replies are retried with backoff. `base_url` points at a
+    local fake of the API in tests.
+    """
+
+    def __init__(self, account_sid, auth_token, from_numbers, rate=DEFAULT_RATE, burst=None,
+                 workers=4, base_url=DEFAULT_BASE_URL, timeout=15, max_retries=3):
+        if isinstance(from_numbers, str):
+            from_numbers = [from_numbers]
+        self.from_numbers = [number.strip() for number in from_numbers if number.strip()]
+        if not self.from_numbers:
+            raise ValueError("At least one sender number is required")
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.buckets = {number: TokenBucket(rate, burst) for number in self.from_numbers}
+        self.session = twilio_session(account_sid, auth_token, self.workers)
+        self._throttled = 0
+        self._lock = threading.Lock()
+
+    def send_one(self, from_number, to, body):
+        """Send one message and return its SID, waiting for the number's rate limit"""
+        reply = post_form(
+            self.session, self.url, {"From": from_number, "To": to, "Body": body},
+            self.buckets[from_number], self.timeout, self.max_retries, self._count_throttle,
+        )
+        return reply.get("sid", "")
+
+    def _count_throttle(self):
+        with self._lock:
+            self._throttled += 1
+
+    def send(self, rows, body, gsm_safe=False, on_progress=None):
+        """Send the (templated) body to every row's `phone`; returns an SMSResult
+
+        A row's `from` column picks its sender number when it is one of
+        ours; other rows are spread round-robin over the sender numbers.
+        Rows are streamed through a bounded queue. gsm_safe=True replaces
+        characters that would force UCS-2 in each rendered message. A 401 or
+        403 reply (bad credentials, suspended account) stops the whole run
+        and is reported in `result.aborted`.
+        """
+        template = TextTemplate(body)
+        result = SMSResult()
+        lock = threading.Lock()
+        numbers = itertools.cycle(self.from_numbers)
+        self._throttled = 0
+        started = time.perf_counter()
+
+        def assign(rows):
+            for row in rows:
+                from_number = row.get("from")
+                yield (from_number if from_number in self.buckets else next(numbers), row)
+
+        def send(_, item):
+            from_number, row = item
+            try:
+                text = template.render(row)
+                self.send_one(from_number, row["phone"], make_gsm_safe(text) if gsm_safe else text)
+                with lock:
+                    result.sent += 1
+            except Exception as e:
+                if is_fatal(e):
+                    raise
+                with lock:
+                    result.failed += 1
+                    result.errors.append((row.get("phone"), str(e)))
+            if on_progress is not None:
+                try:
+                    on_progress(result)
+                except Exception:
+                    pass
+
+        error = run_workers(assign(rows), send, self.workers)
+        if error is not None:
+            result.aborted = str(error)
+        result.throttled = self._throttled
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
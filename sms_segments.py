@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+SMS Segments - GSM-7/UCS-2 detection, segment counting, GSM-safe substitution and cost estimates
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from mailer import TextTemplate
+
+# GSM 03.38 basic character set (one septet each) and extension table (escape + char)
+GSM_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM_EXTENDED = "^{}\\[~]|€\f"
+
+# Single-part and per-part (with the concatenation header) capacities
+GSM_SINGLE, GSM_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+_NON_GSM = re.compile("[^" + re.escape(GSM_BASIC + GSM_EXTENDED) + "]")
+_EXTENDED = re.compile("[" + re.escape(GSM_EXTENDED) + "]")
+
+# Common characters that silently force UCS-2, with GSM-7 replacements
+SUBSTITUTIONS = {
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u2033": '"',
+    "\u00ab": '"', "\u00bb": '"', "\u2039": "<", "\u203a": ">",
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-",
+    "\u2015": "-", "\u2212": "-",
+    "\u2026": "...", "\u2022": "*", "\u00b7": ".",
+    # Non-breaking and typographic spaces, then zero-width characters
+    "\u00a0": " ", "\u2002": " ", "\u2003": " ", "\u2009": " ", "\u202f": " ", "\t": " ",
+    "\u200b": "", "\u200c": "", "\u200d": "", "\ufeff": "",
+    "\u00a9": "(c)", "\u00ae": "(R)", "\u2122": "TM", "\u00d7": "x", "\u00f7": "/",
+    "\u02c6": "^", "\u02dc": "~", "\u00b4": "'", "`": "'",
+    # Letters that have no decomposition to a GSM-7 base letter
+    "\u0142": "l", "\u0141": "L", "\u0111": "d", "\u0110": "D", "\u0131": "i", "\u0153": "oe",
+    "\u0152": "OE",
+}
+
+
+class SegmentInfo:
+    """How a message would be sent: encoding, length in encoding units and segments"""
+
+    __slots__ = ("encoding", "units", "segments", "non_gsm")
+
+    def __init__(self, encoding, units, segments, non_gsm):
+        self.encoding = encoding
+        self.units = units
+        self.segments = segments
+        self.non_gsm = non_gsm
+
+    @property
+    def per_segment(self):
+        single, multi = (GSM_SINGLE, GSM_MULTI) if self.encoding == "GSM-7" else (UCS2_SINGLE, UCS2_MULTI)
+        return single if self.segments <= 1 else multi
+
+    def __repr__(self):
+        return (f"SegmentInfo({self.encoding}, units={self.units}, segments={self.segments}, "
+                f"non_gsm={self.non_gsm!r})")
+
+
+def _count_parts(sizes, single, multi):
+    """Segments needed for a sequence of unsplittable character sizes"""
+    total = sum(sizes)
+    if total <= single:
+        return 1 if total else 0
+    parts, used = 1, 0
+    for size in sizes:
+        if used + size > multi:
+            parts += 1
+            used = 0
+        used += size
+    return parts
+
+
+@lru_cache(maxsize=4096)
+def analyze(text):
+    """Encoding, units and segment count for one message body
+
+    GSM-7 extension characters take two septets and are never split across
+    segments; in UCS-2 a character outside the BMP (e.g. most emoji) takes
+    two code units and is not split either.
+    """
+    non_gsm = "".join(dict.fromkeys(_NON_GSM.findall(text)))
+    if not non_gsm:
+        extended = len(_EXTENDED.findall(text))
+        units = len(text) + extended
+        if units <= GSM_SINGLE or not extended:
+            segments = 1 if units <= GSM_SINGLE else -(-units // GSM_MULTI)
+        else:
+            segments = _count_parts([2 if c in GSM_EXTENDED else 1 for c in text], GSM_SINGLE, GSM_MULTI)
+        return SegmentInfo("GSM-7", units, segments if text else 0, "")
+    units = len(text.encode("utf-16-le")) // 2
+    if units <= UCS2_SINGLE or units == len(text):
+        segments = 1 if units <= UCS2_SINGLE else -(-units // UCS2_MULTI)
+    else:
+        segments = _count_parts([2 if ord(c) > 0xFFFF else 1 for c in text], UCS2_SINGLE, UCS2_MULTI)
+    return SegmentInfo("UCS-2", units, segments, non_gsm)
+
+
+@lru_cache(maxsize=1024)
+def _gsm_replacement(char):
+    if char in SUBSTITUTIONS:
+        return SUBSTITUTIONS[char]
+    # Accented letters outside GSM-7 fall back to their base letter (e.g. "á" -> "a")
+    base = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+    if base and not _NON_GSM.search(base):
+        return base
+    return char
+
+
+def make_gsm_safe(text):
+    """Replace characters that force UCS-2 with GSM-7 equivalents where one exists
+
+    Characters without a sensible replacement (emoji, CJK, ...) are kept,
+    so the result may still need UCS-2; check it with analyze().
+    """
+    return _NON_GSM.sub(lambda match: _gsm_replacement(match.group()), text)
+
+
+def describe(info, price=None):
+    """One-line summary such as "GSM-7, 142/160 chars, 1 segment\""""
+    text = (f"{info.encoding}, {info.units}/{info.per_segment * max(1, info.segments)} "
+            f"{'chars' if info.encoding == 'GSM-7' else 'units'}, "
+            f"{info.segments} segment{'s' if info.segments != 1 else ''}")
+    if info.non_gsm:
+        text += f" (non-GSM: {info.non_gsm[:10]})"
+    if price is not None:
+        text += f", ~${info.segments * price:.4f}"
+    return text
+
+
+class CampaignScore:
+    """Segment totals for a campaign, as sent and with GSM-7 substitution"""
+
+    def __init__(self):
+        self.messages = 0
+        self.segments = 0
+        self.safe_segments = 0
+        self.ucs2 = 0
+        self.safe_ucs2 = 0
+        self.max_segments = 0
+        self.non_gsm = {}
+
+    def cost(self, price):
+        return self.segments * price
+
+    def safe_cost(self, price):
+        return self.safe_segments * price
+
+    def report(self, price=None):
+        lines = [
+            f"{self.messages} messages, {self.segments} segments "
+            f"({self.ucs2} need UCS-2, longest {self.max_segments} segments)",
+            f"With GSM-7 substitution: {self.safe_segments} segments ({self.safe_ucs2} still need UCS-2)",
+        ]
+        if price is not None:
+            lines.append(f"Estimated cost: ${self.cost(price):.2f}, "
+                         f"with substitution ${self.safe_cost(price):.2f} at ${price}/segment")
+        if self.non_gsm:
+            top = sorted(self.non_gsm.items(), key=lambda item: -item[1])[:10]
+            lines.append("Characters forcing UCS-2: " + ", ".join(f"{c!r} x{n}" for c, n in top))
+        return "\n".join(lines)
+
+
+def score_campaign(rows, body):
+    """Score every rendered message of a campaign
+
+    `body` may contain {column} placeholders filled from each row. Identical
+    rendered texts are analyzed once (analyze() is cached), so a campaign
+    without placeholders costs one analysis however many rows it has.
+    """
+    template = TextTemplate(body)
+    score = CampaignScore()
+    for row in rows:
+        text = template.render(row)
+        info = analyze(text)
+        safe = analyze(make_gsm_safe(text)) if info.non_gsm else info
+        score.messages += 1
+        score.segments += info.segments
+        score.safe_segments += safe.segments
+        score.ucs2 += info.encoding == "UCS-2"
+        score.safe_ucs2 += safe.encoding == "UCS-2"
+        score.max_segments = max(score.max_segments, info.segments)
+        for char in info.non_gsm:
+            score.non_gsm[char] = score.non_gsm.get(char, 0) + 1
+    return score
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+System Metrics - Background CPU/RAM sampling shared by the dashboard and tools
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import deque
+
+import psutil
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_CAPACITY = 300
+HISTORY_METRICS = ("cpu_percent", "ram_percent", "ram_used")
+# (bucket seconds, number of buckets): 1-minute buckets for a day, 10-minute for a week
+DEFAULT_ROLLUPS = ((60, 1440), (600, 1008))
+
+
+class SystemSampler:
+    """Sample CPU and RAM on a daemon thread into a fixed-size ring buffer"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY):
+        self.interval = max(0.1, float(interval))
+        self._samples = deque(maxlen=capacity)
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(sample) on the sampler thread for every new sample"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def start(self, wait=1.0):
+        """Start the sampler thread (idempotent) and wait briefly for a first sample"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="system-sampler", daemon=True
+                )
+                self._thread.start()
+        self._ready.wait(wait)
+        return self
+
+    def stop(self):
+        """Stop the sampler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self):
+        """Return the most recent sample, or None before the first one"""
+        try:
+            return self._samples[-1]
+        except IndexError:
+            return None
+
+    def samples(self):
+        """Return a snapshot of all buffered samples, oldest first"""
+        return list(self._samples)
+
+    def _read(self, cpu_interval=None):
+        mem = psutil.virtual_memory()
+        return {
+            "timestamp": time.time(),
+            "ram_total": mem.total / (1024**3),
+            "ram_used": mem.used / (1024**3),
+            "ram_available": mem.available / (1024**3),
+            "ram_percent": mem.percent,
+            "cpu_percent": psutil.cpu_percent(interval=cpu_interval),
+        }
+
+    def _run(self):
+        # The first cpu_percent() call needs a short window; later calls measure
+        # the time since the previous call, so the loop itself never blocks on it.
+        try:
+            self._publish(self._read(cpu_interval=0.1))
+        except Exception:
+            pass
+        self._ready.set()
+        while not self._stop.wait(self.interval):
+            try:
+                self._publish(self._read())
+            except Exception:
+                continue
+
+    def _publish(self, sample):
+        self._samples.append(sample)
+        for callback in list(self._listeners):
+            try:
+                callback(sample)
+            except Exception:
+                pass
+
+
+class RoundRobinArchive:
+    """Fixed-size, array-backed ring of points addressed by time bucket (RRD style)"""
+
+    def __init__(self, step, slots, columns):
+        self.step = float(step)
+        self.slots = int(slots)
+        self.columns = tuple(columns)
+        self._time = array("d", [0.0]) * self.slots
+        self._data = {column: array("d", [math.nan]) * self.slots for column in self.columns}
+
+    def _slot(self, bucket):
+        return int(bucket // self.step) % self.slots
+
+    def put(self, timestamp, values):
+        """Store values in the bucket containing timestamp, replacing what was there"""
+        bucket = timestamp - timestamp % self.step
+        i = self._slot(bucket)
+        self._time[i] = bucket
+        for column in self.columns:
+            self._data[column][i] = values.get(column, math.nan)
+
+    def points(self, now=None):
+        """Return {"time": [...], column: [...]} for live buckets, oldest first"""
+        now = time.time() if now is None else now
+        oldest = now - self.step * self.slots
+        start = self._slot(now - now % self.step) + 1
+        result = {"time": []}
+        result.update({column: [] for column in self.columns})
+        for offset in range(self.slots):
+            i = (start + offset) % self.slots
+            bucket = self._time[i]
+            if bucket <= oldest or bucket > now:
+                continue
+            result["time"].append(bucket)
+            for column in self.columns:
+                result[column].append(self._data[column][i])
+        return result
+
+
+class _Rollup:
+    """Accumulate min/avg/max for the current bucket and flush it into an archive"""
+
+    def __init__(self, step, slots, metrics):
+        self.metrics = metrics
+        columns = [f"{m}_{agg}" for m in metrics for agg in ("min", "avg", "max")]
+        self.archive = RoundRobinArchive(step, slots, columns)
+        self._bucket = None
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._sum = dict.fromkeys(self.metrics, 0.0)
+        self._min = dict.fromkeys(self.metrics, math.inf)
+        self._max = dict.fromkeys(self.metrics, -math.inf)
+
+    def _values(self):
+        values = {}
+        for m in self.metrics:
+            values[f"{m}_min"] = self._min[m]
+            values[f"{m}_avg"] = self._sum[m] / self._count
+            values[f"{m}_max"] = self._max[m]
+        return values
+
+    def add(self, timestamp, sample):
+        step = self.archive.step
+        bucket = timestamp - timestamp % step
+        if bucket != self._bucket:
+            if self._count:
+                self.archive.put(self._bucket, self._values())
+            self._bucket = bucket
+            self._reset()
+        self._count += 1
+        for m in self.metrics:
+            value = sample[m]
+            self._sum[m] += value
+            if value < self._min[m]:
+                self._min[m] = value
+            if value > self._max[m]:
+                self._max[m] = value
+
+    def points(self, now=None):
+        """Archived buckets plus the bucket still being filled"""
+        now = time.time() if now is None else now
+        result = self.archive.points(now)
+        if self._count and self._bucket > now - self.archive.step * self.archive.slots:
+            result["time"].append(self._bucket)
+            for column, value in self._values().items():
+                result[column].append(value)
+        return result
+
+
+class MetricHistory:
+    """Raw samples for the last hour plus min/avg/max rollups, in fixed memory"""
+
+    def __init__(self, raw_step=DEFAULT_INTERVAL, raw_seconds=3600,
+                 rollups=DEFAULT_ROLLUPS, metrics=HISTORY_METRICS):
+        self.metrics = tuple(metrics)
+        self.raw = RoundRobinArchive(raw_step, max(1, math.ceil(raw_seconds / raw_step)), self.metrics)
+        self.rollups = {int(step * slots): _Rollup(step, slots, self.metrics) for step, slots in rollups}
+        self._lock = threading.Lock()
+
+    def add(self, sample):
+        """Feed one sampler sample (a dict with a timestamp and the tracked metrics)"""
+        timestamp = sample["timestamp"]
+        with self._lock:
+            self.raw.put(timestamp, sample)
+            for rollup in self.rollups.values():
+                rollup.add(timestamp, sample)
+
+    def windows(self):
+        """Available windows in seconds: the raw window, then each rollup window"""
+        return [int(self.raw.step * self.raw.slots)] + sorted(self.rollups)
+
+    def series(self, window=None, now=None):
+        """Return points for a window; raw for the shortest, min/avg/max for rollups"""
+        with self._lock:
+            if window is None or window <= self.raw.step * self.raw.slots:
+                return self.raw.points(now)
+            for span in sorted(self.rollups):
+                if window <= span:
+                    return self.rollups[span].points(now)
+            return self.rollups[max(self.rollups)].points(now)
+
+
+class RingFile:
+    """Fixed-size, memory-mapped ring of binary RAM/CPU samples on disk
+
+    Layout: a 32-byte header (magic, version, record size, capacity, records
+    written) followed by `capacity` fixed-width records. Each record starts with
+    a sequence number that the writer clears before and sets after writing the
+    fields, so readers can open the file read-only and skip torn records
+    without taking locks.
+    """
+
+    MAGIC = b"RAMRING1"
+    VERSION = 1
+    HEADER = struct.Struct("<8sIIQQ")
+    RECORD = struct.Struct("<QdQQQff")
+    FIELDS = ("timestamp", "total", "used", "available", "percent", "cpu")
+    _COUNT_OFFSET = 24
+
+    def __init__(self, path, capacity=None, writable=False):
+        self.path = path
+        self.writable = writable
+        if writable:
+            f = self._open_for_writing(path, capacity)
+            self._file, self._map, self.capacity = f, *self._map_file(f, mmap.ACCESS_WRITE)
+        else:
+            self._file, self._map, self.capacity = self._open_for_reading()
+        self._identity = self._stat_identity(os.fstat(self._file.fileno()))
+        # Readers sharing one instance must not read a mapping that _refresh() is closing
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _map_file(cls, f, access):
+        """Map an open file and check its header; returns (mapping, capacity)"""
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=access)
+        except (OSError, ValueError):
+            f.close()
+            raise
+        header = cls.HEADER.unpack_from(mapping, 0) if len(mapping) >= cls.HEADER.size else (None,) * 5
+        magic, version, record_size, capacity, _ = header
+        if magic != cls.MAGIC or version != cls.VERSION or record_size != cls.RECORD.size:
+            mapping.close()
+            f.close()
+            raise ValueError(f"{f.name} is not a RAM history ring file")
+        return mapping, capacity
+
+    def _open_for_reading(self):
+        f = open(self.path, "rb")
+        return (f, *self._map_file(f, mmap.ACCESS_READ))
+
+    @staticmethod
+    def _stat_identity(st):
+        return st.st_dev, st.st_ino, st.st_size
+
+    @classmethod
+    def _open_for_writing(cls, path, capacity):
+        if os.path.exists(path):
+            return open(path, "r+b")
+        if not capacity:
+            raise ValueError("capacity is required to create a ring file")
+        f = open(path, "w+b")
+        f.truncate(cls.HEADER.size + capacity * cls.RECORD.size)
+        f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.RECORD.size, capacity, 0))
+        f.flush()
+        return f
+
+    @classmethod
+    def size_for(cls, capacity):
+        """File size in bytes for a given number of records"""
+        return cls.HEADER.size + capacity * cls.RECORD.size
+
+    @property
+    def count(self):
+        """Total records ever written (the newest is count - 1)"""
+        return struct.unpack_from("<Q", self._map, self._COUNT_OFFSET)[0]
+
+    def _offset(self, index):
+        return self.HEADER.size + (index % self.capacity) * self.RECORD.size
+
+    def append(self, timestamp, total, used, available, percent, cpu):
+        """Write one record over the oldest slot"""
+        index = self.count
+        offset = self._offset(index)
+        struct.pack_into("<Q", self._map, offset, 0)
+        self.RECORD.pack_into(self._map, offset, 0, timestamp, total, used, available, percent, cpu)
+        struct.pack_into("<Q", self._map, offset, index + 1)
+        struct.pack_into("<Q", self._map, self._COUNT_OFFSET, index + 1)
+
+    def _record(self, index):
+        offset = self._offset(index)
+        record = self.RECORD.unpack_from(self._map, offset)
+        if record[0] != index + 1 or struct.unpack_from("<Q", self._map, offset)[0] != index + 1:
+            return None
+        return record[1:]
+
+    def _refresh(self):
+        """Re-map a read-only file that was recreated or resized since it was opened
+
+        A mapping keeps reading the old inode after the monitor replaces the
+        file (e.g. a new --history-days), so long-lived readers check before
+        each read. Called with the lock held; returns True if re-opened.
+        """
+        if self.writable:
+            return False
+        try:
+            identity = self._stat_identity(os.stat(self.path))
+        except FileNotFoundError:
+            # Deleted and not recreated yet: keep serving the old records
+            return False
+        if identity == self._identity:
+            return False
+        f, mapping, capacity = self._open_for_reading()
+        old_file, old_map = self._file, self._map
+        self._file, self._map, self.capacity = f, mapping, capacity
+        self._identity = self._stat_identity(os.fstat(f.fileno()))
+        old_map.close()
+        old_file.close()
+        return True
+
+    def read(self, since=None, max_points=None):
+        """Return {field: [...]} for stored records, oldest first
+
+        Reads straight from the mapping. `since` skips older records (binary
+        search over the ring); `max_points` strides through long ranges instead
+        of decoding every record. A read-only ring re-maps the file first if
+        it was replaced.
+        """
+        with self._lock:
+            self._refresh()
+            return self._read(since, max_points)
+
+    def _read(self, since, max_points):
+        count = self.count
+        first = max(0, count - self.capacity)
+        if since is not None:
+            lo, hi = first, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                record = self._record(mid)
+                if record is not None and record[0] < since:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            first = lo
+        step = 1
+        if max_points and count - first > max_points:
+            step = math.ceil((count - first) / max_points)
+        result = {field: [] for field in self.FIELDS}
+        for index in range(first, count, step):
+            record = self._record(index)
+            if record is None:
+                continue
+            for field, value in zip(self.FIELDS, record):
+                result[field].append(value)
+        return result
+
+    def flush(self):
+        if self.writable:
+            self._map.flush()
+
+    def close(self):
+        try:
+            self._map.close()
+        finally:
+            self._file.close()
+
+
+_sampler = None
+_history = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY):
+    """Return the process-wide sampler, starting it on first use"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemSampler(interval=interval, capacity=capacity)
+    return _sampler.start()
+
+
+def get_history(interval=DEFAULT_INTERVAL):
+    """Return the process-wide metric history, fed by the process-wide sampler"""
+    global _history
+    sampler = get_sampler(interval=interval)
+    with _sampler_lock:
+        if _history is None:
+            _history = MetricHistory(raw_step=sampler.interval)
+            for sample in sampler.samples():
+                _history.add(sample)
+            sampler.add_listener(_history.add)
+    return _history
@@ -0,0 +1,121 @@
+import base64
+import json
+import os
+import socketserver
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The toolkit modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeAPI:
+    """A local HTTP API; `respond(request)` returns (status, body) or (status, body, headers)
+
+    Every request is recorded as a dict with method, path, headers, client
+    (address and port, to count connections), query, form (for form posts)
+    and json (for JSON posts).
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+        self.respond = lambda request: (200, {})
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urllib.parse.urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                request = {"method": self.command, "path": url.path, "headers": dict(self.headers),
+                           "client": self.client_address,
+                           "query": dict(urllib.parse.parse_qsl(url.query)),
+                           "form": dict(urllib.parse.parse_qsl(body)) if "form" in (self.headers.get("Content-Type") or "") else {},
+                           "json": json.loads(body) if "json" in (self.headers.get("Content-Type") or "") else None}
+                with api.lock:
+                    api.requests.append(request)
+                status, payload, *headers = api.respond(request)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def posts(self):
+        with self.lock:
+            return [request for request in self.requests if request["method"] == "POST"]
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeAPI()
+    threading.Thread(target=api.server.serve_forever, daemon=True).start()
+    yield api
+    api.server.shutdown()
+    api.server.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self.reply("220 localhost ready")
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-localhost\r\n250 AUTH PLAIN")
+            elif verb == "AUTH":
+                with server.lock:
+                    server.logins += 1
+                _, username, password = base64.b64decode(command.split()[2]).split(b"\0")
+                ok = (username, password) == (b"sender@example.com", b"secret")
+                self.reply("235 Authenticated" if ok else "535 Authentication failed")
+            elif verb == "RCPT" and "reject" in command:
+                self.reply("550 No such user")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                with server.lock:
+                    server.messages.append(data)
+                self.reply("250 Queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.logins = 0
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,56 @@
+from async_mailer import Account, run_campaign
+from mailer import SMTPSession, build_message
+
+
+def account(server, password="secret", rate=None):
+    return Account("sender@example.com",
+                   lambda: SMTPSession("127.0.0.1", server.server_address[1], "sender@example.com", password,
+                                       use_tls=False, timeout=5),
+                   rate=rate)
+
+
+def message(row):
+    return build_message("sender@example.com", row["email"], "Hi", "Hello")
+
+
+def recipients(count):
+    return ({"email": f"user{i}@example.com"} for i in range(count))
+
+
+def test_campaign_sends_and_reports_latency(smtp_server):
+    rows = list(recipients(20)) + [{"email": "reject@example.com"}]
+    stats = run_campaign(rows, message, [account(smtp_server)], sessions=3)
+    assert (stats.sent, stats.failed, stats.aborted) == (20, 1, None)
+    assert len(smtp_server.messages) == 20
+    assert len(stats.latencies) == 20
+    assert 0 < stats.percentile(50) <= stats.percentile(99)
+    assert "Sent 20, failed 1" in stats.report()
+
+
+def test_campaign_stops_after_a_failed_login(smtp_server):
+    stats = run_campaign(recipients(1000), message, [account(smtp_server, password="wrong")], sessions=3)
+    assert stats.sent == 0 and stats.failed == 0
+    assert "Authentication failed" in stats.aborted
+    # One login attempt per session, not one per recipient
+    assert smtp_server.logins <= 3
+
+
+def test_campaign_stops_when_the_server_is_unreachable(smtp_server):
+    port = smtp_server.server_address[1]
+    smtp_server.shutdown()
+    smtp_server.server_close()
+    unreachable = Account("sender@example.com",
+                          lambda: SMTPSession("127.0.0.1", port, "sender@example.com", "secret",
+                                              use_tls=False, timeout=5))
+    stats = run_campaign(recipients(1000), message, [unreachable], sessions=2)
+    assert stats.sent == 0 and stats.failed == 0
+    assert stats.aborted is not None
+
+
+def test_campaign_fails_only_rows_whose_message_cannot_be_built(smtp_server):
+    def make_message(row):
+        return build_message("sender@example.com", row["email"], "Hi", "Hello {name}".format(**row))
+
+    rows = [{"email": "first@example.com"}] + [{"email": f"user{i}@example.com", "name": "x"} for i in range(5)]
+    stats = run_campaign(rows, make_message, [account(smtp_server)], sessions=2)
+    assert (stats.sent, stats.failed, stats.aborted) == (5, 1, None)
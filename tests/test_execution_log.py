@@ -0,0 +1,50 @@
+import pytest
+
+from execution_log import ExecutionLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = ExecutionLog(str(tmp_path / "log.db"), tail_size=3)
+    yield log
+    log.close()
+
+
+def test_tail_keeps_the_newest_entries_in_memory(log):
+    for i in range(5):
+        log.append("Send SMS", "FINISHED", f"run {i}", timestamp=f"2026-01-0{i + 1} 10:00:00")
+    assert [entry["message"] for entry in log.tail()] == ["run 4", "run 3", "run 2"]
+    assert [entry["message"] for entry in log.tail(1)] == ["run 4"]
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "log.db")
+    log = ExecutionLog(path)
+    log.append("Read RAM", "LAUNCHED")
+    log.close()
+    reopened = ExecutionLog(path)
+    try:
+        assert [(entry["program"], entry["status"]) for entry in reopened.tail()] == [("Read RAM", "LAUNCHED")]
+        assert reopened.count() == 1
+    finally:
+        reopened.close()
+
+
+def test_query_filters_and_pages_newest_first(log):
+    log.append("Send SMS", "FINISHED", timestamp="2026-01-01 09:00:00")
+    log.append("Send SMS", "ERROR", "401", timestamp="2026-01-02 09:00:00")
+    log.append("Send Email", "FINISHED", timestamp="2026-01-03 09:00:00")
+    log.append("Send SMS", "FINISHED", timestamp="2026-01-04 09:00:00")
+    assert [entry["timestamp"][:10] for entry in log.query(program="Send SMS")] == \
+        ["2026-01-04", "2026-01-02", "2026-01-01"]
+    assert log.query(status="ERROR")[0]["message"] == "401"
+    assert log.count(since="2026-01-02", until="2026-01-04") == 2
+    page = log.query(limit=2, offset=2)
+    assert [entry["timestamp"][:10] for entry in page] == ["2026-01-02", "2026-01-01"]
+    assert log.distinct("program") == ["Send Email", "Send SMS"]
+    assert log.distinct("status") == ["ERROR", "FINISHED"]
+
+
+def test_distinct_rejects_other_columns(log):
+    with pytest.raises(ValueError):
+        log.distinct("message")
@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+from file_index import FileStatusIndex, hash_file
+
+
+def test_hash_file_matches_sha256(tmp_path):
+    path = tmp_path / "script.py"
+    path.write_bytes(b"print('hi')\n" * 10000)
+    assert hash_file(str(path), chunk_size=1000) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_status_of_present_and_missing_files(tmp_path):
+    (tmp_path / "a.py").write_text("print('a')\n")
+    index = FileStatusIndex(str(tmp_path), ["a.py", "b.py", "a.py"], min_interval=0)
+    assert index.filenames == ["a.py", "b.py"]
+    status = index.status("a.py")
+    assert status["exists"] and status["size"] == 11
+    assert status["sha256"] == hashlib.sha256(b"print('a')\n").hexdigest()
+    assert set(status) == {"exists", "size", "mtime", "sha256"}
+    assert not index.exists("b.py")
+    assert index.missing() == ["b.py"]
+
+
+def test_refresh_reports_only_changed_files(tmp_path):
+    (tmp_path / "a.py").write_text("one")
+    (tmp_path / "b.py").write_text("two")
+    index = FileStatusIndex(str(tmp_path), ["a.py", "b.py", "c.py"], min_interval=0)
+    assert index.refresh() == []
+    (tmp_path / "a.py").write_text("changed")
+    (tmp_path / "c.py").write_text("new")
+    os.remove(tmp_path / "b.py")
+    assert sorted(index.refresh()) == ["a.py", "b.py", "c.py"]
+    assert index.hashes()["a.py"] == hashlib.sha256(b"changed").hexdigest()
+    assert index.hashes()["b.py"] is None
+
+
+def test_refresh_is_throttled_but_refresh_file_is_not(tmp_path):
+    (tmp_path / "a.py").write_text("one")
+    index = FileStatusIndex(str(tmp_path), ["a.py"], min_interval=3600)
+    (tmp_path / "a.py").write_text("longer content")
+    assert index.refresh() == []
+    assert index.status("a.py")["size"] == 3
+    status = index.refresh_file("a.py")
+    assert status["size"] == len("longer content")
+    assert set(status) == {"exists", "size", "mtime", "sha256"}
+    assert index.script_hash("a.py") == hashlib.sha256(b"longer content").hexdigest()
@@ -0,0 +1,78 @@
+import sys
+import time
+
+import pytest
+
+from job_runner import JobRunner, TaskExecutor
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=2)
+    yield runner
+    runner.shutdown(wait=True)
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_job_captures_output_exit_code_and_cpu_time(runner):
+    job = runner.submit("echo", python("import sys; print(input()); print('oops', file=sys.stderr); sys.exit(3)"),
+                        stdin_text="hello\n")
+    assert job.wait(10)
+    assert job.status == "FAILED" and job.returncode == 3
+    assert ("stdout", "hello\n") in job.output()
+    assert ("stderr", "oops\n") in job.output()
+    assert job.cpu_time is None or job.cpu_time >= 0
+
+
+def test_cancel_terminates_a_running_job(runner):
+    job = runner.submit("sleep", python("import time; print('started', flush=True); time.sleep(30)"))
+    deadline = time.time() + 10
+    while not job.output() and time.time() < deadline:
+        time.sleep(0.01)
+    assert runner.cancel(job.id)
+    assert job.wait(10)
+    assert job.returncode != 0
+    assert runner.cancel(job.id) is False
+
+
+def test_cancel_drops_a_queued_job():
+    runner = JobRunner(max_workers=1)
+    finished = []
+    runner.on_finish = finished.append
+    blocker = runner.submit("block", python("import time; time.sleep(30)"))
+    queued = runner.submit("queued", python("print('never')"))
+    assert runner.cancel(queued.id)
+    assert queued.status == "CANCELLED" and queued.done
+    assert runner.cancel(blocker.id)
+    runner.shutdown(wait=True)
+    assert {job.name for job in finished} == {"block", "queued"}
+
+
+def test_cancel_racing_a_job_that_just_exited(runner):
+    # Cancelling while _wait() reaps a finished child must never break the job
+    for _ in range(20):
+        job = runner.submit("quick", python("pass"))
+        while job.pid is None and not job.done:
+            time.sleep(0.001)
+        runner.cancel(job.id)
+        assert job.wait(10)
+        assert job.error is None
+        assert job.status in ("FINISHED", "FAILED")
+
+
+def test_task_executor_reports_results_and_errors():
+    executor = TaskExecutor(max_workers=2)
+
+    def work(task):
+        task.set_progress("working")
+        return 42
+
+    ok = executor.submit("ok", work)
+    failed = executor.submit("fail", lambda task: 1 / 0)
+    assert ok.wait(5) and failed.wait(5)
+    assert (ok.status, ok.result, ok.progress) == ("FINISHED", 42, "working")
+    assert failed.status == "FAILED" and "division" in failed.error
+    assert executor.get(ok.id) is ok
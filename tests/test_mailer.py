@@ -0,0 +1,152 @@
+import base64
+import email
+import io
+import smtplib
+import threading
+from email import policy
+
+import mailer
+from mailer import Attachment, SMTPSession, build_message, close_attachments, send_bulk
+
+
+class FakeSession:
+    """Stands in for SMTPSession; `fail(row)` returns the error to raise for a message, if any"""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.connected = True
+        self.connections = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def send(self, msg):
+        error = self.fail(msg) if self.fail else None
+        if error is not None:
+            raise error
+
+
+def recipients(count):
+    return ({"email": f"user{i}@example.com"} for i in range(count))
+
+
+def test_send_bulk_counts_per_recipient_failures():
+    def fail(row):
+        if row["email"] == "user3@example.com":
+            return smtplib.SMTPRecipientsRefused({row["email"]: (550, b"no such user")})
+
+    result = send_bulk(recipients(10), lambda row: row, lambda: FakeSession(fail), connections=2)
+    assert (result.sent, result.failed, result.aborted) == (9, 1, None)
+    assert result.errors[0][0] == "user3@example.com"
+
+
+def test_send_bulk_stops_on_authentication_failure():
+    def fail(row):
+        return smtplib.SMTPAuthenticationError(535, b"bad credentials")
+
+    result = send_bulk(recipients(10_000), lambda row: row, lambda: FakeSession(fail), connections=3)
+    assert result.sent == 0 and result.failed == 0
+    assert "bad credentials" in result.aborted
+
+
+def test_send_bulk_does_not_hang_when_aborted_after_the_last_row_is_queued():
+    sends = []
+    lock = threading.Lock()
+
+    def fail(row):
+        with lock:
+            sends.append(row["email"])
+            if len(sends) == 2:
+                return smtplib.SMTPAuthenticationError(535, b"session expired")
+
+    finished = []
+    thread = threading.Thread(target=lambda: finished.append(
+        send_bulk(recipients(10), lambda row: row, lambda: FakeSession(fail), connections=2)))
+    thread.start()
+    thread.join(5)
+    assert finished, "send_bulk hung after a fatal error"
+    assert "session expired" in finished[0].aborted
+
+
+def test_send_bulk_stops_when_no_connection_can_be_opened():
+    def factory():
+        raise ConnectionRefusedError("connection refused")
+
+    result = send_bulk(recipients(10_000), lambda row: row, factory, connections=2)
+    assert result.sent == 0
+    assert result.aborted == "connection refused"
+
+
+def local_session(server, password="secret", max_per_session=3):
+    return SMTPSession("127.0.0.1", server.server_address[1], "sender@example.com", password,
+                       use_tls=False, max_per_session=max_per_session, timeout=5)
+
+
+def test_send_bulk_over_smtp(smtp_server):
+    rows = list(recipients(10)) + [{"email": "reject@example.com"}]
+    result = send_bulk(rows, lambda row: build_message("sender@example.com", row["email"], "Hi", "Hello"),
+                       lambda: local_session(smtp_server), connections=2)
+    assert (result.sent, result.failed, result.aborted) == (10, 1, None)
+    assert len(smtp_server.messages) == 10
+    # Each connection is reused for up to max_per_session messages
+    assert 4 <= result.connections <= 6
+
+
+def test_send_bulk_over_smtp_logs_in_once_per_connection_with_a_wrong_password(smtp_server):
+    result = send_bulk(recipients(500), lambda row: build_message("sender@example.com", row["email"], "Hi", "Hi"),
+                       lambda: local_session(smtp_server, password="wrong"), connections=2)
+    assert result.sent == 0
+    assert "Authentication failed" in result.aborted
+    assert smtp_server.logins <= 2
+    assert smtp_server.messages == []
+
+
+def test_send_bulk_fails_only_the_row_whose_message_cannot_be_built(smtp_server):
+    def make_message(row):
+        return build_message("sender@example.com", row["email"], "Hi", "Hello {name}".format(**row))
+
+    rows = [{"email": "first@example.com"}] + [{"email": f"user{i}@example.com", "name": "x"} for i in range(4)]
+    result = send_bulk(rows, make_message, lambda: local_session(smtp_server), connections=1)
+    assert (result.sent, result.failed, result.aborted) == (4, 1, None)
+    assert result.errors[0][0] == "first@example.com"
+
+
+def test_address_headers_encode_only_display_names():
+    raw = build_message("José Núñez <jose@example.com>", "zoe@example.com", "Grüße", "Hi").as_bytes()
+    parsed = email.message_from_bytes(raw, policy=policy.default)
+    assert parsed["From"].addresses[0].display_name == "José Núñez"
+    assert parsed["From"].addresses[0].addr_spec == "jose@example.com"
+    assert b"<jose@example.com>" in raw
+    assert parsed["Subject"] == "Grüße"
+
+
+def test_large_cached_attachment_spills_to_a_temp_file_until_closed(monkeypatch):
+    monkeypatch.setattr(mailer, "_MEMORY_CACHE_LIMIT", 1024)
+    data = bytes(range(256)) * 64
+    with Attachment(io.BytesIO(data), filename="data.bin") as attachment:
+        encoded = b"".join(attachment.encoded_chunks())
+        assert base64.b64decode(encoded) == data
+        spill = attachment._encoded
+        assert not isinstance(spill, bytes) and not spill.closed
+        # Replayed from the cache for the next message
+        assert b"".join(attachment.encoded_chunks()) == encoded
+    assert spill.closed
+    close_attachments([attachment])
+
+
+def test_attachments_are_closed_after_a_bulk_send(monkeypatch, smtp_server):
+    monkeypatch.setattr(mailer, "_MEMORY_CACHE_LIMIT", 1024)
+    attachments = [Attachment(io.BytesIO(b"x" * 4096), filename="report.txt")]
+    try:
+        result = send_bulk(recipients(3),
+                           lambda row: build_message("sender@example.com", row["email"], "Hi", "Hello",
+                                                     attachments=attachments),
+                           lambda: local_session(smtp_server), connections=1)
+    finally:
+        close_attachments(attachments)
+    assert result.sent == 3
+    assert all(b'filename="report.txt"' in message for message in smtp_server.messages)
+    assert attachments[0]._encoded is None
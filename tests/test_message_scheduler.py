@@ -0,0 +1,166 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from message_scheduler import MessageScheduler, StubDelivery, parse_send_time, schedule_items
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Results:
+    """on_result callback that lets a test wait for a number of results"""
+
+    def __init__(self):
+        self.items = []
+        self._cond = threading.Condition()
+
+    def __call__(self, entry, state, error):
+        with self._cond:
+            self.items.append((entry["recipient"], state))
+            self._cond.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.items) >= count, timeout), self.items
+        return self.items
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_scheduler(tmp_path, clock):
+    schedulers = []
+
+    def make(deliver=None, **kwargs):
+        results = Results()
+        scheduler = MessageScheduler(str(tmp_path / "scheduled.db"), deliver or StubDelivery(), results,
+                                     clock=clock, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler, results
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_due_messages_are_sent_in_due_order(make_scheduler, clock):
+    delivery = StubDelivery()
+    scheduler, results = make_scheduler(delivery)
+    scheduler.schedule("+15550000002", "second", clock.now - 10)
+    scheduler.schedule("+15550000001", "first", clock.now - 20)
+    scheduler.start()
+    results.wait_for(2)
+    assert [message for _, _, message in delivery.sent] == ["first", "second"]
+    assert results.items == [("+15550000001", "sent"), ("+15550000002", "sent")]
+    assert scheduler.pending() == []
+
+
+def test_future_messages_wait_for_the_clock(make_scheduler, clock):
+    scheduler, results = make_scheduler()
+    scheduler.schedule("+15550000001", "later", clock.now + 0.05)
+    scheduler.start()
+    assert len(scheduler.pending()) == 1
+    clock.now += 1
+    assert results.wait_for(1) == [("+15550000001", "sent")]
+
+
+def test_overdue_messages_are_missed_not_sent(make_scheduler, clock):
+    delivery = StubDelivery()
+    scheduler, results = make_scheduler(delivery, max_late=60)
+    scheduler.schedule("+15550000001", "stale", clock.now - 61)
+    scheduler.start()
+    assert results.wait_for(1) == [("+15550000001", "missed")]
+    assert delivery.sent == []
+
+
+def test_delivery_errors_mark_the_message_failed(make_scheduler, clock):
+    def deliver(recipient, message):
+        raise RuntimeError("browser closed")
+
+    scheduler, results = make_scheduler(deliver)
+    scheduler.schedule("+15550000001", "hi", clock.now)
+    scheduler.start()
+    assert results.wait_for(1) == [("+15550000001", "failed")]
+    assert scheduler.history()[0]["error"] == "browser closed"
+
+
+def test_cancelled_messages_are_not_sent(make_scheduler, clock):
+    scheduler, results = make_scheduler()
+    keep = scheduler.schedule("+15550000001", "keep", clock.now + 0.05)
+    drop = scheduler.schedule("+15550000002", "drop", clock.now + 0.05)
+    assert scheduler.cancel(drop) is True
+    assert scheduler.cancel(drop) is False
+    assert [entry["id"] for entry in scheduler.pending()] == [keep]
+    scheduler.start()
+    clock.now += 1
+    assert results.wait_for(1) == [("+15550000001", "sent")]
+    assert {entry["state"] for entry in scheduler.history()} == {"sent", "cancelled"}
+
+
+def test_pending_messages_are_reloaded_on_start(make_scheduler, clock):
+    first, _ = make_scheduler()
+    first.schedule_many([("+15550000001", "a", clock.now + 100), ("+15550000002", "b", clock.now + 50)])
+    first.close()
+    second, _ = make_scheduler()
+    assert [entry["message"] for entry in second.pending()] == ["b", "a"]
+
+
+def test_a_message_is_delivered_by_only_one_scheduler(make_scheduler, clock):
+    delivery = StubDelivery()
+    first, first_results = make_scheduler(delivery)
+    first.schedule_many((f"+1555000{i:04d}", "hi", clock.now) for i in range(50))
+    second, second_results = make_scheduler(delivery)
+    first.start()
+    second.start()
+    deadline = time.monotonic() + 5
+    while len(first_results.items) + len(second_results.items) < 50 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    first.stop(5)
+    second.stop(5)
+    assert len(delivery.sent) == 50
+    assert len({recipient for _, recipient, _ in delivery.sent}) == 50
+
+
+def test_stale_sending_rows_become_unknown(make_scheduler, tmp_path, clock):
+    scheduler, _ = make_scheduler()
+    message_id = scheduler.schedule("+15550000001", "hi", clock.now)
+    scheduler.close()
+    conn = sqlite3.connect(str(tmp_path / "scheduled.db"))
+    conn.execute("UPDATE scheduled SET state = 'sending', fired_at = ? WHERE id = ?", (clock.now - 3600, message_id))
+    conn.commit()
+    conn.close()
+    delivery = StubDelivery()
+    restarted, _ = make_scheduler(delivery, stale_after=600)
+    assert restarted.pending() == []
+    assert restarted.history()[0]["state"] == "unknown"
+
+
+def test_parse_send_time():
+    now = datetime(2024, 5, 1, 12, 0)
+    assert parse_send_time("13:30", now) == datetime(2024, 5, 1, 13, 30).timestamp()
+    assert parse_send_time("11:00", now) == datetime(2024, 5, 2, 11, 0).timestamp()
+    assert parse_send_time("2024-06-01 09:15", now) == datetime(2024, 6, 1, 9, 15).timestamp()
+    with pytest.raises(ValueError):
+        parse_send_time("tomorrow", now)
+
+
+def test_schedule_items_render_messages():
+    rows = [{"phone": "+15550000001", "name": "Ana", "send_at": "2024-06-01 09:00"},
+            {"phone": "+15550000002", "name": "Bo"}]
+    items = list(schedule_items(rows, "Hi {name}", "2024-06-02 10:00"))
+    assert items == [
+        ("+15550000001", "Hi Ana", datetime(2024, 6, 1, 9, 0).timestamp()),
+        ("+15550000002", "Hi Bo", datetime(2024, 6, 2, 10, 0).timestamp()),
+    ]
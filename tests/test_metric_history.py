@@ -0,0 +1,57 @@
+import math
+
+from system_metrics import MetricHistory, RoundRobinArchive, SystemSampler
+
+START = 1_699_999_800.0  # a multiple of 600, so buckets line up with whole minutes
+
+
+def sample(timestamp, cpu, ram=50.0):
+    return {"timestamp": timestamp, "cpu_percent": cpu, "ram_percent": ram, "ram_used": 4.0}
+
+
+def test_archive_overwrites_the_oldest_bucket():
+    archive = RoundRobinArchive(step=10, slots=3, columns=("cpu_percent",))
+    for i in range(5):
+        archive.put(START + i * 10, {"cpu_percent": float(i)})
+    points = archive.points(now=START + 45)
+    assert points["time"] == [START + 20, START + 30, START + 40]
+    assert points["cpu_percent"] == [2.0, 3.0, 4.0]
+    # Buckets older than the archive span are not returned even before they are overwritten
+    assert archive.points(now=START + 75)["time"] == []
+
+
+def test_missing_columns_are_nan():
+    archive = RoundRobinArchive(step=1, slots=2, columns=("cpu_percent", "ram_percent"))
+    archive.put(START, {"cpu_percent": 1.0})
+    assert math.isnan(archive.points(now=START)["ram_percent"][0])
+
+
+def test_history_serves_raw_points_and_min_avg_max_rollups():
+    history = MetricHistory(raw_step=2, raw_seconds=60, rollups=((60, 10),))
+    for i in range(90):
+        history.add(sample(START + i * 2, cpu=float(i % 30)))
+    now = START + 179
+    assert history.windows() == [60, 600]
+    raw = history.series(60, now=now)
+    assert len(raw["time"]) == 30 and raw["cpu_percent"][-1] == 29.0
+    rolled = history.series(600, now=now)
+    assert rolled["time"] == [START, START + 60, START + 120]
+    assert rolled["cpu_percent_min"] == [0.0, 0.0, 0.0]
+    assert rolled["cpu_percent_max"] == [29.0, 29.0, 29.0]
+    assert rolled["cpu_percent_avg"] == [14.5, 14.5, 14.5]
+    # Longer windows than any rollup fall back to the longest one
+    assert history.series(86400 * 30, now=now)["time"] == rolled["time"]
+
+
+def test_sampler_publishes_samples_to_listeners():
+    sampler = SystemSampler(interval=0.1, capacity=5)
+    received = []
+    sampler.add_listener(received.append)
+    sampler.start(wait=5)
+    try:
+        assert sampler.latest() is not None
+        assert {"cpu_percent", "ram_percent", "ram_used"} <= set(sampler.latest())
+    finally:
+        sampler.stop()
+    assert received and received[0] is sampler.samples()[0]
+    assert not sampler.running
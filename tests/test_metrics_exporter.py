@@ -0,0 +1,68 @@
+import socket
+import urllib.request
+
+from metrics_exporter import (SEND_LATENCY, MetricsRegistry, record_send, register_host_metrics,
+                              start_exporter)
+
+
+def test_counter_and_histogram_render_in_text_format():
+    registry = MetricsRegistry()
+    runs = registry.counter("runs_total", "Runs", ("program", "status"))
+    runs.inc(program="Send SMS", status="FINISHED")
+    runs.inc(2, program='say "hi"', status="ERROR")
+    latency = registry.histogram("latency_seconds", "Latency", ("channel",), buckets=(0.1, 1.0))
+    latency.observe(0.05, channel="sms")
+    latency.observe(0.5, channel="sms")
+    text = registry.render()
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{program="Send SMS",status="FINISHED"} 1' in text
+    assert 'runs_total{program="say \\"hi\\"",status="ERROR"} 2' in text
+    assert 'latency_seconds_bucket{channel="sms",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{channel="sms",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{channel="sms",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{channel="sms"} 2' in text
+
+
+def test_host_gauges_read_the_latest_sample_when_scraped():
+    class Sampler:
+        sample = None
+
+        def latest(self):
+            return self.sample
+
+    sampler = Sampler()
+    registry = MetricsRegistry()
+    register_host_metrics(sampler, registry)
+    assert "\ntoolkit_host_cpu_percent " not in registry.render()
+    sampler.sample = {"cpu_percent": 12.5, "ram_percent": 40.0, "ram_total": 2.0,
+                      "ram_used": 1.0, "ram_available": 1.0}
+    text = registry.render()
+    assert "toolkit_host_cpu_percent 12.5" in text
+    assert f"toolkit_host_memory_total_bytes {float(2 * 1024**3)!r}" in text
+
+
+def test_record_send_times_actions_by_channel_and_skips_the_rest():
+    assert record_send("Anonymous Email", 0.2)
+    assert record_send("Send WhatsApp Message", 3.0)
+    assert not record_send("Google Search", 1.0)
+    assert not record_send("WhatsApp Web Opener", 1.0)
+    text = "\n".join(SEND_LATENCY.collect())
+    assert 'channel="email"' in text and 'channel="whatsapp"' in text
+    assert "Google Search" not in text and "WhatsApp Web Opener" not in text
+
+
+def test_exporter_serves_metrics_over_http():
+    registry = MetricsRegistry()
+    registry.counter("runs_total", "Runs").inc()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = start_exporter(port, host="127.0.0.1", registry=registry)
+    try:
+        assert start_exporter(port, host="127.0.0.1", registry=registry) is server
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "runs_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
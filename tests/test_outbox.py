@@ -0,0 +1,138 @@
+import smtplib
+
+import pytest
+
+from outbox import (FAILED, PENDING, SENDING, SENT, UNKNOWN, Outbox, PermanentError, describe_counts,
+                    is_fatal, is_retryable, run_outbox)
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), commit_every=10)
+    outbox.create_campaign("spring", "email", {"subject": "Hi"})
+    yield outbox
+    outbox.close()
+
+
+def rows(count):
+    return ({"email": f"user{i}@example.com"} for i in range(count))
+
+
+def test_load_skips_repeated_keys_and_only_runs_once(outbox):
+    assert outbox.load("spring", [{"email": "a@example.com"}, {"email": "A@example.com"},
+                                  {"email": "b@example.com"}, {"name": "no key"}]) == 2
+    assert outbox.load("spring", rows(5)) == 0
+    assert outbox.counts("spring") == {PENDING: 2}
+    assert outbox.campaign("spring")["meta"] == {"subject": "Hi"}
+
+
+def test_load_resumes_after_an_interrupted_load(outbox):
+    def interrupted():
+        yield from rows(3)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        outbox.load("spring", interrupted(), batch_size=2)
+    assert outbox.counts("spring") == {PENDING: 2}
+    assert outbox.load("spring", rows(5), batch_size=2) == 3
+    assert outbox.counts("spring") == {PENDING: 5}
+
+
+def test_load_needs_a_campaign(outbox):
+    with pytest.raises(ValueError):
+        outbox.load("unknown", rows(1))
+
+
+def test_claim_mark_and_flush(outbox):
+    outbox.load("spring", rows(4))
+    batch = outbox.claim("spring", limit=3)
+    assert [message["payload"]["email"] for message in batch] == [f"user{i}@example.com" for i in range(3)]
+    assert outbox.counts("spring") == {PENDING: 1, SENDING: 3}
+    outbox.mark_sent(batch[0]["id"], "msg-1")
+    outbox.mark_failed(batch[1]["id"], ValueError("bad address"))
+    outbox.mark_failed(batch[2]["id"], TimeoutError("timed out"), retry_at=2e9)
+    outbox.flush()
+    assert outbox.counts("spring") == {PENDING: 2, SENT: 1, FAILED: 1}
+    assert outbox.errors("spring") == [("user1@example.com", "bad address")]
+    # The retried message is not due until its retry time
+    assert [message["key"] for message in outbox.claim("spring")] == ["user3@example.com"]
+    assert outbox.next_due("spring") == 2e9
+
+
+def test_release_returns_unattempted_messages(outbox):
+    outbox.load("spring", rows(2))
+    batch = outbox.claim("spring")
+    outbox.release([message["id"] for message in batch])
+    assert outbox.counts("spring") == {PENDING: 2}
+
+
+def test_recover_after_a_crash(outbox):
+    outbox.load("spring", rows(3))
+    outbox.claim("spring", limit=2)
+    assert outbox.recover("spring") == 2
+    assert outbox.counts("spring") == {PENDING: 1, UNKNOWN: 2}
+    assert outbox.recover("spring", resend=True) == 2
+    assert outbox.counts("spring") == {PENDING: 3}
+
+
+def test_run_outbox_retries_then_gives_up(outbox):
+    outbox.load("spring", rows(3))
+    attempts = {}
+
+    def send(payload):
+        email = payload["email"]
+        attempts[email] = attempts.get(email, 0) + 1
+        if email == "user1@example.com":
+            raise TimeoutError("timed out")
+        if email == "user2@example.com":
+            raise PermanentError("mailbox does not exist")
+        return f"id-{email}"
+
+    counts = run_outbox(outbox, "spring", send, max_attempts=3, base_delay=0)
+    assert counts == {SENT: 1, FAILED: 2}
+    assert attempts == {"user0@example.com": 1, "user1@example.com": 3, "user2@example.com": 1}
+
+
+def test_run_outbox_stops_on_fatal_errors_and_keeps_messages_pending(outbox):
+    outbox.load("spring", rows(3))
+
+    def send(payload):
+        raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        run_outbox(outbox, "spring", send)
+    assert outbox.counts("spring") == {PENDING: 3}
+
+
+def test_a_finished_campaign_is_not_sent_again(outbox):
+    outbox.load("spring", rows(2))
+    sent = []
+    run_outbox(outbox, "spring", lambda payload: sent.append(payload["email"]))
+    run_outbox(outbox, "spring", lambda payload: sent.append(payload["email"]))
+    assert sorted(sent) == ["user0@example.com", "user1@example.com"]
+
+
+@pytest.mark.parametrize("error, retryable, fatal", [
+    (TimeoutError("timed out"), True, False),
+    (ValueError("bad row"), False, False),
+    (PermanentError("bounced"), False, False),
+    (HTTPError(429), True, False),
+    (HTTPError(400), False, False),
+    (HTTPError(503), True, False),
+    (HTTPError(401), False, True),
+    (smtplib.SMTPAuthenticationError(535, b"no"), True, True),
+])
+def test_error_policies(error, retryable, fatal):
+    assert is_retryable(error) is retryable
+    assert is_fatal(error) is fatal
+
+
+def test_describe_counts():
+    assert describe_counts({SENT: 3, PENDING: 1}) == "sent 3, pending 1"
+    assert describe_counts({}) == "empty"
@@ -0,0 +1,123 @@
+import pytest
+
+import recipients
+from recipients import (BloomFilter, RecipientStats, clean_recipients, load_recipients, normalize_email,
+                        normalize_phone, read_suppression)
+
+
+@pytest.fixture(autouse=True)
+def no_default_country(monkeypatch):
+    monkeypatch.setattr(recipients, "DEFAULT_COUNTRY", None)
+    normalize_phone.cache_clear()
+    yield
+    normalize_phone.cache_clear()
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+91 98765 43210", "+919876543210"),
+    ("+1 (555) 123-4567", "+15551234567"),
+    ("0091-98765-43210", "+919876543210"),
+    ("tel:+447700900123", "+447700900123"),
+    ("9876543210", None),
+    ("+12345", None),
+    ("+1234567890123456", None),
+    ("+0123456789", None),
+    ("+91 98765 4321x", None),
+    ("", None),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+def test_normalize_phone_default_country():
+    assert normalize_phone("098765 43210", "91") == "+919876543210"
+    assert normalize_phone("9876543210", "+91") == "+919876543210"
+    # An explicit country code wins over the default
+    assert normalize_phone("+15551234567", "91") == "+15551234567"
+
+
+def test_normalize_phone_env_default(monkeypatch):
+    monkeypatch.setattr(recipients, "DEFAULT_COUNTRY", "44")
+    assert normalize_phone("07700 900123") == "+447700900123"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("user@example.com", "user@example.com"),
+    ("  User.Name@Example.COM ", "User.Name@example.com"),
+    ("Jane Doe <jane@example.com>", "jane@example.com"),
+    ("mailto:jane@example.com", "jane@example.com"),
+    ("jane@bücher.de", "jane@xn--bcher-kva.de"),
+    ("not-an-address", None),
+    ("jane@localhost", None),
+    ("jane..doe@example.com", None),
+    ("@example.com", None),
+])
+def test_normalize_email(raw, expected):
+    assert normalize_email(raw) == expected
+
+
+def test_clean_recipients_counts_what_it_drops():
+    rows = [
+        {"email": "a@example.com", "name": "A"},
+        {"email": "A@Example.com", "name": "A again"},
+        {"email": "Bee <b@example.com>", "name": "B"},
+        {"email": "broken", "name": "C"},
+        {"name": "no address"},
+        {"email": "stop@example.com", "name": "D"},
+    ]
+    stats = RecipientStats()
+    kept = list(clean_recipients(rows, suppress={"stop@example.com"}, stats=stats))
+    assert kept == [{"email": "a@example.com", "name": "A"}, {"email": "b@example.com", "name": "B"}]
+    assert (stats.read, stats.kept, stats.invalid, stats.duplicates, stats.suppressed) == (6, 2, 2, 1, 1)
+    assert stats.invalid_samples == ["broken", ""]
+
+
+def test_clean_recipients_phones_with_default_country():
+    rows = [{"phone": "98765 43210"}, {"phone": "+91 9876543210"}, {"phone": "12"}]
+    stats = RecipientStats()
+    kept = list(clean_recipients(rows, "phone", default_country="91", suppress=frozenset(), stats=stats))
+    assert kept == [{"phone": "+919876543210"}]
+    assert (stats.duplicates, stats.invalid) == (1, 1)
+
+
+@pytest.mark.parametrize("dedup, kept", [("set", 2), ("bloom", 2), (None, 3)])
+def test_clean_recipients_dedup_modes(dedup, kept):
+    rows = [{"email": "a@example.com"}, {"email": "b@example.com"}, {"email": "a@example.com"}]
+    assert len(list(clean_recipients(rows, suppress=frozenset(), dedup=dedup, expected=100))) == kept
+
+
+def test_clean_recipients_rejects_unknown_dedup():
+    with pytest.raises(ValueError):
+        list(clean_recipients([], suppress=frozenset(), dedup="list"))
+
+
+def test_bloom_filter_size_and_membership():
+    assert len(BloomFilter(1_000_000).bits) == 1_797_199
+    bloom = BloomFilter(1000)
+    assert bloom.add("+15551234567") is False
+    assert bloom.add("+15551234567") is True
+    assert "+15551234567" in bloom
+
+
+@pytest.mark.parametrize("name, content", [
+    ("list.csv", "Email,Name\nAna@Example.com,Ana\n,Nobody\nana@example.com,Again\nbob@example.com,Bob\n"),
+    ("list.jsonl", '{"email": "Ana@Example.com", "name": "Ana"}\n\n{"email": "ana@example.com"}\n'
+                   '{"email": "bob@example.com", "name": "Bob"}\n'),
+    ("list.txt", "# customers\nAna@Example.com\nana@example.com\nbob@example.com\n"),
+])
+def test_load_recipients_reads_each_format(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    stats = RecipientStats()
+    rows = list(load_recipients(str(path), suppress=frozenset(), stats=stats))
+    assert [row["email"] for row in rows] == ["Ana@example.com", "bob@example.com"]
+    assert stats.duplicates == 1
+
+
+def test_suppression_list_files(tmp_path):
+    path = tmp_path / "stop.csv"
+    path.write_text("address,reason\nStop@Example.com,unsubscribed\nnot an address,typo\n", encoding="utf-8")
+    suppress = read_suppression(str(path))
+    assert suppress == {"stop@example.com"}
+    rows = [{"email": "stop@example.com"}, {"email": "go@example.com"}]
+    assert [row["email"] for row in clean_recipients(rows, suppress=suppress)] == ["go@example.com"]
@@ -0,0 +1,33 @@
+import sys
+
+import rerun_profiler
+from rerun_profiler import RerunProfiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = RerunProfiler()
+    profiler.mark("CSS injection")
+    assert profiler.timings == []
+    assert profiler.stats_text() == ""
+
+
+def test_finish_is_idempotent():
+    profiler = RerunProfiler(enabled=True, use_cprofile=True)
+    profiler.mark("Header")
+    total = profiler.finish()
+    assert profiler.finish() == total
+    assert [name for name, _ in profiler.timings] == ["Header"]
+    assert "function calls" in profiler.stats_text()
+    assert rerun_profiler.stop_leftover() is False
+
+
+def test_next_rerun_stops_a_profiler_left_running():
+    abandoned = RerunProfiler(enabled=True, use_cprofile=True)
+    # The rerun was cut short: finish() was never called
+    assert rerun_profiler._active is abandoned._profile
+    profiler = RerunProfiler(enabled=True, use_cprofile=True)
+    assert rerun_profiler._active is profiler._profile
+    profiler.finish()
+    assert rerun_profiler._active is None
+    if sys.version_info < (3, 12):
+        assert sys.getprofile() is None
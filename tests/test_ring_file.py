@@ -0,0 +1,74 @@
+import importlib.util
+import os
+
+import pytest
+
+from system_metrics import RingFile
+
+
+def ram_monitor():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "1_ram_monitor.py")
+    spec = importlib.util.spec_from_file_location("ram_monitor", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fill(ring, start, count):
+    for i in range(start, start + count):
+        ring.append(float(i), 8 << 30, 4 << 30, 4 << 30, 50.0, float(i % 100))
+
+
+def test_ring_keeps_the_newest_records(tmp_path):
+    path = str(tmp_path / "history.ring")
+    writer = RingFile(path, capacity=10, writable=True)
+    fill(writer, 0, 25)
+    writer.flush()
+    assert os.path.getsize(path) == RingFile.size_for(10)
+    reader = RingFile(path)
+    try:
+        assert reader.read()["timestamp"] == [float(i) for i in range(15, 25)]
+        assert reader.read(since=20.0)["timestamp"] == [20.0, 21.0, 22.0, 23.0, 24.0]
+        assert len(reader.read(max_points=3)["timestamp"]) <= 4
+        # The reader sees new records without re-opening
+        fill(writer, 25, 1)
+        assert reader.read()["timestamp"][-1] == 25.0
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_reader_remaps_a_recreated_file(tmp_path):
+    path = str(tmp_path / "history.ring")
+    writer = RingFile(path, capacity=5, writable=True)
+    fill(writer, 0, 5)
+    writer.close()
+    reader = RingFile(path)
+    try:
+        assert reader.read()["timestamp"][-1] == 4.0
+        os.remove(path)
+        # Still readable while the file is gone
+        assert reader.read()["timestamp"][-1] == 4.0
+        writer = RingFile(path, capacity=20, writable=True)
+        fill(writer, 100, 12)
+        writer.close()
+        assert reader.read()["timestamp"] == [float(i) for i in range(100, 112)]
+        assert reader.capacity == 20
+    finally:
+        reader.close()
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a ring file" * 10)
+    with pytest.raises(ValueError):
+        RingFile(str(path))
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        RingFile(str(path))
+
+
+@pytest.mark.parametrize("argv", [["--interval", "0"], ["--interval", "-1"], ["--history-days", "0"]])
+def test_cli_rejects_non_positive_intervals(argv):
+    with pytest.raises(SystemExit):
+        ram_monitor().parse_args(argv)
@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from search_cache import SearchCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """Returns one URL per result naming the query; counts calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, query, num):
+        self.calls.append(query)
+        self.release.wait(5)
+        return [f"https://example.com/{query}/{i}" for i in range(num)]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def cache(tmp_path, backend, clock):
+    cache = SearchCache(str(tmp_path / "cache.db"), backend, ttl=60, max_entries=3, clock=clock)
+    yield cache
+    cache.close()
+
+
+def test_normalize_query():
+    assert normalize_query("  Python   TIPS ") == "python tips"
+    assert normalize_query("ｐｙｔｈｏｎ") == "python"
+
+
+def test_repeated_search_is_served_from_memory(cache, backend):
+    first = cache.search("python tips", 2)
+    again = cache.search("Python  Tips", 2)
+    assert first.source == "fetched" and again.source == "memory"
+    assert list(again) == list(first)
+    assert backend.calls == ["python tips"]
+    # A different result count is a different entry
+    assert cache.search("python tips", 3).source == "fetched"
+
+
+def test_entries_expire_after_ttl(cache, backend, clock):
+    cache.search("python")
+    clock.now += 59
+    assert cache.search("python").source == "memory"
+    clock.now += 1
+    assert cache.search("python").source == "fetched"
+    assert len(backend.calls) == 2
+
+
+def test_refresh_always_fetches(cache, backend):
+    cache.search("python")
+    assert cache.search("python", refresh=True).source == "fetched"
+    assert len(backend.calls) == 2
+
+
+def test_results_survive_a_restart(tmp_path, backend, clock):
+    path = str(tmp_path / "cache.db")
+    first = SearchCache(path, backend, ttl=60, clock=clock)
+    first.search("python")
+    first.close()
+    second = SearchCache(path, backend, ttl=60, clock=clock)
+    try:
+        assert second.search("python").source == "disk"
+        assert len(second) == 1
+    finally:
+        second.close()
+    assert len(backend.calls) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, backend, clock):
+    cache = SearchCache(str(tmp_path / "cache.db"), backend, ttl=600, max_entries=2,
+                        memory_entries=0, clock=clock)
+    try:
+        cache.search("a")
+        clock.now += 1
+        cache.search("b")
+        clock.now += 1
+        assert cache.search("a").source == "disk"
+        clock.now += 1
+        cache.search("c")
+        assert len(cache) == 2
+        # "b" was used least recently, so it went when "c" arrived
+        assert cache.search("a").source == "disk"
+        assert cache.search("b").source == "fetched"
+    finally:
+        cache.close()
+
+
+def test_concurrent_identical_searches_share_one_fetch(cache, backend):
+    backend.release.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.search("python"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert backend.calls == ["python"]
+    assert len(results) == 8
+    assert {result.source for result in results} <= {"fetched", "shared", "memory"}
+    assert cache.counts["fetched"] == 1
+
+
+def test_backend_errors_reach_every_waiter_and_are_not_cached(cache):
+    def failing(query, num):
+        raise RuntimeError("rate limited")
+
+    cache.backend = failing
+    with pytest.raises(RuntimeError):
+        cache.search("python")
+    cache.backend = lambda query, num: ["https://example.com"]
+    assert cache.search("python").source == "fetched"
+
+
+def test_failed_store_still_returns_the_results(tmp_path, backend, clock, caplog):
+    path = str(tmp_path / "cache.db")
+    cache = SearchCache(path, backend, clock=clock)
+    cache._conn.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(path, isolation_level=None, timeout=0)
+    try:
+        other.execute("BEGIN EXCLUSIVE")
+        backend.release.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.search("python"))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        backend.release.set()
+        for thread in threads:
+            thread.join(5)
+        # Every caller, including the coalesced waiters, gets the fetched results
+        assert len(results) == 4
+        assert all(list(result) == list(results[0]) and result for result in results)
+        assert "Could not write search results" in caplog.text
+        # They were kept in memory even though the disk write failed
+        assert cache.search("python").source == "memory"
+        other.execute("COMMIT")
+        # The failed transaction did not stay open and block later searches
+        assert cache.search("go").source == "fetched"
+        assert len(cache) == 1
+        assert backend.calls == ["python", "go"]
+    finally:
+        other.close()
+        cache.close()
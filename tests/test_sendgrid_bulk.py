@@ -0,0 +1,71 @@
+import threading
+
+from sendgrid_bulk import SendGridBatchSender
+
+
+def recipients(count):
+    return ({"email": f"user{i}@example.com", "name": f"User {i}"} for i in range(count))
+
+
+def accept(request):
+    return 202, {}, {"X-Message-Id": f"msg-{request['json']['personalizations'][0]['to'][0]['email']}"}
+
+
+def test_rows_are_batched_into_personalizations(fake_api):
+    fake_api.respond = accept
+    with SendGridBatchSender("KEY", fake_api.url, batch_size=1000, max_parallel=3) as sender:
+        result = sender.send(recipients(2500), "Team <team@example.com>", "Hi {name}", "Hello {name}, 100% off")
+    assert (result.sent, result.failed, result.requests) == (2500, 0, 3)
+    posts = fake_api.posts()
+    assert sorted(len(post["json"]["personalizations"]) for post in posts) == [500, 1000, 1000]
+    payload = next(post["json"] for post in posts if post["json"]["personalizations"][0]["to"][0]["email"] == "user0@example.com")
+    assert payload["from"] == {"email": "team@example.com", "name": "Team"}
+    assert payload["content"] == [{"type": "text/plain", "value": "Hello -name-, 100% off"}]
+    assert payload["personalizations"][0]["subject"] == "Hi User 0"
+    assert payload["personalizations"][0]["substitutions"] == {"-name-": "User 0"}
+    assert posts[0]["path"] == "/v3/mail/send"
+    assert posts[0]["headers"]["Authorization"] == "Bearer KEY"
+    assert len(result.message_ids) == 3
+
+
+def test_batches_reuse_keep_alive_connections(fake_api):
+    fake_api.respond = accept
+    with SendGridBatchSender("KEY", fake_api.url, batch_size=10, max_parallel=2) as sender:
+        result = sender.send(recipients(200), "team@example.com", "Hi", "Hello")
+    assert result.requests == 20
+    assert len({post["client"] for post in fake_api.posts()}) <= 2
+
+
+def test_429_is_retried_after_retry_after(fake_api):
+    lock = threading.Lock()
+    throttled = []
+
+    def respond(request):
+        with lock:
+            if not throttled:
+                throttled.append(request)
+                return 429, {"errors": [{"message": "too many requests"}]}, {"Retry-After": "0"}
+        return accept(request)
+
+    fake_api.respond = respond
+    with SendGridBatchSender("KEY", fake_api.url, batch_size=100, max_parallel=2) as sender:
+        result = sender.send(recipients(300), "team@example.com", "Hi", "Hello")
+    assert (result.sent, result.failed) == (300, 0)
+    assert len(fake_api.posts()) == 4
+
+
+def test_rejected_batch_and_rows_missing_a_field_fail_on_their_own(fake_api):
+    def respond(request):
+        if request["json"]["personalizations"][0]["to"][0]["email"] == "user0@example.com":
+            return 400, {"errors": [{"message": "bad request"}]}
+        return accept(request)
+
+    rows = list(recipients(20))
+    rows.insert(5, {"email": "noname@example.com"})
+    fake_api.respond = respond
+    with SendGridBatchSender("KEY", fake_api.url, batch_size=10, max_parallel=2) as sender:
+        result = sender.send(rows, "team@example.com", "Hi {name}", "Hello")
+    assert (result.sent, result.failed) == (10, 11)
+    errors = dict(result.errors)
+    assert errors["noname@example.com"] == "No value for {name}"
+    assert errors["user0@example.com (+9 more)"].startswith("HTTP 400")
@@ -0,0 +1,94 @@
+import threading
+
+from sms_bulk import TwilioBulkSender, TwilioError, is_fatal
+
+
+def sender(api, numbers=("+15550000001", "+15550000002"), workers=2):
+    return TwilioBulkSender("AC123", "token", list(numbers), rate=1000, workers=workers,
+                            base_url=api.url, max_retries=2)
+
+
+def phones(count):
+    return ({"phone": f"+1555100{i:04d}", "name": f"User {i}"} for i in range(count))
+
+
+def test_send_spreads_rows_over_the_sender_numbers(fake_api):
+    fake_api.respond = lambda request: (201, {"sid": "SM" + request["form"]["To"][-4:]})
+    with sender(fake_api) as bulk:
+        result = bulk.send(phones(10), "Hi {name}")
+    assert (result.sent, result.failed, result.aborted) == (10, 0, None)
+    posts = fake_api.posts()
+    assert posts[0]["path"] == "/2010-04-01/Accounts/AC123/Messages.json"
+    assert sorted(post["form"]["Body"] for post in posts) == sorted(f"Hi User {i}" for i in range(10))
+    senders = [post["form"]["From"] for post in posts]
+    assert senders.count("+15550000001") == senders.count("+15550000002") == 5
+
+
+def test_send_retries_after_429(fake_api):
+    throttled = set()
+
+    def respond(request):
+        to = request["form"]["To"]
+        if to not in throttled:
+            throttled.add(to)
+            return 429, {"message": "Too Many Requests"}, {"Retry-After": "0"}
+        return 201, {"sid": "SM1"}
+
+    fake_api.respond = respond
+    with sender(fake_api) as bulk:
+        result = bulk.send(phones(4), "Hi")
+    assert (result.sent, result.failed, result.throttled) == (4, 0, 4)
+    assert len(fake_api.posts()) == 8
+
+
+def test_send_counts_rejected_numbers_and_carries_on(fake_api):
+    def respond(request):
+        if request["form"]["To"].endswith("0003"):
+            return 400, {"message": "The 'To' number is not a valid phone number."}
+        return 201, {"sid": "SM1"}
+
+    fake_api.respond = respond
+    with sender(fake_api) as bulk:
+        result = bulk.send(phones(6), "Hi")
+    assert (result.sent, result.failed, result.aborted) == (5, 1, None)
+    assert result.errors[0][0] == "+15551000003"
+    assert "not a valid phone number" in result.errors[0][1]
+
+
+def test_send_stops_on_401(fake_api):
+    fake_api.respond = lambda request: (401, {"message": "Authenticate"})
+    with sender(fake_api) as bulk:
+        result = bulk.send(phones(10_000), "Hi")
+    assert result.sent == 0 and result.failed == 0
+    assert "Authenticate" in result.aborted
+    # Only the requests already in flight are made before the run stops
+    assert len(fake_api.posts()) < 50
+
+
+def test_send_does_not_hang_when_a_401_arrives_after_the_last_row_is_queued(fake_api):
+    lock = threading.Lock()
+    count = []
+
+    def respond(request):
+        with lock:
+            count.append(1)
+            if len(count) == 2:
+                return 401, {"message": "Authenticate"}
+        return 201, {"sid": "SM1"}
+
+    fake_api.respond = respond
+    finished = []
+    with sender(fake_api) as bulk:
+        thread = threading.Thread(target=lambda: finished.append(bulk.send(phones(10), "Hi")))
+        thread.start()
+        thread.join(5)
+    assert finished, "send hung after a 401"
+    assert finished[0].aborted is not None
+
+
+def test_is_fatal_only_for_credential_and_account_errors():
+    assert is_fatal(TwilioError(401, "Authenticate"))
+    assert is_fatal(TwilioError(403, "Account suspended"))
+    assert not is_fatal(TwilioError(400, "Invalid 'To' number"))
+    assert not is_fatal(TwilioError(500, "Internal error"))
+    assert not is_fatal(ValueError("bad row"))
@@ -0,0 +1,54 @@
+import pytest
+
+from sms_segments import analyze, make_gsm_safe, score_campaign
+
+
+@pytest.mark.parametrize("text, encoding, units, segments", [
+    ("", "GSM-7", 0, 0),
+    ("a" * 160, "GSM-7", 160, 1),
+    ("a" * 161, "GSM-7", 161, 2),
+    ("a" * 306, "GSM-7", 306, 2),
+    ("a" * 307, "GSM-7", 307, 3),
+    ("€" * 80, "GSM-7", 160, 1),
+    ("д" * 70, "UCS-2", 70, 1),
+    ("д" * 71, "UCS-2", 71, 2),
+    ("д" * 134, "UCS-2", 134, 2),
+])
+def test_analyze(text, encoding, units, segments):
+    info = analyze(text)
+    assert (info.encoding, info.units, info.segments) == (encoding, units, segments)
+
+
+def test_extension_characters_are_not_split():
+    # 306 septets would fit two parts of 153, but the "€" escape pair cannot
+    # straddle the first boundary, which pushes one septet into a third part
+    info = analyze("a" * 152 + "€" + "a" * 152)
+    assert (info.units, info.segments) == (306, 3)
+
+
+def test_surrogate_pairs_are_not_split():
+    assert analyze("д" * 66 + "😀").segments == 1
+    info = analyze("д" * 66 + "😀" + "д" * 66)
+    assert (info.encoding, info.units, info.segments) == ("UCS-2", 134, 3)
+
+
+def test_non_gsm_characters_are_reported_once():
+    assert analyze("Grüße á – ok – “quoted” – á").non_gsm == "á–“”"
+
+
+def test_make_gsm_safe():
+    assert make_gsm_safe("“Cáfe” – déjà vu…") == '"Cafe" - déjà vu...'
+    assert analyze(make_gsm_safe("“Cáfe”")).encoding == "GSM-7"
+    # Emoji have no replacement and keep the message in UCS-2
+    assert analyze(make_gsm_safe("Hi 😀")).encoding == "UCS-2"
+
+
+def test_score_campaign_counts_segments_per_rendered_message():
+    rows = [{"name": "Ana"}, {"name": "Zoë"}, {"name": "Дарья"}]
+    score = score_campaign(rows, "Hi {name}, your order has shipped")
+    assert score.messages == 3
+    assert score.segments == 3
+    assert score.ucs2 == 2
+    # "ë" has a GSM-7 substitute; the Cyrillic name stays UCS-2
+    assert score.safe_ucs2 == 1 and score.safe_segments == 3
+    assert set(score.non_gsm) == {"ë", "Д", "а", "р", "ь", "я"}
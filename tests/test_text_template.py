@@ -0,0 +1,43 @@
+import pytest
+
+from mailer import TextTemplate
+
+
+
+def test_render_fills_placeholders():
+    template = TextTemplate("Hi {first_name}, your code is {code}.")
+    assert template.fields == {"first_name", "code"}
+    assert template.render({"first_name": "Ana", "code": 42}) == "Hi Ana, your code is 42."
+
+
+def test_placeholders_are_case_insensitive():
+    template = TextTemplate("Hi { Name }")
+    assert template.fields == {"name"}
+    assert template.render({"name": "Ana"}) == "Hi Ana"
+
+
+def test_percent_signs_and_escaped_braces_are_literal():
+    template = TextTemplate("100% off for {name} {{today}}")
+    assert template.render({"name": "Ana"}) == "100% off for Ana {today}"
+
+
+def test_text_without_placeholders():
+    template = TextTemplate("Plain text")
+    assert template.fields == set()
+    assert template.render({}) == "Plain text"
+
+
+def test_missing_value_raises_value_error():
+    with pytest.raises(ValueError, match=r"\{name\}"):
+        TextTemplate("Hi {name}").render({"email": "a@example.com"})
+
+
+@pytest.mark.parametrize("text", ["{name:>10}", "{name!r}", "{0}", "{user.name}"])
+def test_unsupported_placeholders(text):
+    with pytest.raises(ValueError):
+        TextTemplate(text)
+
+
+def test_missing_fields():
+    template = TextTemplate("{first_name} {city}")
+    assert template.missing_fields(["Email", "First_Name"]) == ["city"]
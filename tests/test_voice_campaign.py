@@ -0,0 +1,104 @@
+import itertools
+import threading
+
+from voice_campaign import VoiceCampaign, build_twiml
+
+CALLS = "/2010-04-01/Accounts/AC123/Calls.json"
+
+
+class FakeVoiceAPI:
+    """Places calls and answers list and fetch requests from a table of call statuses"""
+
+    def __init__(self, api, outcome, listed_pages=2):
+        self.lock = threading.Lock()
+        self.numbers = itertools.count()
+        self.calls = {}
+        self.statuses = {}
+        self.outcome = outcome
+        self.listings = 0
+        self.listed_pages = listed_pages
+        api.respond = self.respond
+
+    def respond(self, request):
+        with self.lock:
+            if request["method"] == "POST":
+                if request["form"]["To"].endswith("9999"):
+                    return 400, {"message": "Invalid 'To' number"}
+                number = next(self.numbers)
+                sid = f"CA{number:03d}"
+                self.calls[sid] = request["form"]
+                self.statuses[sid] = self.outcome(number)
+                return 201, {"sid": sid, "status": "queued"}
+            if request["path"] == CALLS:
+                assert request["query"].get("StartTime>") or request["query"].get("Page")
+                self.listings += 1
+                # Calls that started, plus one this campaign did not place, split over pages
+                listed = [{"sid": sid, "status": status} for sid, status in self.statuses.items()
+                          if status not in ("canceled", "queued")]
+                listed.append({"sid": "CAother", "status": "completed"})
+                page = int(request["query"].get("Page", 0))
+                size = -(-len(listed) // self.listed_pages)
+                body = {"calls": listed[page * size:(page + 1) * size], "next_page_uri": None}
+                if page + 1 < self.listed_pages:
+                    body["next_page_uri"] = f"{CALLS}?Page={page + 1}&PageToken=PA{page + 1}"
+                return 200, body
+            sid = request["path"].rsplit("/", 1)[1][:-len(".json")]
+            return 200, {"sid": sid, "status": self.statuses.get(sid, "queued")}
+
+
+def phones(count):
+    return ({"phone": f"+1555200{i:04d}", "name": f"User {i}"} for i in range(count))
+
+
+def campaign(api):
+    return VoiceCampaign("AC123", "token", "+15550000001", cps=1000, workers=3, base_url=api.url)
+
+
+def test_outcomes_come_from_paged_listings_and_fetches_of_unstarted_calls(fake_api):
+    outcomes = ["completed", "busy", "no-answer", "failed", "canceled"]
+    FakeVoiceAPI(fake_api, lambda number: outcomes[number % 5])
+    with campaign(fake_api) as calls:
+        result = calls.run(phones(10), "Hello {name}", poll_interval=0, wait_timeout=5)
+    assert (result.placed, result.failed) == (10, 0)
+    assert result.outcomes() == {"completed": 2, "busy": 2, "no-answer": 2, "failed": 2, "canceled": 2}
+    assert result.pending() == 0
+    gets = [request for request in fake_api.requests if request["method"] == "GET"]
+    listings = [request for request in gets if request["path"] == CALLS]
+    # One listing of two pages; only the two canceled calls are fetched one by one
+    assert len(listings) == 2 and len(gets) == 4
+    assert listings[0]["query"]["From"] == "+15550000001"
+    assert "CAother" not in result.calls
+
+
+def test_polling_continues_until_every_call_is_final(fake_api):
+    voice = FakeVoiceAPI(fake_api, lambda number: "ringing", listed_pages=1)
+    real_respond = voice.respond
+
+    def respond(request):
+        # Every call completes once the dialer has polled twice
+        if voice.listings == 2:
+            with voice.lock:
+                voice.statuses = dict.fromkeys(voice.statuses, "completed")
+        return real_respond(request)
+
+    fake_api.respond = respond
+    with campaign(fake_api) as calls:
+        result = calls.run(phones(3), "Hi", poll_interval=0.01, wait_timeout=5)
+    assert result.outcomes() == {"completed": 3}
+    assert voice.listings >= 3
+
+
+def test_rejected_numbers_fail_and_the_rest_are_called(fake_api):
+    FakeVoiceAPI(fake_api, lambda number: "completed")
+    rows = list(phones(4)) + [{"phone": "+15552009999"}]
+    with campaign(fake_api) as calls:
+        result = calls.run(rows, "Hi", poll_interval=0, wait_timeout=0)
+    assert (result.placed, result.failed) == (4, 1)
+    assert result.errors[0][0] == "+15552009999"
+    assert "Invalid 'To' number" in result.errors[0][1]
+    assert {post["form"]["Twiml"] for post in fake_api.posts()} == {build_twiml("Hi")}
+
+
+def test_build_twiml_escapes_the_message():
+    twiml = build_twiml('Tom & "Jerry" <3', voice="alice", language="en-US")
+    assert '<Say voice="alice" language="en-US">Tom &amp; "Jerry" &lt;3</Say>' in twiml
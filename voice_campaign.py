@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Voice Campaign - Batched Twilio voice calls with cached TwiML and bulk status polling
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
+
+from mailer import TextTemplate
+from rate_limit import TokenBucket
+from sms_bulk import DEFAULT_BASE_URL, post_form, twilio_session
+from worker_pool import run_workers
+
+# Twilio's default limit for outbound calls is one call per second per account
+DEFAULT_CPS = 1.0
+FINAL_STATUSES = frozenset({"completed", "busy", "no-answer", "failed", "canceled"})
+
+
+@lru_cache(maxsize=1024)
+def build_twiml(message, voice=None, language=None):
+    """TwiML that speaks `message`, with XML special characters escaped
+
+    Cached, so a campaign builds each distinct message only once.
+    """
+    attributes = ""
+    if voice:
+        attributes += f" voice={quoteattr(voice)}"
+    if language:
+        attributes += f" language={quoteattr(language)}"
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response><Say{attributes}>{escape(message)}</Say></Response>'
+
+
+class CallResult:
+    """Placed calls, API failures and the outcome of every placed call
+
+    `lock` guards `calls`, which dialing workers and the poller update concurrently.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.placed = 0
+        self.failed = 0
+        self.errors = []
+        self.calls = {}
+        self.polls = 0
+        self.dial_elapsed = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        """Call attempts per second while dialing"""
+        return self.placed / self.dial_elapsed if self.dial_elapsed else 0.0
+
+    def outcomes(self):
+        """Number of placed calls per status (still-running calls count as their last status)"""
+        counts = {}
+        with self.lock:
+            for call in self.calls.values():
+                counts[call["status"]] = counts.get(call["status"], 0) + 1
+        return counts
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for call in self.calls.values() if call["status"] not in FINAL_STATUSES)
+
+    def _pending_sids(self):
+        with self.lock:
+            return [sid for sid, call in self.calls.items() if call["status"] not in FINAL_STATUSES]
+
+    def _update(self, call):
+        """Store a status from the API; returns False for calls this campaign did not place"""
+        with self.lock:
+            known = self.calls.get(call["sid"])
+            if known is None:
+                return False
+            known["status"] = call["status"]
+            known["duration"] = call.get("duration")
+            return True
+
+
+class VoiceCampaign:
+    """Dial a recipient list through a bounded worker pool and one keep-alive session
+
+    Call attempts share a token bucket of `cps` calls per second. Outcomes
+    are gathered by listing the account's calls from our number, one page
+    of up to 1000 calls per request, every `poll_interval` seconds,
+    instead of fetching each call; only calls missing from the listing
+    (those that never started) are fetched one by one. `base_url` points at a local fake of
+    the API in tests.
+    """
+
+    def __init__(self, account_sid, auth_token, from_number, cps=DEFAULT_CPS, workers=4,
+                 base_url=DEFAULT_BASE_URL, voice=None, language=None, timeout=15, max_retries=3):
+        self.from_number = from_number
+        self.base_url = base_url.rstrip("/")
+        self.calls_url = f"{self.base_url}/2010-04-01/Accounts/{account_sid}/Calls.json"
+        self.workers = max(1, workers)
+        self.voice = voice
+        self.language = language
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(cps)
+        self.session = twilio_session(account_sid, auth_token, self.workers + 1)
+
+    def place_call(self, to, message):
+        """Start one call and return its SID"""
+        twiml = build_twiml(message, self.voice, self.language)
+        reply = post_form(self.session, self.calls_url, {"From": self.from_number, "To": to, "Twiml": twiml},
+                          self.bucket, self.timeout, self.max_retries)
+        return reply["sid"]
+
+    def _get(self, url, params=None):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def poll(self, result, since):
+        """Refresh the status of our calls with paged list requests; returns calls seen"""
+        pending = set(result._pending_sids())
+        url = self.calls_url
+        params = {"From": self.from_number, "StartTime>": since, "PageSize": 1000}
+        seen = 0
+        while url:
+            page = self._get(url, params)
+            result.polls += 1
+            for call in page.get("calls", []):
+                if result._update(call):
+                    pending.discard(call["sid"])
+                    seen += 1
+            next_page = page.get("next_page_uri")
+            url, params = (self.base_url + next_page, None) if next_page else (None, None)
+        # The listing filters on StartTime, so calls that never started (canceled,
+        # failed, still queued) are missing from it and are fetched individually
+        for sid in pending:
+            result._update(self._get(f"{self.calls_url[:-len('.json')]}/{sid}.json"))
+            result.polls += 1
+            seen += 1
+        return seen
+
+    def run(self, rows, message, poll_interval=15.0, wait_timeout=600.0, on_progress=None):
+        """Call every row's `phone` with the (templated) message and collect outcomes
+
+        Rows are streamed through a bounded queue to the worker pool. A
+        poller thread refreshes statuses while dialing; afterwards polling
+        continues until every call has a final status or `wait_timeout`
+        seconds pass (0 skips waiting).
+        """
+        template = TextTemplate(message)
+        result = CallResult()
+        lock = result.lock
+        finished = threading.Event()
+        since = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        started = time.perf_counter()
+
+        def dial(_, row):
+            try:
+                sid = self.place_call(row["phone"], template.render(row))
+                with lock:
+                    result.calls[sid] = {"to": row["phone"], "status": "queued", "duration": None}
+                    result.placed += 1
+            except Exception as e:
+                with lock:
+                    result.failed += 1
+                    result.errors.append((row.get("phone"), str(e)))
+            if on_progress is not None:
+                try:
+                    on_progress(result)
+                except Exception:
+                    pass
+
+        def poller():
+            while not finished.wait(poll_interval):
+                if result.calls:
+                    try:
+                        self.poll(result, since)
+                    except Exception:
+                        pass
+
+        poll_thread = threading.Thread(target=poller, daemon=True)
+        if poll_interval:
+            poll_thread.start()
+        try:
+            run_workers(rows, dial, self.workers)
+        finally:
+            finished.set()
+            if poll_thread.is_alive():
+                poll_thread.join()
+        result.dial_elapsed = time.perf_counter() - started
+
+        deadline = time.monotonic() + wait_timeout
+        while result.calls and wait_timeout:
+            try:
+                self.poll(result, since)
+            except Exception as e:
+                result.errors.append(("status poll", str(e)))
+                break
+            if on_progress is not None:
+                on_progress(result)
+            if not result.pending() or time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
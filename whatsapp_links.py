@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Links - Bulk wa.me chat links and QR codes from a contact list
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from urllib.parse import quote
+
+from mailer import TextTemplate
+from recipients import RecipientStats, clean_recipients
+
+QR_BATCH = 200
+_MEMORY_SPOOL_LIMIT = 8 * 1024 * 1024
+
+
+@lru_cache(maxsize=1024)
+def _quoted(message):
+    return quote(message, safe="")
+
+
+def chat_link(phone, message=""):
+    """wa.me link for an E.164 number with an optional pre-filled message"""
+    url = f"https://wa.me/{phone.lstrip('+')}"
+    return f"{url}?text={_quoted(message)}" if message else url
+
+
+def render_qr_batch(items):
+    """PNG bytes of a QR code for each (name, url); runs in a worker process"""
+    import qrcode
+    rendered = []
+    for name, url in items:
+        buffer = io.BytesIO()
+        qrcode.make(url, box_size=6, border=2).save(buffer, format="PNG")
+        rendered.append((name, buffer.getvalue()))
+    return rendered
+
+
+class LinkResult:
+    """Counts from a bulk link run; `recipients` has the invalid, duplicate and suppressed counts"""
+
+    def __init__(self):
+        self.links = 0
+        self.qr_codes = 0
+        self.recipients = RecipientStats()
+        self.elapsed = 0.0
+
+    @property
+    def invalid(self):
+        return self.recipients.invalid
+
+    @property
+    def duplicates(self):
+        return self.recipients.duplicates
+
+    @property
+    def invalid_samples(self):
+        return self.recipients.invalid_samples
+
+    @property
+    def rate(self):
+        return self.links / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"LinkResult(links={self.links}, invalid={self.invalid}, "
+                f"duplicates={self.duplicates}, qr_codes={self.qr_codes}, elapsed={self.elapsed:.2f}s)")
+
+
+def generate_links(rows, output, message="", fmt=None, default_country=None, qr=False,
+                   workers=None, on_progress=None, progress_every=10000, suppress=None):
+    """Write one chat link per unique valid `phone` in rows; returns a LinkResult
+
+    Rows are streamed through clean_recipients(): numbers are normalized to
+    E.164, invalid, repeated and suppressed numbers are counted and
+    skipped, and each link is written straight to the output, so memory
+    grows only with the set of numbers already seen. `message` may contain
+    {column} placeholders. `output` is a path or binary file; "csv" writes
+    phone,name,link rows and "zip" writes links.csv plus, with qr=True,
+    qr/<number>.png rendered in a pool of `workers` spawned processes.
+    """
+    if fmt is None:
+        fmt = os.path.splitext(str(output))[1].lstrip(".").lower() if isinstance(output, (str, os.PathLike)) else "csv"
+    if fmt not in ("csv", "zip"):
+        raise ValueError(f"Unsupported output format {fmt!r}: use csv or zip")
+    if qr and fmt != "zip":
+        raise ValueError("QR codes need zip output")
+    if qr:
+        import qrcode  # noqa: F401 - fail before reading any rows when it is missing
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as f:
+            return generate_links(rows, f, message, fmt, default_country, qr, workers, on_progress,
+                                  progress_every, suppress)
+
+    template = TextTemplate(message)
+    result = LinkResult()
+    started = time.perf_counter()
+    # In a zip the link list is spooled and stored last, so QR images can be written as they arrive
+    table = output if fmt == "csv" else tempfile.SpooledTemporaryFile(_MEMORY_SPOOL_LIMIT)
+    text = io.TextIOWrapper(table, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(["phone", "name", "link"])
+    archive = zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) if fmt == "zip" else None
+    # "spawn", because forking the multithreaded Streamlit server can deadlock the children
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) if qr else None
+    in_flight = set()
+    batch = []
+    max_in_flight = (workers or os.cpu_count() or 1) * 2
+
+    def store(done):
+        for future in done:
+            for name, png in future.result():
+                # PNGs are already compressed
+                archive.writestr(f"qr/{name}.png", png, zipfile.ZIP_STORED)
+                result.qr_codes += 1
+
+    try:
+        for row in clean_recipients(rows, "phone", default_country, suppress, stats=result.recipients):
+            phone = row["phone"]
+            link = chat_link(phone, template.render(row))
+            writer.writerow([phone, row.get("name", ""), link])
+            result.links += 1
+            if pool is not None:
+                batch.append((phone.lstrip("+"), link))
+                if len(batch) >= QR_BATCH:
+                    in_flight.add(pool.submit(render_qr_batch, batch))
+                    batch = []
+                    # Bound the images waiting in memory to a few batches per process
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        store(done)
+            if on_progress is not None and result.links % progress_every == 0:
+                on_progress(result)
+        if batch:
+            in_flight.add(pool.submit(render_qr_batch, batch))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            store(done)
+        if archive is not None:
+            table.seek(0)
+            with archive.open("links.csv", "w") as entry:
+                while chunk := table.read(1024 * 1024):
+                    entry.write(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if archive is not None:
+            archive.close()
+            text.detach()
+            table.close()
+        else:
+            text.detach()
+    result.elapsed = time.perf_counter() - started
+    if on_progress is not None:
+        on_progress(result)
+    return result
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Worker Pool - Stream items through a bounded queue to a fixed pool of threads
+"""
+
+import contextlib
+import queue
+import threading
+
+
+def run_workers(items, handle, workers=1, open_worker=None):
+    """Call handle(context, item) for every item on `workers` threads
+
+    Items are streamed through a bounded queue, so the input is never held
+    in memory. `open_worker()`, if given, returns a context manager entered
+    once per thread (e.g. a connection); what it yields is `context`.
+    handle() deals with per-item failures itself: an exception that escapes
+    it, or one raised by open_worker(), stops the run. Items not handled
+    yet are then dropped and the first such error is returned; a run that
+    was not stopped returns None.
+    """
+    workers = max(1, workers)
+    work = queue.Queue(maxsize=workers * 4)
+    done = object()
+    stop = threading.Event()
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        item = None
+        try:
+            with open_worker() if open_worker is not None else contextlib.nullcontext() as context:
+                while True:
+                    item = work.get()
+                    if item is done:
+                        return
+                    if not stop.is_set():
+                        handle(context, item)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            stop.set()
+        # A failed thread keeps taking items until its sentinel, so the producer
+        # never blocks on a full queue that no thread reads any more
+        while item is not done:
+            item = work.get()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in items:
+            if stop.is_set():
+                break
+            work.put(item)
+    finally:
+        for _ in threads:
+            work.put(done)
+        for thread in threads:
+            thread.join()
+    return errors[0] if errors else None